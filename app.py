@@ -2,30 +2,25 @@
 Główny moduł aplikacji serwerowej.
 
 Moduł odpowiada za konfigurację frameworka Flask oraz rozszerzeń Flask-Restful, Flask-SQLAlchemy i Flask-JWT-Extended.
+Obiekt aplikacji tworzony jest przez funkcję create_app, a przygotowanie bazy danych i pamięci podręcznych przed
+przyjęciem pierwszego zapytania wykonuje funkcja prepare.
 """
+import os
+
 from flask import Flask
 from flask_restful import Api
-from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from sqlalchemy import orm
 
-app = Flask(__name__)
-api = Api(app)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:///app.db"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = "FieldGame_8tkHecj>5F.RnbGxG_J$"
-app.config['JWT_TOKEN_LOCATION'] = ['cookies']
-app.config['JWT_COOKIE_CSRF_PROTECT'] = False
-# app.config['JWT_CSRF_IN_COOKIES'] = True
-app.config['JWT_BLACKLIST_ENABLED'] = True
-app.config['JWT_BLACKLIST_TOKEN_CHECKS'] = ['access', 'refresh']
-# app.config['JWT_ACCESS_CSRF_COOKIE_NAME'] = "csrf_access"
-# app.config['JWT_REFRESH_CSRF_COOKIE_NAME'] = "csrf_refresh"
+import database
+import metrics
+import serialization
 
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
+db = database.RoutingSQLAlchemy()
+jwt = JWTManager()
+api = Api()
 
-import views, models, resources
+import views, models, resources, cache, tracking, bundles, streaming, migrations, scheduler
 
 
 api.add_resource(resources.UserRegistration, '/register')
@@ -34,37 +29,152 @@ api.add_resource(resources.UserLogout, '/logout')
 api.add_resource(resources.TokenRefresh, '/token/refresh')
 api.add_resource(resources.GameDetailsResource, '/games/<int:game_id>')
 api.add_resource(resources.RiddleListResource, '/games/<int:game_id>/riddles')
+api.add_resource(resources.GameBundleResource, '/games/<int:game_id>/bundle')
 api.add_resource(resources.UserGamesStatusResource, '/mygames')
 api.add_resource(resources.GameProgressResource, '/mygames/<int:game_id>')
 api.add_resource(resources.GameStartResource, '/mygames/<int:game_id>/start')
 api.add_resource(resources.GameAdvancementResource, '/mygames/<int:game_id>/advance')
+api.add_resource(resources.GameSplitsResource, '/mygames/<int:game_id>/splits')
+api.add_resource(resources.SegmentLeaderboardResource, '/games/<int:game_id>/segments/<int:riddle_no>')
+api.add_resource(resources.GameAnalyticsResource, '/games/<int:game_id>/analytics')
 api.add_resource(resources.StatisticsResource, '/stats')
+api.add_resource(resources.StatisticsStreamResource, '/stats/stream')
+api.add_resource(resources.StatisticsExportResource, '/stats/export')
 api.add_resource(resources.AllGamesResource, '/games')
+api.add_resource(resources.NearbyGamesResource, '/games/nearby')
 api.add_resource(resources.GameCreationResource, '/games/create')
+api.add_resource(resources.GameImportResource, '/games/import')
 api.add_resource(resources.RiddleCreationResource, '/games/<int:game_id>/riddles/add')
+api.add_resource(resources.PositionBatchResource, '/positions')
+api.add_resource(resources.MetricsResource, '/metrics')
+api.add_resource(resources.JobListResource, '/jobs')
 
 
-@app.before_first_request
-def init():
+def create_app(config=None):
     """
-    Metoda wykonywana przed przetworzeniem pierwszego zapytania.
+    Tworzy i konfiguruje obiekt aplikacji Flask.
+
+    Konfiguracja pobierana jest ze zmiennych środowiskowych, a następnie uzupełniana o przekazane wartości. Funkcja nie
+    łączy się z bazą danych - schemat bazy danych i pamięci podręczne przygotowuje funkcja prepare.
+
+    :param config: Słownik z ustawieniami nadpisującymi konfigurację domyślną
+    :return: Obiekt aplikacji Flask
+    """
+    app = Flask(__name__)
+    database.load_config(app)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = "FieldGame_8tkHecj>5F.RnbGxG_J$"
+    app.config['JWT_TOKEN_LOCATION'] = ['cookies']
+    app.config['JWT_COOKIE_CSRF_PROTECT'] = False
+    # app.config['JWT_CSRF_IN_COOKIES'] = True
+    app.config['JWT_BLACKLIST_ENABLED'] = True
+    app.config['JWT_BLACKLIST_TOKEN_CHECKS'] = ['access', 'refresh']
+    app.config['JWT_CLAIMS_IN_REFRESH_TOKEN'] = True
+    app.config['JWT_REVOCATION_SYNC_SECONDS'] = 1.0
+    app.config['JWT_REVOCATION_PRUNE_SECONDS'] = 3600
+    app.config['JWT_REVOCATION_GAP_SECONDS'] = 60
+    app.config['CONTENT_VERSION_SYNC_SECONDS'] = 1.0
+    app.config['RESPONSE_CACHE_BYTES'] = 16 * 1024 * 1024
+    app.config['CACHE_PREWARM'] = os.environ.get('CACHE_PREWARM', '1') != '0'
+    app.config['GEOFENCE_REQUIRE_LOCATION'] = os.environ.get('GEOFENCE_REQUIRE_LOCATION', '1') != '0'
+    app.config['IDEMPOTENCY_KEY_TTL_SECONDS'] = 24 * 3600
+    app.config['ARCHIVE_AFTER_DAYS'] = float(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+    app.config['ARCHIVE_BATCH_SIZE'] = 500
+    app.config['SCHEDULER_ENABLED'] = os.environ.get('SCHEDULER_ENABLED', '1') != '0'
+    app.config['SCHEDULER_POLL_SECONDS'] = 30
+    app.config['SCHEDULER_JITTER'] = 0.1
+    app.config['SCHEDULER_JOBS'] = {
+        'prune_revoked_tokens': (3600, 60),
+        'prune_idempotency_keys': (3600, 60),
+        'refresh_leaderboard': (3600, 300),
+        'archive_games': (24 * 3600, 600),
+        'sqlite_checkpoint': (600, 60),
+        'sqlite_optimize': (24 * 3600, 600)
+    }
+    app.config['SQLITE_VACUUM_FREE_RATIO'] = 0.25
+    app.config['PASSWORD_HASH_ROUNDS'] = 29000
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    app.config['PASSWORD_HASH_QUEUE'] = 8
+    app.config['PASSWORD_HASH_TIMEOUT'] = 10
+    app.config['SSE_POLL_SECONDS'] = 1.0
+    app.config['SSE_GAP_SECONDS'] = 60
+    app.config['SSE_SNAPSHOT_SECONDS'] = 10
+    app.config['SSE_SNAPSHOT_SIZE'] = 100
+    app.config['SSE_QUEUE_SIZE'] = 1000
+    app.config['SSE_KEEPALIVE_SECONDS'] = 15
+    app.config['SSE_MAX_SUBSCRIBERS'] = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 32))
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') != '0'
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    app.config['METRICS_SLOW_REQUEST_SECONDS'] = float(os.environ.get('METRICS_SLOW_REQUEST_SECONDS') or 0) or None
+    # app.config['JWT_ACCESS_CSRF_COOKIE_NAME'] = "csrf_access"
+    # app.config['JWT_REFRESH_CSRF_COOKIE_NAME'] = "csrf_refresh"
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+    database.register_sqlite_pragmas()
+    database.register_statement_deadlines()
+    jwt.init_app(app)
+    api.representations['application/json'] = serialization.output_json
+    metrics.init_app(app, api)
+    api.init_app(app)
+    app.register_blueprint(views.blueprint)
+    scheduler.init_app(app)
+    return app
+
+
+def prepare(app):
+    """
+    Przygotowuje aplikację do obsługi zapytań.
+
+    Tworzy bazę danych lub aktualizuje jej schemat do najnowszej wersji, uzupełnia ranking graczy o brakujące wpisy,
+    konfiguruje klasy modeli SQLAlchemy oraz (jeżeli ``CACHE_PREWARM`` jest włączone) wypełnia pamięci podręczne
+    unieważnionymi żetonami i katalogiem gier. Na koniec zamyka połączenia z bazą danych, aby nie były współdzielone
+    przez procesy potomne.
 
-    Obecna implementacja tworzy bazę danych oraz tabele.
+    Przy uruchomieniu serwera GUnicorn z opcją ``--preload`` funkcja wykonywana jest raz, w procesie nadrzędnym,
+    a procesy robocze otrzymują gotowe pamięci podręczne (współdzielone do czasu modyfikacji - copy-on-write).
+
+    :param app: Obiekt aplikacji Flask
     """
-    db.create_all()
+    with app.app_context():
+        migrations.upgrade()
+        models.LeaderboardEntryModel.backfill()
+        orm.configure_mappers()
+        if app.config['CACHE_PREWARM']:
+            resources.prewarm_caches()
+        db.session.remove()
+        for bind in [None] + list(app.config['SQLALCHEMY_BINDS'] or ()):
+            db.get_engine(app, bind).dispose()
 
 
 @jwt.token_in_blacklist_loader
 def check_if_token_in_blacklist(decrypted_token):
     """
     Metoda wykonywana podczas odczytywania "żetonu dostępowego" JWT (JSON Web Token).
-    Sprawdza, czy żeton nie został wpisany na czarną listę, tym samym czy nie został unieważniony
+    Sprawdza, czy żeton nie został wpisany na czarną listę, tym samym czy nie został unieważniony.
+    Informacja pochodzi z pamięci podręcznej procesu, okresowo synchronizowanej z bazą danych.
 
     :param decrypted_token: Odszyfrowany żeton JWT
-    :return: Informacja z bazy danych, czy "żeton" jest unieważniony (True/False)
+    :return: Informacja, czy "żeton" jest unieważniony (True/False)
     """
     jti = decrypted_token['jti']
-    return models.RevokedTokenModel.is_jti_blacklisted(jti)
+    return cache.revoked_tokens.is_revoked(jti)
+
+
+@jwt.user_identity_loader
+def user_identity_lookup(identity):
+    """
+    Metoda wywoływana podczas tworzenia żetonu JWT (JSON Web Token).
+
+    Pozwala przekazać do funkcji tworzących żeton obiekt użytkownika zamiast jego nazwy.
+
+    :param identity: Obiekt klasy UserModel lub nazwa użytkownika
+    :return: Nazwa użytkownika zapisywana w żetonie JWT jako jego tożsamość
+    """
+    if isinstance(identity, models.UserModel):
+        return identity.username
+    return identity
 
 
 @jwt.user_claims_loader
@@ -72,14 +182,17 @@ def add_claims_to_access_token(identity):
     """
     Metoda wywoływana podczas tworzenia bądź odświeżania żetonu JWT (JSON Web Token).
 
-    Dodaje informację, czy użytkownik posiada prawa administracyjne w aplikacji
+    Dodaje identyfikator użytkownika oraz informację, czy użytkownik posiada prawa administracyjne w aplikacji.
+    Jeżeli przekazano obiekt użytkownika, informacje są pobierane bezpośrednio z niego, bez zapytania do bazy danych.
 
-    :param identity: Tożsamość użytkownika zaszyta w żetonie JWT
-    :return: Informacja o posiadaniu (bądź nie) praw administratora aplikacji
+    :param identity: Obiekt klasy UserModel lub nazwa użytkownika zaszyta w żetonie JWT
+    :return: Identyfikator użytkownika oraz informacja o posiadaniu (bądź nie) praw administratora aplikacji
     """
-    user = models.UserModel.find_by_username(identity)
-    return {"admin": user.isadmin if user.isadmin is not None else False}
+    user = identity if isinstance(identity, models.UserModel) else models.UserModel.find_by_username(identity)
+    return user.get_claims()
 
 
 if __name__ == '__main__':
-    app.run()
+    application = create_app()
+    prepare(application)
+    application.run()
@@ -0,0 +1,58 @@
+"""
+Moduł odpowiadający za archiwizację ukończonych gier.
+
+Wpisy w tabeli wyników dotyczące gier ukończonych ponad ``ARCHIVE_AFTER_DAYS`` dni temu są przenoszone do archiwum
+(ArchivedEntryModel) partiami po ``ARCHIVE_BATCH_SIZE`` wpisów, każda partia w osobnej transakcji, dzięki czemu
+blokady bazy danych są krótkie, a przerwane zadanie można bezpiecznie uruchomić ponownie. Tabela wyników, ranking
+i dziennik zdarzeń zawierają wtedy głównie gry w toku i niedawno ukończone.
+
+Użycie: ``python archive.py [--days <liczba dni>] [--batch-size <liczba wpisów>]``
+"""
+import argparse
+import datetime as dt
+import json
+import time
+
+from flask import current_app
+
+from app import create_app
+import migrations
+from models import ArchivedEntryModel
+
+
+def archive_finished_games(days=None, batch_size=None, deadline=None):
+    """
+    Przenosi do archiwum wszystkie wpisy dotyczące gier ukończonych przed podanym czasem. Wymaga kontekstu aplikacji.
+
+    :param days: Liczba dni od ukończenia gry, po której wpis jest przenoszony (domyślnie ``ARCHIVE_AFTER_DAYS``)
+    :param batch_size: Liczba wpisów przenoszonych w jednej transakcji (domyślnie ``ARCHIVE_BATCH_SIZE``)
+    :param deadline: Termin (wartość zegara ``time.monotonic``), po którym kolejne partie nie są przenoszone;
+                     pozostałe wpisy zostaną przeniesione przy następnym uruchomieniu
+    :return: Słownik zawierający liczbę przeniesionych wpisów i datę graniczną
+    """
+    if days is None:
+        days = current_app.config['ARCHIVE_AFTER_DAYS']
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    before = dt.datetime.now() - dt.timedelta(days=days)
+    archived = 0
+    while True:
+        moved = ArchivedEntryModel.archive_finished(before, batch_size)
+        archived += moved
+        if moved < batch_size or (deadline is not None and time.monotonic() >= deadline):
+            break
+    return {"archived": archived, "before": before.isoformat()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=float, help="archive games finished more than this many days ago")
+    parser.add_argument("--batch-size", type=int, help="entries moved per transaction")
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade()
+        print(json.dumps(archive_finished_games(args.days, args.batch_size), indent=2))
+
+
+if __name__ == '__main__':
+    main()
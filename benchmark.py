@@ -0,0 +1,809 @@
+"""
+Skrypt uruchamiający testy wydajnościowe aplikacji.
+
+Każdy test korzysta z tymczasowej bazy danych SQLite, tworzonej w katalogu tymczasowym i usuwanej po zakończeniu
+testu. Wyniki wypisywane są w formacie JSON.
+
+Użycie: ``python benchmark.py <nazwa testu> [opcje]``
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+
+@contextlib.contextmanager
+def temporary_database(config=None):
+    """
+    Tworzy aplikację pracującą na tymczasowej bazie danych i tworzy w niej schemat
+
+    :param config: Słownik z ustawieniami nadpisującymi konfigurację aplikacji
+    :return: Obiekt aplikacji Flask z aktywnym kontekstem aplikacji
+    """
+    directory = tempfile.mkdtemp(prefix="fieldgame-bench-")
+    from app import create_app, db
+    import migrations
+    app = create_app(dict({'SCHEDULER_ENABLED': False}, **(config or {}),
+                          SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(directory, "bench.db")))
+    try:
+        with app.app_context():
+            migrations.upgrade()
+            yield app
+            db.session.remove()
+            db.get_engine().dispose()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def create_game(riddles, latitude=50.0614, longitude=19.9366, spacing=0.005):
+    """
+    Tworzy grę z zagadkami rozmieszczonymi wzdłuż równoleżnika
+
+    :param riddles: Liczba zagadek
+    :param latitude: Szerokość geograficzna pierwszej zagadki
+    :param longitude: Długość geograficzna pierwszej zagadki
+    :param spacing: Odstęp między kolejnymi zagadkami (w stopniach długości geograficznej)
+    :return: Obiekt klasy GameModel
+    """
+    from app import db
+    from models import GameModel, RiddleModel
+    game = GameModel(title="Benchmark", description="Benchmark game", riddles=riddles)
+    game.save_to_db()
+    db.session.bulk_insert_mappings(RiddleModel, [{
+        'game_id': game.id,
+        'riddle_no': number,
+        'description': f"Riddle {number}",
+        'latitude': latitude,
+        'longitude': longitude + (number - 1) * spacing,
+        'radius': 50,
+        'dominant_object': "Object"
+    } for number in range(1, riddles + 1)])
+    db.session.commit()
+    return game
+
+
+def create_players(game, players):
+    """
+    Tworzy graczy i dołącza ich do gry
+
+    :param game: Obiekt klasy GameModel
+    :param players: Liczba graczy
+    :return: Lista identyfikatorów utworzonych użytkowników
+    """
+    from app import db
+    from models import UserModel, ScoreboardEntryModel, LeaderboardEntryModel
+    db.session.bulk_insert_mappings(UserModel, [
+        {'username': f"player{number}", 'password': "-"} for number in range(players)
+    ])
+    db.session.commit()
+    user_ids = [row.id for row in db.session.query(UserModel.id).order_by(UserModel.id).all()]
+    db.session.bulk_insert_mappings(ScoreboardEntryModel, [
+        {'user_id': user_id, 'game_id': game.id, 'current_riddle': 1, 'finished': False} for user_id in user_ids
+    ])
+    db.session.commit()
+    LeaderboardEntryModel.backfill()
+    return user_ids
+
+
+def bench_positions(args):
+    """
+    Mierzy przepustowość przetwarzania wsadowo przesyłanych próbek położenia graczy (próbki na sekundę)
+
+    :param args: Argumenty wiersza poleceń
+    :return: Słownik z wynikami testu
+    """
+    with temporary_database():
+        import tracking
+        game = create_game(args.riddles)
+        user_ids = create_players(game, args.players)
+        rng = random.Random(args.seed)
+        start = time.time() + 1
+        batches = []
+        for _ in range(args.batches):
+            batch = ([], [], [], [])
+            for user_id in user_ids:
+                for sample in range(args.samples):
+                    riddle = rng.randrange(args.riddles)
+                    batch[0].append(user_id)
+                    batch[1].append(start + sample)
+                    batch[2].append(50.0614 + rng.uniform(-0.002, 0.002))
+                    batch[3].append(19.9366 + riddle * 0.005 + rng.uniform(-0.002, 0.002))
+            batches.append(batch)
+            start += args.samples
+        advanced = 0
+        began = time.perf_counter()
+        for batch in batches:
+            advanced += len(tracking.ingest_samples(*batch))
+        elapsed = time.perf_counter() - began
+    total = args.batches * args.players * args.samples
+    return {
+        'benchmark': 'positions',
+        'players': args.players,
+        'samples': total,
+        'advanced': advanced,
+        'seconds': elapsed,
+        'samples_per_second': total / elapsed
+    }
+
+
+def bench_login(args):
+    """
+    Mierzy przepustowość logowania (logowania na sekundę) w zależności od liczby procesów obliczających skróty haseł
+
+    :param args: Argumenty wiersza poleceń
+    :return: Słownik z wynikami testu
+    """
+    results = []
+    with temporary_database() as app:
+        from app import db
+        from hashing import hasher
+        from models import UserModel
+        pwdhash = UserModel.generate_hash("password")
+        db.session.bulk_insert_mappings(UserModel, [
+            {'username': f"player{number}", 'password': pwdhash} for number in range(args.threads)
+        ])
+        db.session.commit()
+        for workers in args.workers:
+            app.config['PASSWORD_HASH_WORKERS'] = workers
+            app.config['PASSWORD_HASH_QUEUE'] = args.queue
+            hasher.shutdown()
+            counts = {'ok': 0, 'rejected': 0}
+            lock = threading.Lock()
+
+            def player(number):
+                client = app.test_client()
+                for _ in range(args.logins):
+                    response = client.post("/login", data={'username': f"player{number}", 'password': "password"})
+                    with lock:
+                        counts['ok' if response.status_code == 200 else 'rejected'] += 1
+
+            threads = [threading.Thread(target=player, args=(number,)) for number in range(args.threads)]
+            began = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - began
+            results.append({
+                'workers': workers,
+                'logins': counts['ok'],
+                'rejected': counts['rejected'],
+                'seconds': elapsed,
+                'logins_per_second': counts['ok'] / elapsed
+            })
+        hasher.shutdown()
+    return {'benchmark': 'login', 'threads': args.threads, 'results': results}
+
+
+def bench_advance(args):
+    """
+    Wysyła równoległe zapytania o przejście do kolejnej zagadki dotyczące jednego wpisu w tabeli wyników i sprawdza,
+    czy gracz nie został przesunięty więcej razy, niż pozwalają na to parametry zapytań
+
+    :param args: Argumenty wiersza poleceń
+    :return: Słownik z wynikami testu
+    """
+    with temporary_database({'GEOFENCE_REQUIRE_LOCATION': False}) as app:
+        from flask_jwt_extended import create_access_token
+        from models import UserModel, ScoreboardEntryModel, ProgressEventModel
+        game = create_game(args.riddles)
+        game_id = game.id
+        user_id = create_players(game, 1)[0]
+        token = create_access_token(identity=UserModel.query.get(user_id))
+        counts = {}
+        lock = threading.Lock()
+        barrier = threading.Barrier(args.threads)
+
+        def player(number):
+            client = app.test_client()
+            client.set_cookie("localhost", "access_token_cookie", token)
+            data = {'expected_riddle': 1} if args.mode == "expected" else {}
+            headers = {'Idempotency-Key': "advance-1"} if args.mode == "idempotent" else {}
+            barrier.wait()
+            response = client.post(f"/mygames/{game_id}/advance", data=data, headers=headers)
+            with lock:
+                counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+        threads = [threading.Thread(target=player, args=(number,)) for number in range(args.threads)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        entry = ScoreboardEntryModel.filter_by_user_and_game(user_id, game_id)
+        events = ProgressEventModel.query.filter(ProgressEventModel.kind != ProgressEventModel.START).count()
+        expected_events = args.threads if args.mode == "plain" else 1
+        expected_events = min(expected_events, args.riddles)
+    return {
+        'benchmark': 'advance',
+        'mode': args.mode,
+        'threads': args.threads,
+        'status_codes': counts,
+        'current_riddle': entry.current_riddle,
+        'finished': bool(entry.finished),
+        'events': events,
+        'consistent': events == expected_events and entry.current_riddle == min(1 + events, args.riddles),
+        'seconds': elapsed
+    }
+
+
+SQLITE_SETTINGS = {
+    'default': {'SQLITE_JOURNAL_MODE': None, 'SQLITE_SYNCHRONOUS': None, 'SQLITE_BUSY_TIMEOUT': None,
+                'SQLITE_MMAP_SIZE': None},
+    'tuned': {'SQLITE_JOURNAL_MODE': "WAL", 'SQLITE_SYNCHRONOUS': "NORMAL", 'SQLITE_BUSY_TIMEOUT': 5000,
+              'SQLITE_MMAP_SIZE': 256 * 1024 * 1024}
+}
+
+
+def _write_worker(app, user_id, game_id, writes, results):
+    """
+    Proces wykonujący kolejne zapisy postępu gracza
+
+    :param app: Obiekt aplikacji Flask
+    :param user_id: Identyfikator użytkownika
+    :param game_id: Identyfikator gry
+    :param writes: Liczba zapisów
+    :param results: Kolejka, do której trafia krotka (liczba udanych zapisów, liczba nieudanych zapisów)
+    """
+    from sqlalchemy.exc import OperationalError
+    from app import db
+    from models import ScoreboardEntryModel
+    ok, failed = 0, 0
+    with app.app_context():
+        for _ in range(writes):
+            try:
+                ScoreboardEntryModel.advance(user_id, game_id)
+                ok += 1
+            except OperationalError:
+                db.session.rollback()
+                failed += 1
+        db.session.remove()
+    results.put((ok, failed))
+
+
+def bench_writes(args):
+    """
+    Mierzy przepustowość zapisu postępu graczy (zapisy na sekundę) przy równoległej pracy wielu procesów, z domyślnymi
+    ustawieniami bazy SQLite oraz z ustawieniami stosowanymi przez aplikację (WAL, synchronous=NORMAL)
+
+    :param args: Argumenty wiersza poleceń
+    :return: Słownik z wynikami testu
+    """
+    import multiprocessing
+    context = multiprocessing.get_context("fork")
+    results = []
+    for settings in args.settings:
+        with temporary_database(SQLITE_SETTINGS[settings]) as app:
+            from app import db
+            game = create_game(args.writes + 1)
+            game_id = game.id
+            user_ids = create_players(game, args.processes)
+            db.session.remove()
+            queue = context.Queue()
+            processes = [context.Process(target=_write_worker, args=(app, user_id, game_id, args.writes, queue))
+                         for user_id in user_ids]
+            began = time.perf_counter()
+            for process in processes:
+                process.start()
+            counts = [queue.get() for _ in processes]
+            for process in processes:
+                process.join()
+            elapsed = time.perf_counter() - began
+        writes = sum(ok for ok, _ in counts)
+        results.append({
+            'settings': settings,
+            'writes': writes,
+            'failed': sum(failed for _, failed in counts),
+            'seconds': elapsed,
+            'writes_per_second': writes / elapsed
+        })
+    return {'benchmark': 'writes', 'processes': args.processes, 'results': results}
+
+
+def bench_serialization(args):
+    """
+    Porównuje czas tworzenia odpowiedzi JSON (zapytanie do bazy danych i serializacja) z wykorzystaniem modułu
+    serialization oraz poprzednią metodą (obiekty modeli, funkcje to_json i json.dumps) i sprawdza, czy obie metody
+    zwracają te same dane
+
+    :param args: Argumenty wiersza poleceń
+    :return: Słownik z wynikami testu
+    """
+    import datetime as dt
+    from app import db
+    from models import GameModel, ScoreboardEntryModel
+    from resources import StatisticsResource
+    import serialization
+
+    def legacy_games():
+        return {'games': [{'id': x.id, 'title': x.title, 'description': x.description, 'riddles': x.riddles}
+                          for x in GameModel.query.all()]}
+
+    def legacy_game_data(user_id):
+        return {'game_data': [{
+            'id': x.id, 'user_id': x.user_id, 'game_id': x.game_id, 'finished': x.finished,
+            'current_riddle': x.current_riddle, 'time_begin': str(x.time_begin), 'time_end': str(x.time_end)
+        } for x in ScoreboardEntryModel.filter_by_user(user_id)]}
+
+    def legacy_statistics():
+        now = dt.datetime.now()
+        entries = []
+        for username, title, current_riddle, finished, time_begin, time_end in ScoreboardEntryModel.get_statistics():
+            elapsed_seconds = (time_end - time_begin).total_seconds() \
+                if time_end else (now - time_begin).total_seconds()
+            entries.append({
+                "username": username,
+                "game": title,
+                "current_riddle": current_riddle,
+                "finished": finished,
+                "time_begin": int(time_begin.timestamp() * 1000),
+                "elapsed_seconds": elapsed_seconds
+            })
+        return {"entries": entries}
+
+    with temporary_database():
+        generate_dataset(args.users, args.games, 5, args.entries, args.seed)
+        user_id = db.session.query(ScoreboardEntryModel.user_id).group_by(ScoreboardEntryModel.user_id) \
+            .order_by(db.func.count().desc()).limit(1).scalar()
+        cases = {
+            'games': (lambda: json.dumps(legacy_games()).encode(),
+                      lambda: serialization.dumps(GameModel.return_all())),
+            'mygames': (lambda: json.dumps(legacy_game_data(user_id)).encode(),
+                        lambda: serialization.dumps(ScoreboardEntryModel.print_by_user(user_id))),
+            'stats': (lambda: json.dumps(legacy_statistics()).encode(),
+                      lambda: b"".join(serialization.stream_list("entries", StatisticsResource.entries())))
+        }
+        results = []
+        for name, (legacy, current) in cases.items():
+            legacy_data, current_data = json.loads(legacy()), json.loads(current())
+            if name == 'stats':
+                for entries in (legacy_data['entries'], current_data['entries']):
+                    for entry in entries:
+                        if not entry['finished']:
+                            entry['elapsed_seconds'] = None
+            timings = {}
+            for label, build in (('legacy', legacy), ('current', current)):
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    size = len(build())
+                    db.session.remove()
+                timings[label] = (time.perf_counter() - started) / args.repeat * 1000
+            results.append({
+                'response': name,
+                'items': len(next(iter(current_data.values()))),
+                'bytes': size,
+                'identical': legacy_data == current_data,
+                'same_bytes': legacy() == current() if name != 'stats' else None,
+                'legacy_ms': timings['legacy'],
+                'current_ms': timings['current'],
+                'speedup': timings['legacy'] / timings['current']
+            })
+    return {'benchmark': 'serialization', 'results': results}
+
+
+STARTUP_MODES = {
+    'lazy': "prepare() runs on the first request, like the former before_first_request hook",
+    'prepared': "prepare() runs before the first request, without cache prewarming",
+    'prewarmed': "prepare() runs before the first request and prewarms the catalogue caches"
+}
+
+
+def _startup_worker(uri, mode, token, paths, results):
+    """
+    Proces mierzący czas uruchamiania aplikacji w nowym interpreterze oraz czas odpowiedzi na pierwsze zapytania
+
+    :param uri: Adres bazy danych
+    :param mode: Sposób uruchamiania aplikacji (klucz STARTUP_MODES)
+    :param token: Żeton dostępowy JWT dołączany do zapytań
+    :param paths: Lista adresów, do których wysyłane są zapytania
+    :param results: Kolejka, do której trafia słownik z wynikami
+    """
+    began = time.perf_counter()
+    from app import create_app, prepare
+    imported = time.perf_counter()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'CACHE_PREWARM': mode == 'prewarmed'})
+    created = time.perf_counter()
+    if mode != 'lazy':
+        prepare(app)
+    prepared = time.perf_counter()
+    client = app.test_client()
+    client.set_cookie("localhost", app.config['JWT_ACCESS_COOKIE_NAME'], token)
+    first, second = {}, {}
+    for timings in (first, second):
+        for path in paths:
+            started = time.perf_counter()
+            if mode == 'lazy' and timings is first and not first:
+                prepare(app)
+            client.get(path, headers={'Accept-Encoding': "gzip"})
+            timings[path] = (time.perf_counter() - started) * 1000
+    results.put({
+        'import_seconds': imported - began,
+        'create_seconds': created - imported,
+        'prepare_seconds': prepared - created,
+        'first_ms': first,
+        'second_ms': second
+    })
+
+
+def bench_startup(args):
+    """
+    Mierzy czas uruchamiania aplikacji (import modułów, utworzenie aplikacji, przygotowanie bazy danych i pamięci
+    podręcznych) oraz czas odpowiedzi na pierwsze zapytania. Każde uruchomienie odbywa się w nowym interpreterze.
+
+    :param args: Argumenty wiersza poleceń
+    :return: Słownik z wynikami testu
+    """
+    import multiprocessing
+    from flask_jwt_extended import create_access_token
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with temporary_database() as app:
+        from models import UserModel
+        locations = generate_dataset(args.users, args.games, args.riddles, args.entries, args.seed)
+        game_id = min(locations)
+        latitude, longitude = locations[game_id][0]
+        with app.test_request_context():
+            token = create_access_token(identity=UserModel.query.first())
+        paths = ["/games", f"/games/{game_id}", f"/games/{game_id}/riddles", f"/games/{game_id}/bundle",
+                 f"/games/nearby?lat={latitude}&lon={longitude}&km=5", "/stats?mode=leaderboard&limit=50"]
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        for mode in args.modes:
+            runs = []
+            for _ in range(args.runs):
+                queue = context.Queue()
+                process = context.Process(target=_startup_worker, args=(uri, mode, token, paths, queue))
+                process.start()
+                runs.append(queue.get())
+                process.join()
+
+            def median(values):
+                return percentile(sorted(values), 0.5)
+            results.append({
+                'mode': mode,
+                'description': STARTUP_MODES[mode],
+                'import_seconds': median([run['import_seconds'] for run in runs]),
+                'create_seconds': median([run['create_seconds'] for run in runs]),
+                'prepare_seconds': median([run['prepare_seconds'] for run in runs]),
+                'first_request_ms': median([run['first_ms'][paths[0]] for run in runs]),
+                'routes': [{
+                    'path': path,
+                    'first_ms': median([run['first_ms'][path] for run in runs]),
+                    'second_ms': median([run['second_ms'][path] for run in runs])
+                } for path in paths]
+            })
+    return {'benchmark': 'startup', 'games': args.games, 'runs': args.runs, 'results': results}
+
+
+def percentile(values, fraction):
+    """
+    Wyznacza percentyl metodą najbliższej pozycji
+
+    :param values: Posortowana rosnąco lista wartości
+    :param fraction: Rząd percentyla (od 0 do 1)
+    :return: Wartość percentyla lub None, jeżeli lista jest pusta
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))]
+
+
+def generate_dataset(users, games, riddles, entries, seed=0, password="password"):
+    """
+    Tworzy syntetyczne dane: użytkowników, gry z zagadkami rozmieszczonymi w okolicy Krakowa oraz wpisy w tabeli
+    wyników o losowym postępie
+
+    :param users: Liczba użytkowników
+    :param games: Liczba gier
+    :param riddles: Liczba zagadek w każdej grze
+    :param entries: Liczba wpisów w tabeli wyników (nie więcej niż iloczyn liczby użytkowników i gier)
+    :param seed: Ziarno generatora liczb losowych
+    :param password: Hasło wszystkich użytkowników
+    :return: Słownik, którego kluczami są identyfikatory gier, a wartościami listy współrzędnych kolejnych zagadek
+    """
+    import datetime as dt
+    from app import db
+    from models import UserModel, GameModel, RiddleModel, ScoreboardEntryModel, LeaderboardEntryModel
+    rng = random.Random(seed)
+    pwdhash = UserModel.generate_hash(password)
+    db.session.bulk_insert_mappings(UserModel, [
+        {'username': f"user{number}", 'password': pwdhash} for number in range(users)
+    ])
+    db.session.bulk_insert_mappings(GameModel, [
+        {'title': f"Game {number}", 'description': f"Synthetic game {number}", 'riddles': riddles}
+        for number in range(games)
+    ])
+    db.session.commit()
+    user_ids = [row.id for row in db.session.query(UserModel.id).order_by(UserModel.id).all()]
+    game_ids = [row.id for row in db.session.query(GameModel.id).order_by(GameModel.id).all()]
+
+    locations = {}
+    riddle_rows = []
+    for game_id in game_ids:
+        latitude, longitude = 50.0614 + rng.uniform(-0.1, 0.1), 19.9366 + rng.uniform(-0.15, 0.15)
+        locations[game_id] = []
+        for number in range(1, riddles + 1):
+            locations[game_id].append((latitude, longitude))
+            riddle_rows.append({
+                'game_id': game_id,
+                'riddle_no': number,
+                'description': f"Riddle {number}",
+                'latitude': latitude,
+                'longitude': longitude,
+                'radius': 50,
+                'dominant_object': "Object"
+            })
+            latitude, longitude = latitude + rng.uniform(-0.005, 0.005), longitude + rng.uniform(-0.005, 0.005)
+    db.session.bulk_insert_mappings(RiddleModel, riddle_rows)
+
+    now = dt.datetime.now()
+    pairs = rng.sample(range(len(user_ids) * len(game_ids)), min(entries, len(user_ids) * len(game_ids)))
+    entry_rows = []
+    for pair in pairs:
+        time_begin = now - dt.timedelta(seconds=rng.uniform(600, 86400))
+        finished = rng.random() < 0.3
+        entry_rows.append({
+            'user_id': user_ids[pair // len(game_ids)],
+            'game_id': game_ids[pair % len(game_ids)],
+            'finished': finished,
+            'current_riddle': riddles if finished else rng.randint(1, riddles),
+            'time_begin': time_begin,
+            'time_end': time_begin + dt.timedelta(seconds=rng.uniform(300, 7200)) if finished else None
+        })
+    db.session.bulk_insert_mappings(ScoreboardEntryModel, entry_rows)
+    db.session.commit()
+    LeaderboardEntryModel.backfill()
+    return locations
+
+
+def player_session(client, call, number, game_id, locations):
+    """
+    Scenariusz sesji gracza: rejestracja, logowanie, przeglądanie gier, dołączenie do gry, przejście połowy zagadek
+    z podaniem położenia, przesłanie próbek położenia dla pozostałych zagadek, sprawdzenie postępu i statystyk oraz
+    wylogowanie
+
+    :param client: Klient testowy aplikacji Flask
+    :param call: Funkcja wysyłająca zapytanie i rejestrująca czas odpowiedzi
+    :param number: Numer sesji (wykorzystywany w nazwie użytkownika)
+    :param game_id: Identyfikator gry
+    :param locations: Lista współrzędnych kolejnych zagadek gry
+    """
+    credentials = {'username': f"session{number}", 'password': "password"}
+    call(client, "POST", "/register", data=credentials)
+    call(client, "POST", "/login", data=credentials)
+    call(client, "GET", "/games")
+    latitude, longitude = locations[0]
+    call(client, "GET", f"/games/nearby?lat={latitude}&lon={longitude}&km=5")
+    call(client, "GET", f"/games/{game_id}")
+    call(client, "GET", f"/games/{game_id}/riddles")
+    call(client, "GET", f"/games/{game_id}/bundle", headers={'Accept-Encoding': "gzip"})
+    call(client, "POST", f"/mygames/{game_id}/start")
+    half = len(locations) // 2
+    for riddle_no, (latitude, longitude) in enumerate(locations[:half], 1):
+        call(client, "POST", f"/mygames/{game_id}/advance",
+             data={'expected_riddle': riddle_no, 'latitude': latitude, 'longitude': longitude})
+    began = time.time() + 1
+    call(client, "POST", "/positions", json={'samples': [
+        {'timestamp': began + index, 'latitude': latitude, 'longitude': longitude}
+        for index, (latitude, longitude) in enumerate(locations[half:])
+    ]})
+    call(client, "GET", "/mygames")
+    call(client, "GET", f"/mygames/{game_id}")
+    call(client, "GET", "/stats?mode=leaderboard&limit=50")
+    call(client, "GET", f"/stats?mode=leaderboard&game_id={game_id}&limit=50")
+    call(client, "GET", "/stats")
+    call(client, "POST", "/token/refresh")
+    call(client, "POST", "/logout")
+
+
+def bench_suite(args):
+    """
+    Uruchamia scenariusze sesji graczy na syntetycznych danych i mierzy czas odpowiedzi (percentyle p50, p95, p99)
+    oraz przepustowość każdego zasobu z tablicy tras aplikacji
+
+    :param args: Argumenty wiersza poleceń
+    :return: Słownik z wynikami testu
+    """
+    import subprocess
+    import sys
+    latencies = {}
+    statuses = {}
+    lock = threading.Lock()
+    with temporary_database() as app:
+        if args.hash_rounds:
+            app.config['PASSWORD_HASH_ROUNDS'] = args.hash_rounds
+        adapter = app.url_map.bind("localhost")
+        rules = {f"{method} {rule.rule}" for rule in app.url_map.iter_rules() if rule.endpoint != 'static'
+                 for method in rule.methods - {'HEAD', 'OPTIONS'}}
+
+        def call(client, method, path, **kwargs):
+            began = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            elapsed = time.perf_counter() - began
+            rule = adapter.match(path.split("?")[0], method=method, return_rule=True)[0]
+            route = f"{method} {rule.rule}"
+            with lock:
+                latencies.setdefault(route, []).append(elapsed)
+                route_statuses = statuses.setdefault(route, {})
+                route_statuses[response.status_code] = route_statuses.get(response.status_code, 0) + 1
+            return response
+
+        generated = time.perf_counter()
+        locations = generate_dataset(args.users, args.games, args.riddles, args.entries, args.seed)
+        generated = time.perf_counter() - generated
+        game_ids = sorted(locations)
+        rng = random.Random(args.seed)
+        plan = [(number, rng.choice(game_ids)) for number in range(args.sessions)]
+        plan_lock = threading.Lock()
+
+        def worker():
+            while True:
+                with plan_lock:
+                    if not plan:
+                        return
+                    number, game_id = plan.pop()
+                player_session(app.test_client(), call, number, game_id, locations[game_id])
+
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+    routes = []
+    for route in sorted(rules):
+        values = sorted(latencies.get(route, []))
+        routes.append({
+            'route': route,
+            'requests': len(values),
+            'errors': sum(count for status, count in statuses.get(route, {}).items() if status >= 400),
+            'statuses': {str(status): count for status, count in sorted(statuses.get(route, {}).items())},
+            'mean_ms': sum(values) / len(values) * 1000 if values else None,
+            'p50_ms': percentile(values, 0.50) * 1000 if values else None,
+            'p95_ms': percentile(values, 0.95) * 1000 if values else None,
+            'p99_ms': percentile(values, 0.99) * 1000 if values else None,
+            'max_ms': values[-1] * 1000 if values else None,
+            'requests_per_second': len(values) / elapsed
+        })
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    total = sum(route['requests'] for route in routes)
+    return {
+        'benchmark': 'suite',
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'parameters': {key: getattr(args, key) for key in
+                       ('users', 'games', 'riddles', 'entries', 'sessions', 'threads', 'seed', 'hash_rounds')},
+        'generate_seconds': generated,
+        'seconds': elapsed,
+        'requests': total,
+        'requests_per_second': total / elapsed,
+        'routes': routes
+    }
+
+
+def compare_results(args):
+    """
+    Porównuje wyniki dwóch uruchomień testu ``suite`` i wskazuje zasoby, których czas odpowiedzi wzrósł ponad próg
+
+    :param args: Argumenty wiersza poleceń
+    :return: Słownik z wynikami porównania
+    """
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        baseline, current = json.load(baseline_file), json.load(current_file)
+    baseline_routes = {route['route']: route for route in baseline['routes']}
+    routes, regressions = [], []
+    for route in current['routes']:
+        before = baseline_routes.get(route['route'])
+        if not before or not before.get(args.metric) or not route.get(args.metric):
+            continue
+        ratio = route[args.metric] / before[args.metric]
+        routes.append({'route': route['route'], 'baseline': before[args.metric], 'current': route[args.metric],
+                       'ratio': ratio})
+        if ratio > args.threshold:
+            regressions.append(route['route'])
+    return {
+        'benchmark': 'compare',
+        'metric': args.metric,
+        'baseline_commit': baseline.get('commit'),
+        'current_commit': current.get('commit'),
+        'threshold': args.threshold,
+        'routes': routes,
+        'regressions': regressions
+    }
+
+
+def main():
+    """
+    Przetwarza argumenty wiersza poleceń i uruchamia wybrany test
+    """
+    parser = argparse.ArgumentParser(description="FieldGame API benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    positions = subparsers.add_parser("positions", help="batched position ingestion throughput")
+    positions.add_argument("--players", type=int, default=1000)
+    positions.add_argument("--riddles", type=int, default=10)
+    positions.add_argument("--samples", type=int, default=10, help="samples per player in each batch")
+    positions.add_argument("--batches", type=int, default=5)
+    positions.add_argument("--seed", type=int, default=0)
+    positions.set_defaults(handler=bench_positions)
+
+    login = subparsers.add_parser("login", help="login throughput versus password hashing worker count")
+    login.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    login.add_argument("--threads", type=int, default=8, help="concurrent clients")
+    login.add_argument("--logins", type=int, default=10, help="logins per client")
+    login.add_argument("--queue", type=int, default=64, help="hashing queue limit")
+    login.set_defaults(handler=bench_login)
+
+    advance = subparsers.add_parser("advance", help="parallel advances of a single scoreboard entry")
+    advance.add_argument("--threads", type=int, default=16, help="concurrent requests")
+    advance.add_argument("--riddles", type=int, default=50)
+    advance.add_argument("--mode", choices=["plain", "expected", "idempotent"], default="expected",
+                         help="send no guard, the expected riddle number or a shared Idempotency-Key")
+    advance.set_defaults(handler=bench_advance)
+
+    writes = subparsers.add_parser("writes", help="concurrent write throughput with default and tuned SQLite settings")
+    writes.add_argument("--processes", type=int, default=4, help="concurrent writer processes")
+    writes.add_argument("--writes", type=int, default=200, help="writes per process")
+    writes.add_argument("--settings", nargs="+", choices=sorted(SQLITE_SETTINGS), default=["default", "tuned"])
+    writes.set_defaults(handler=bench_writes)
+
+    serialize = subparsers.add_parser("serialization", help="JSON responses built from projected rows versus models")
+    serialize.add_argument("--users", type=int, default=200)
+    serialize.add_argument("--games", type=int, default=100)
+    serialize.add_argument("--entries", type=int, default=10000, help="scoreboard rows")
+    serialize.add_argument("--repeat", type=int, default=20)
+    serialize.add_argument("--seed", type=int, default=0)
+    serialize.set_defaults(handler=bench_serialization)
+
+    startup = subparsers.add_parser("startup", help="startup time and first-request latency in a fresh interpreter")
+    startup.add_argument("--users", type=int, default=100)
+    startup.add_argument("--games", type=int, default=200)
+    startup.add_argument("--riddles", type=int, default=10)
+    startup.add_argument("--entries", type=int, default=2000, help="scoreboard rows")
+    startup.add_argument("--runs", type=int, default=3, help="fresh interpreters per mode")
+    startup.add_argument("--modes", nargs="+", choices=list(STARTUP_MODES), default=list(STARTUP_MODES))
+    startup.add_argument("--seed", type=int, default=0)
+    startup.set_defaults(handler=bench_startup)
+
+    suite = subparsers.add_parser("suite", help="scripted player sessions on synthetic data, latency per route")
+    suite.add_argument("--users", type=int, default=1000)
+    suite.add_argument("--games", type=int, default=20)
+    suite.add_argument("--riddles", type=int, default=10)
+    suite.add_argument("--entries", type=int, default=5000, help="scoreboard rows")
+    suite.add_argument("--sessions", type=int, default=50, help="scripted player sessions")
+    suite.add_argument("--threads", type=int, default=8, help="concurrent sessions")
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--hash-rounds", type=int, help="override PASSWORD_HASH_ROUNDS")
+    suite.add_argument("--output", help="also write the result to this file")
+    suite.set_defaults(handler=bench_suite)
+
+    compare = subparsers.add_parser("compare", help="compare two suite results")
+    compare.add_argument("baseline", help="baseline result file")
+    compare.add_argument("current", help="current result file")
+    compare.add_argument("--metric", default="p95_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    compare.add_argument("--threshold", type=float, default=1.2, help="ratio above which a route is a regression")
+    compare.set_defaults(handler=compare_results)
+
+    args = parser.parse_args()
+    result = args.handler(args)
+    print(json.dumps(result, indent=2))
+    if getattr(args, 'output', None):
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+    if result.get('regressions'):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Moduł odpowiadający za tworzenie pakietów gier dla aplikacji mobilnej.
+
+Pakiet gry to jedna odpowiedź zawierająca informacje o grze, wszystkie jej zagadki oraz postęp gracza. Część stała
+pakietu (gra i zagadki) jest kodowana raz dla każdej wersji gry i przechowywana w pamięci podręcznej, a przy każdym
+zapytaniu dołączana jest do niej tylko zakodowana informacja o postępie gracza.
+"""
+import json
+import struct
+import time
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from cache import content_versions, responses
+from models import GameModel, RiddleModel
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+ENCODINGS = ('json', 'gzip') + (('msgpack',) if msgpack is not None else ())
+
+
+def gzip_prefix(data):
+    """
+    Kompresuje początek strumienia danych w formacie gzip, tak aby można było dołączać do niego różne zakończenia
+
+    :param data: Początek danych (bytes)
+    :return: Krotka (nagłówek gzip i skompresowane dane, suma kontrolna CRC-32 danych, długość danych)
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    header = b'\x1f\x8b\x08\x00' + struct.pack('<I', int(time.time())) + b'\x00\xff'
+    body = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    return header + body, zlib.crc32(data), len(data)
+
+
+def gzip_append(prefix, data):
+    """
+    Kończy strumień gzip utworzony funkcją gzip_prefix, dołączając do niego dane
+
+    :param prefix: Krotka zwrócona przez funkcję gzip_prefix
+    :param data: Zakończenie danych (bytes)
+    :return: Kompletny strumień w formacie gzip
+    """
+    compressed, crc, length = prefix
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -9, 1)
+    tail = compressor.compress(data) + compressor.flush(zlib.Z_FINISH)
+    trailer = struct.pack('<II', zlib.crc32(data, crc), (length + len(data)) & 0xffffffff)
+    return compressed + tail + trailer
+
+
+def _build_static(game_id):
+    """
+    Pobiera z bazy danych stałą część pakietu gry
+
+    :param game_id: Identyfikator gry
+    :return: Krotka (informacje o grze, lista zagadek) lub None, jeżeli gra nie istnieje
+    """
+    game = GameModel.find_by_id(game_id)
+    if game is None:
+        return None
+    return GameModel.serialize([game])['games'][0], RiddleModel.print_riddles_for_game(game_id)['riddles']
+
+
+def get_static_part(game_id, encoding):
+    """
+    Pobiera zakodowaną stałą część pakietu gry z pamięci podręcznej, kodując ją w razie potrzeby
+
+    :param game_id: Identyfikator gry
+    :param encoding: Sposób kodowania: ``json``, ``gzip`` lub ``msgpack``
+    :return: Zakodowana stała część pakietu lub None, jeżeli gra nie istnieje
+    """
+    key = (f"bundle-{encoding}", game_id, content_versions.get(f"game:{game_id}"))
+    cached = responses.get(key)
+    if cached is not None:
+        return cached
+    static = _build_static(game_id)
+    if static is None:
+        return None
+    game, riddles = static
+    if encoding == 'msgpack':
+        cached = b'\x83' + b''.join(msgpack.packb(item) for item in ('game', game, 'riddles', riddles, 'progress'))
+        size = len(cached)
+    else:
+        cached = (json.dumps({'game': game, 'riddles': riddles})[:-1] + ', "progress": ').encode()
+        if encoding == 'gzip':
+            cached = gzip_prefix(cached)
+        size = len(cached[0]) if encoding == 'gzip' else len(cached)
+    responses.put(key, cached, size)
+    return cached
+
+
+def encode_bundle(game_id, progress, encoding):
+    """
+    Koduje pakiet gry
+
+    :param game_id: Identyfikator gry
+    :param progress: Postęp gracza w grze zgodny z notacją JSON lub None, jeżeli gracz nie dołączył do gry
+    :param encoding: Sposób kodowania: ``json``, ``gzip`` lub ``msgpack``
+    :return: Zakodowany pakiet lub None, jeżeli gra nie istnieje
+    """
+    static = get_static_part(game_id, encoding)
+    if static is None:
+        return None
+    if encoding == 'msgpack':
+        return static + msgpack.packb(progress)
+    tail = (json.dumps(progress) + '}\n').encode()
+    if encoding == 'gzip':
+        return gzip_append(static, tail)
+    return static + tail
+
+
+def choose_encoding(accept_mimetypes, accept_encodings):
+    """
+    Wybiera sposób kodowania pakietu na podstawie nagłówków Accept i Accept-Encoding zapytania
+
+    :param accept_mimetypes: Akceptowane typy treści (``request.accept_mimetypes``)
+    :param accept_encodings: Akceptowane sposoby kompresji (``request.accept_encodings``)
+    :return: Sposób kodowania: ``json``, ``gzip`` lub ``msgpack``
+    """
+    if msgpack is not None:
+        best = accept_mimetypes.best_match((JSON_MIMETYPE,) + MSGPACK_MIMETYPES, default=JSON_MIMETYPE)
+        if best in MSGPACK_MIMETYPES:
+            return 'msgpack'
+    return 'gzip' if accept_encodings['gzip'] else 'json'
@@ -0,0 +1,299 @@
+"""
+Moduł zawierający pamięci podręczne przechowywane w pamięci procesu roboczego aplikacji.
+
+Każdy proces roboczy serwera (np. GUnicorn) posiada własną kopię pamięci podręcznej. Zmiany wprowadzone przez inne
+procesy są odczytywane z bazy danych okresowo, dzięki czemu opóźnienie ich widoczności jest ograniczone
+z góry, a pojedyncze zapytania HTTP nie wymagają odwołania do bazy danych.
+"""
+import collections
+import datetime as dt
+import threading
+import time
+
+from flask import current_app
+
+from geo import GridIndex, RiddleGeometry
+from models import ContentVersionModel, RevokedTokenModel, RiddleModel
+
+
+class RevokedTokenCache:
+    """
+    Pamięć podręczna unieważnionych żetonów JWT (JSON Web Token).
+
+    Przechowuje identyfikatory wszystkich unieważnionych i jeszcze ważnych żetonów. Nowe wpisy są pobierane z bazy
+    danych nie częściej niż co ``JWT_REVOCATION_SYNC_SECONDS`` sekund zapytaniem o wpisy o identyfikatorze większym
+    od ostatnio znanego, a wpisy wygasłe są usuwane z pamięci podręcznej co ``JWT_REVOCATION_PRUNE_SECONDS`` sekund
+    (z bazy danych usuwa je zadanie wykonywane w tle - moduł scheduler).
+
+    Transakcje zapisujące wpisy mogą zostać zatwierdzone w innej kolejności niż kolejność przydzielonych
+    identyfikatorów, dlatego brakujące identyfikatory mniejsze od ostatnio znanego są pobierane ponownie przez
+    ``JWT_REVOCATION_GAP_SECONDS`` sekund od ich wykrycia.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._last_id = None
+        self._gaps = {}
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+
+    def is_revoked(self, jti):
+        """
+        Sprawdza, czy żeton został unieważniony
+
+        :param jti: Identyfikator żetonu JWT
+        :return: Informacja, czy żeton został unieważniony (True/False)
+        """
+        self.sync()
+        return jti in self._tokens
+
+    def add(self, jti, expires):
+        """
+        Zapisuje unieważniony żeton w bazie danych oraz w pamięci podręcznej bieżącego procesu
+
+        :param jti: Identyfikator żetonu JWT
+        :param expires: Data wygaśnięcia żetonu (UTC)
+        """
+        RevokedTokenModel(jti=jti, expires=expires).add()
+        with self._lock:
+            self._tokens[jti] = expires
+
+    def sync(self, force=False):
+        """
+        Pobiera z bazy danych żetony unieważnione przez inne procesy, jeżeli upłynął czas od poprzedniej synchronizacji
+
+        :param force: Wymusza synchronizację niezależnie od czasu, jaki upłynął od poprzedniej
+        """
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            if now >= self._next_prune:
+                self._drop_expired()
+                self._next_prune = now + current_app.config['JWT_REVOCATION_PRUNE_SECONDS']
+            self._gaps = {row_id: until for row_id, until in self._gaps.items() if until > now}
+            last_id = self._last_id or 0
+            utcnow = dt.datetime.utcnow()
+            for row_id, jti, expires in RevokedTokenModel.find_since(last_id, self._gaps):
+                if expires is None or expires > utcnow:
+                    self._tokens[jti] = expires
+                if row_id <= last_id:
+                    self._gaps.pop(row_id, None)
+                    continue
+                if self._last_id is not None:
+                    until = now + current_app.config['JWT_REVOCATION_GAP_SECONDS']
+                    self._gaps.update((missing, until) for missing in range(last_id + 1, row_id))
+                last_id = row_id
+            self._last_id = last_id
+            self._next_sync = now + current_app.config['JWT_REVOCATION_SYNC_SECONDS']
+
+    def _drop_expired(self):
+        """
+        Usuwa z pamięci podręcznej żetony, których ważność już wygasła
+        """
+        now = dt.datetime.utcnow()
+        self._tokens = {jti: expires for jti, expires in self._tokens.items() if expires is None or expires > now}
+
+
+class ContentVersionCache:
+    """
+    Pamięć podręczna numerów wersji treści gier.
+
+    Numery wersji zmienionych treści są pobierane z bazy danych nie częściej niż co
+    ``CONTENT_VERSION_SYNC_SECONDS`` sekund. Treści, które nigdy nie zostały zmienione, mają wersję 0. Numery wersji
+    przydzielane są w kolejności zatwierdzania zmian (ContentVersionModel.bump), więc wystarczy pobierać wpisy
+    o numerach większych od najwyższego znanego.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._revision = 0
+        self._next_sync = 0.0
+
+    def get(self, key):
+        """
+        Pobiera numer wersji treści
+
+        :param key: Klucz treści (np. ``catalogue`` lub ``game:1``)
+        :return: Numer wersji
+        """
+        self.sync()
+        return self._versions.get(key, 0)
+
+    @property
+    def revision(self):
+        """
+        Najwyższy znany numer wersji, zmieniający się przy każdej zmianie dowolnej treści
+        """
+        self.sync()
+        return self._revision
+
+    def bump(self, *keys):
+        """
+        Zwiększa numery wersji treści w bazie danych oraz w pamięci podręcznej bieżącego procesu
+
+        :param keys: Klucze zmienionych treści
+        """
+        versions = ContentVersionModel.bump(keys)
+        with self._lock:
+            self._apply(versions.items())
+
+    def sync(self, force=False):
+        """
+        Pobiera z bazy danych numery wersji treści zmienionych przez inne procesy
+
+        :param force: Wymusza synchronizację niezależnie od czasu, jaki upłynął od poprzedniej
+        """
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            self._apply(ContentVersionModel.find_since(self._revision))
+            self._next_sync = now + current_app.config['CONTENT_VERSION_SYNC_SECONDS']
+
+    def _apply(self, versions):
+        for key, version in versions:
+            if version > self._versions.get(key, 0):
+                self._versions[key] = version
+            self._revision = max(self._revision, version)
+
+
+class ResponseCache:
+    """
+    Pamięć podręczna zserializowanych odpowiedzi, usuwająca najdawniej używane wpisy (LRU) po przekroczeniu
+    ``RESPONSE_CACHE_BYTES`` bajtów
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._size = 0
+
+    def get(self, key):
+        """
+        Pobiera wpis z pamięci podręcznej
+
+        :param key: Klucz wpisu
+        :return: Zapisana wartość lub None, jeżeli wpis nie istnieje
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        """
+        Zapisuje wpis w pamięci podręcznej
+
+        :param key: Klucz wpisu
+        :param value: Zserializowana odpowiedź (bytes) lub inny obiekt
+        :param size: Rozmiar wpisu w bajtach (domyślnie długość wartości)
+        """
+        limit = current_app.config['RESPONSE_CACHE_BYTES']
+        size = len(value) if size is None else size
+        if size > limit:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > limit:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+
+class RiddleGeometryCache:
+    """
+    Pamięć podręczna geometrii zagadek, przechowywana osobno dla każdej gry.
+
+    Geometria gry jest wczytywana z bazy danych przy pierwszym użyciu i ponownie po zmianie wersji gry.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._games = {}
+
+    def get(self, game_id, riddle_no):
+        """
+        Pobiera geometrię zagadki
+
+        :param game_id: Identyfikator gry
+        :param riddle_no: Numer zagadki w grze
+        :return: Obiekt klasy RiddleGeometry lub None, jeżeli zagadka nie istnieje
+        """
+        return self.get_game(game_id).get(riddle_no)
+
+    def get_game(self, game_id):
+        """
+        Pobiera geometrię wszystkich zagadek gry
+
+        :param game_id: Identyfikator gry
+        :return: Słownik przyporządkowujący numerom zagadek obiekty klasy RiddleGeometry
+        """
+        version = content_versions.get(f"game:{game_id}")
+        cached = self._games.get(game_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        riddles = {riddle.riddle_no: RiddleGeometry.from_riddle(riddle)
+                   for riddle in RiddleModel.find_riddles_for_game(game_id)}
+        with self._lock:
+            self._games[game_id] = (version, riddles)
+        return riddles
+
+
+class GameLocationIndex:
+    """
+    Indeks przestrzenny gier, zbudowany na podstawie położenia pierwszej zagadki każdej z gier.
+
+    Indeks jest budowany przy pierwszym użyciu i przebudowywany po każdej zmianie treści gier.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._revision = None
+
+    def nearby(self, latitude, longitude, distance):
+        """
+        Wyszukuje gry, których pierwsza zagadka znajduje się w zadanej odległości
+
+        :param latitude: Szerokość geograficzna punktu odniesienia (w stopniach)
+        :param longitude: Długość geograficzna punktu odniesienia (w stopniach)
+        :param distance: Odległość w metrach
+        :return: Lista krotek (odległość w metrach, słownik z informacjami o grze), posortowana według odległości
+        """
+        return self.load().within(latitude, longitude, distance)
+
+    def load(self):
+        """
+        Pobiera indeks, budując go ponownie, jeżeli treść gier zmieniła się od jego utworzenia
+
+        :return: Obiekt klasy GridIndex
+        """
+        revision = content_versions.revision
+        index = self._index
+        if index is None or self._revision != revision:
+            index = GridIndex()
+            for game_id, title, description, riddles, riddle_lat, riddle_lon in RiddleModel.find_first_riddles():
+                index.insert(riddle_lat, riddle_lon, {
+                    'id': game_id,
+                    'title': title,
+                    'description': description,
+                    'riddles': riddles
+                })
+            with self._lock:
+                self._index = index
+                self._revision = revision
+        return index
+
+
+revoked_tokens = RevokedTokenCache()
+content_versions = ContentVersionCache()
+responses = ResponseCache()
+riddle_geometry = RiddleGeometryCache()
+game_locations = GameLocationIndex()
@@ -0,0 +1,181 @@
+"""
+Moduł zawierający funkcje pomocnicze do obliczeń geograficznych
+"""
+import math
+
+import numpy as np
+
+EARTH_RADIUS = 6371008.8
+"""Średni promień Ziemi w metrach"""
+
+METERS_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+"""Długość jednego stopnia szerokości geograficznej w metrach"""
+
+EQUIRECTANGULAR_TOLERANCE = 0.01
+"""Względny margines błędu przybliżenia równoodległościowego, poza którym wynik uznaje się za rozstrzygający"""
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Oblicza odległość między dwoma punktami na powierzchni Ziemi ze wzoru haversine
+
+    :param lat1: Szerokość geograficzna pierwszego punktu (w stopniach)
+    :param lon1: Długość geograficzna pierwszego punktu (w stopniach)
+    :param lat2: Szerokość geograficzna drugiego punktu (w stopniach)
+    :param lon2: Długość geograficzna drugiego punktu (w stopniach)
+    :return: Odległość w metrach
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_array(lat, lon, latitudes, longitudes):
+    """
+    Oblicza odległości jednego punktu od wielu punktów jednocześnie, ze wzoru haversine
+
+    :param lat: Szerokość geograficzna punktu odniesienia (w stopniach)
+    :param lon: Długość geograficzna punktu odniesienia (w stopniach)
+    :param latitudes: Tablica NumPy szerokości geograficznych (w stopniach)
+    :param longitudes: Tablica NumPy długości geograficznych (w stopniach)
+    :return: Tablica NumPy odległości w metrach
+    """
+    phi1 = math.radians(lat)
+    phi2 = np.radians(latitudes)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(longitudes - lon)
+    a = np.sin(d_phi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+class RiddleGeometry:
+    """
+    Wstępnie przeliczona geometria obszaru, w którym znajduje się rozwiązanie zagadki
+    """
+    __slots__ = ('latitude', 'longitude', 'radius', '_lat_rad', '_cos_lat', '_inner_sq', '_outer_sq')
+
+    def __init__(self, latitude, longitude, radius):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+        self._lat_rad = math.radians(latitude)
+        self._cos_lat = math.cos(self._lat_rad)
+        self._inner_sq = (radius * (1 - EQUIRECTANGULAR_TOLERANCE)) ** 2
+        self._outer_sq = (radius * (1 + EQUIRECTANGULAR_TOLERANCE)) ** 2
+
+    @classmethod
+    def from_riddle(cls, riddle):
+        """
+        Tworzy geometrię na podstawie zagadki
+
+        :param riddle: Obiekt klasy RiddleModel
+        :return: Obiekt klasy RiddleGeometry
+        """
+        return cls(riddle.latitude, riddle.longitude, riddle.radius if riddle.radius is not None else 100)
+
+    def distance(self, latitude, longitude):
+        """
+        Oblicza dokładną odległość punktu od środka obszaru
+
+        :param latitude: Szerokość geograficzna punktu (w stopniach)
+        :param longitude: Długość geograficzna punktu (w stopniach)
+        :return: Odległość w metrach
+        """
+        return haversine(self.latitude, self.longitude, latitude, longitude)
+
+    def first_inside(self, latitudes, longitudes):
+        """
+        Wyszukuje pierwszy punkt leżący w obszarze zagadki
+
+        :param latitudes: Tablica NumPy szerokości geograficznych (w stopniach)
+        :param longitudes: Tablica NumPy długości geograficznych (w stopniach)
+        :return: Indeks pierwszego punktu w obszarze lub None, jeżeli żaden punkt nie leży w obszarze
+        """
+        inside = np.flatnonzero(haversine_array(self.latitude, self.longitude, latitudes, longitudes) <= self.radius)
+        return int(inside[0]) if inside.size else None
+
+    def contains(self, latitude, longitude):
+        """
+        Sprawdza, czy punkt znajduje się w obszarze zagadki.
+
+        Odległość jest najpierw szacowana przybliżeniem równoodległościowym. Dokładny wzór haversine jest stosowany
+        tylko wtedy, gdy punkt leży blisko granicy obszaru.
+
+        :param latitude: Szerokość geograficzna punktu (w stopniach)
+        :param longitude: Długość geograficzna punktu (w stopniach)
+        :return: Informacja, czy punkt znajduje się w obszarze (True/False)
+        """
+        d_lon = (longitude - self.longitude + 180.0) % 360.0 - 180.0
+        x = math.radians(d_lon) * self._cos_lat * EARTH_RADIUS
+        y = (math.radians(latitude) - self._lat_rad) * EARTH_RADIUS
+        distance_sq = x * x + y * y
+        if distance_sq <= self._inner_sq:
+            return True
+        if distance_sq > self._outer_sq:
+            return False
+        return self.distance(latitude, longitude) <= self.radius
+
+
+class GridIndex:
+    """
+    Indeks przestrzenny dzielący powierzchnię Ziemi na komórki o stałym rozmiarze (w stopniach).
+
+    Wyszukiwanie punktów w zadanej odległości sprawdza tylko komórki pokrywające prostokąt opisany na okręgu
+    wyszukiwania, dzięki czemu jego koszt nie zależy od liczby wszystkich punktów w indeksie.
+    """
+    def __init__(self, cell_size=0.05):
+        self.cell_size = cell_size
+        self._columns = int(round(360.0 / cell_size))
+        self._cells = {}
+
+    def _row(self, latitude):
+        return int(math.floor(latitude / self.cell_size))
+
+    def _column(self, longitude):
+        return int(math.floor((longitude + 180.0) / self.cell_size))
+
+    def insert(self, latitude, longitude, item):
+        """
+        Dodaje punkt do indeksu
+
+        :param latitude: Szerokość geograficzna punktu (w stopniach)
+        :param longitude: Długość geograficzna punktu (w stopniach)
+        :param item: Obiekt powiązany z punktem
+        """
+        key = (self._row(latitude), self._column(longitude) % self._columns)
+        self._cells.setdefault(key, []).append((latitude, longitude, item))
+
+    def within(self, latitude, longitude, distance):
+        """
+        Wyszukuje punkty leżące w zadanej odległości od punktu odniesienia
+
+        :param latitude: Szerokość geograficzna punktu odniesienia (w stopniach)
+        :param longitude: Długość geograficzna punktu odniesienia (w stopniach)
+        :param distance: Odległość w metrach
+        :return: Lista krotek (odległość w metrach, obiekt), posortowana rosnąco według odległości
+        """
+        d_lat = distance / METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(89.0, abs(latitude) + d_lat)))
+        d_lon = distance / (METERS_PER_DEGREE * cos_lat)
+        min_row, max_row = self._row(latitude - d_lat), self._row(latitude + d_lat)
+        min_col, max_col = self._column(longitude - d_lon), self._column(longitude + d_lon)
+        span = min(max_col - min_col, self._columns - 1)
+        if abs(latitude) + d_lat >= 89.0:
+            min_col, span = 0, self._columns - 1
+        if (max_row - min_row + 1) * (span + 1) > len(self._cells):
+            cells = [points for (row, col), points in self._cells.items()
+                     if min_row <= row <= max_row and (col - min_col) % self._columns <= span]
+        else:
+            cells = [self._cells.get((row, (min_col + offset) % self._columns))
+                     for row in range(min_row, max_row + 1) for offset in range(span + 1)]
+        found = []
+        for points in cells:
+            for point_lat, point_lon, item in points or ():
+                point_distance = haversine(latitude, longitude, point_lat, point_lon)
+                if point_distance <= distance:
+                    found.append((point_distance, item))
+        found.sort(key=lambda pair: pair[0])
+        return found
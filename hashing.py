@@ -0,0 +1,131 @@
+"""
+Moduł odpowiadający za obliczanie i sprawdzanie skrótów haseł.
+
+Obliczenia wykonywane są w osobnej puli procesów o ograniczonym rozmiarze, dzięki czemu nie blokują wątków
+obsługujących pozostałe zapytania. Liczba oczekujących zadań jest ograniczona - po jej przekroczeniu zadanie jest
+natychmiast odrzucane wyjątkiem HashingOverloadedError.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from passlib.hash import pbkdf2_sha256 as sha256
+
+
+class HashingOverloadedError(Exception):
+    """
+    Wyjątek zgłaszany, gdy kolejka zadań obliczania skrótów haseł jest pełna lub wynik nie został obliczony w czasie
+    ``PASSWORD_HASH_TIMEOUT`` sekund
+    """
+
+
+def _hash(password, rounds):
+    return sha256.using(rounds=rounds).hash(password)
+
+
+def _verify(password, pwdhash):
+    return sha256.verify(password, pwdhash)
+
+
+class PasswordHasher:
+    """
+    Pula procesów obliczających skróty haseł w standardzie PBKDF2-SHA256.
+
+    Konfiguracja pochodzi z ustawień aplikacji: ``PASSWORD_HASH_ROUNDS`` (liczba iteracji),
+    ``PASSWORD_HASH_WORKERS`` (liczba procesów; 0 oznacza obliczenia w bieżącym wątku),
+    ``PASSWORD_HASH_QUEUE`` (maksymalna liczba zadań wykonywanych i oczekujących) oraz
+    ``PASSWORD_HASH_TIMEOUT`` (maksymalny czas oczekiwania na wynik w sekundach).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+
+    def hash(self, password):
+        """
+        Generuje skrót hasła z aktualnie skonfigurowaną liczbą iteracji
+
+        :param password: Hasło
+        :return: Skrót hasła
+        """
+        return self._run(_hash, password, current_app.config['PASSWORD_HASH_ROUNDS'])
+
+    def verify(self, password, pwdhash):
+        """
+        Sprawdza poprawność hasła
+
+        :param password: Hasło do sprawdzenia
+        :param pwdhash: Zapisany skrót hasła
+        :return: Informacja o zgodności haseł (True/False)
+        """
+        return self._run(_verify, password, pwdhash)
+
+    @staticmethod
+    def needs_rehash(pwdhash):
+        """
+        Sprawdza, czy skrót hasła został wygenerowany z nieaktualnymi parametrami
+
+        :param pwdhash: Zapisany skrót hasła
+        :return: Informacja, czy skrót należy wygenerować ponownie (True/False)
+        """
+        return sha256.using(rounds=current_app.config['PASSWORD_HASH_ROUNDS']).needs_update(pwdhash)
+
+    def shutdown(self):
+        """
+        Zamyka pulę procesów. Kolejne wywołanie utworzy nową pulę zgodnie z aktualną konfiguracją.
+        """
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self, workers):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, function, *args):
+        config = current_app.config
+        if config['PASSWORD_HASH_WORKERS'] <= 0:
+            return function(*args)
+        with self._lock:
+            if self._pending >= config['PASSWORD_HASH_QUEUE']:
+                raise HashingOverloadedError()
+            self._pending += 1
+        try:
+            future = self._get_executor(config['PASSWORD_HASH_WORKERS']).submit(function, *args)
+        except BaseException as e:
+            self._release()
+            if isinstance(e, BrokenProcessPool):
+                self._reset()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=config['PASSWORD_HASH_TIMEOUT'])
+        except FutureTimeoutError:
+            future.cancel()
+            raise HashingOverloadedError()
+        except BrokenProcessPool:
+            self._reset()
+            raise
+
+    def _release(self, future=None):
+        """
+        Zmniejsza liczbę zadań wykonywanych i oczekujących. Wywoływana po zakończeniu lub anulowaniu zadania w puli
+        procesów, a nie po upływie czasu oczekiwania na wynik, dzięki czemu limit ``PASSWORD_HASH_QUEUE`` obejmuje
+        również zadania, na których wynik nikt już nie czeka.
+        """
+        with self._lock:
+            self._pending -= 1
+
+    def _reset(self):
+        with self._lock:
+            self._executor = None
+
+
+hasher = PasswordHasher()
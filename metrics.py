@@ -0,0 +1,313 @@
+"""
+Moduł odpowiadający za pomiary wydajności aplikacji.
+
+Dla każdego zapytania HTTP rejestrowany jest czas obsługi, liczba i łączny czas wykonania poleceń SQL, czas weryfikacji
+żetonu JWT oraz czas serializacji odpowiedzi do formatu JSON. Pomiary gromadzone są w pamięci procesu w postaci
+histogramów i udostępniane w formacie tekstowym Prometheus przez zasób ``/metrics``. Każdy proces roboczy serwera
+prowadzi własne pomiary.
+
+Zapytania, których obsługa trwała dłużej niż ``METRICS_SLOW_REQUEST_SECONDS`` sekund, są zapisywane w dzienniku
+``fieldgame.slow`` wraz z listą wykonanych poleceń SQL. Rejestrowana jest również liczba i czas wykonania zadań
+wykonywanych w tle przez bieżący proces (moduł scheduler).
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from functools import partial, wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import verify_jwt_in_request, verify_jwt_refresh_token_in_request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0)
+MAX_LOGGED_STATEMENTS = 100
+MAX_STATEMENT_LENGTH = 500
+
+slow_log = logging.getLogger("fieldgame.slow")
+
+
+class Histogram:
+    """
+    Histogram wartości z podziałem na etykiety, zgodny z typem ``histogram`` formatu Prometheus
+    """
+    def __init__(self, name, description, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labels):
+        """
+        Rejestruje wartość
+
+        :param value: Wartość
+        :param labels: Wartości etykiet w kolejności podanej w konstruktorze
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        """
+        Zapisuje histogram w formacie tekstowym Prometheus
+
+        :return: Lista wierszy
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, [list(counts), total, count]) for labels, (counts, total, count)
+                            in self._series.items())
+        for labels, (counts, total, count) in series:
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, labels))
+            separator = "," if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{label_text}{separator}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+class Counter:
+    """
+    Licznik z podziałem na etykiety, zgodny z typem ``counter`` formatu Prometheus
+    """
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def inc(self, *labels):
+        """
+        Zwiększa wartość licznika o 1
+
+        :param labels: Wartości etykiet w kolejności podanej w konstruktorze
+        """
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + 1
+
+    def render(self):
+        """
+        Zapisuje licznik w formacie tekstowym Prometheus
+
+        :return: Lista wierszy
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, value in series:
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, labels))
+            lines.append(f"{self.name}{{{label_text}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+requests_total = Counter("fieldgame_requests_total", "HTTP requests by endpoint, method and status code",
+                         ("endpoint", "method", "status"))
+request_duration = Histogram("fieldgame_request_duration_seconds", "Time spent handling HTTP requests",
+                             ("endpoint", "method"))
+request_statements = Histogram("fieldgame_request_sql_statements", "SQL statements executed per HTTP request",
+                               ("endpoint",), STATEMENT_BUCKETS)
+request_db_time = Histogram("fieldgame_request_db_seconds", "Time spent executing SQL statements per HTTP request",
+                            ("endpoint",))
+jwt_duration = Histogram("fieldgame_jwt_verification_seconds", "Time spent verifying JWT tokens", ("endpoint",))
+serialization_duration = Histogram("fieldgame_serialization_seconds", "Time spent encoding JSON responses",
+                                   ("endpoint",))
+slow_requests_total = Counter("fieldgame_slow_requests_total", "HTTP requests slower than the configured threshold",
+                              ("endpoint",))
+job_runs_total = Counter("fieldgame_job_runs_total", "Background job runs by job and status", ("job", "status"))
+job_duration = Histogram("fieldgame_job_duration_seconds", "Time spent running background jobs", ("job",),
+                         JOB_BUCKETS)
+
+METRICS = (requests_total, request_duration, request_statements, request_db_time, jwt_duration,
+           serialization_duration, slow_requests_total, job_runs_total, job_duration)
+
+
+class RequestMetrics:
+    """
+    Pomiary dotyczące bieżącego zapytania HTTP
+    """
+    __slots__ = ('started', 'statements', 'db_time', 'log_statements')
+
+    def __init__(self, log_statements):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.log_statements = [] if log_statements else None
+
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+def _current():
+    return g.get('_metrics') if has_request_context() else None
+
+
+def before_request():
+    """
+    Rozpoczyna pomiary dotyczące zapytania
+    """
+    g._metrics = RequestMetrics(current_app.config['METRICS_SLOW_REQUEST_SECONDS'] is not None)
+
+
+def after_request(response):
+    """
+    Kończy pomiary dotyczące zapytania i zapisuje je w histogramach. Pomiary odpowiedzi przesyłanych w częściach
+    (np. ``/stats``, ``/stats/export``, ``/stats/stream``) zapisywane są dopiero po przesłaniu całej odpowiedzi.
+
+    :param response: Odpowiedź na zapytanie
+    :return: Niezmieniona odpowiedź
+    """
+    current = _current()
+    if current is None:
+        return response
+    finished = partial(
+        _record, current, _endpoint(), request.method, request.full_path if request.query_string else request.path,
+        response.status_code, current_app.config['METRICS_SLOW_REQUEST_SECONDS'],
+        response.mimetype != 'text/event-stream'
+    )
+    if response.is_streamed:
+        response.call_on_close(finished)
+    else:
+        finished()
+    return response
+
+
+def _record(current, endpoint, method, path, status, threshold, log_slow):
+    elapsed = time.perf_counter() - current.started
+    requests_total.inc(endpoint, method, status)
+    request_duration.observe(elapsed, endpoint, method)
+    request_statements.observe(current.statements, endpoint)
+    request_db_time.observe(current.db_time, endpoint)
+    if threshold is not None and elapsed >= threshold and log_slow:
+        slow_requests_total.inc(endpoint)
+        slow_log.warning(json.dumps({
+            'method': method,
+            'path': path,
+            'endpoint': endpoint,
+            'status': status,
+            'seconds': round(elapsed, 6),
+            'db_seconds': round(current.db_time, 6),
+            'statement_count': current.statements,
+            'statements': current.log_statements
+        }))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    current = _current()
+    if started is None or current is None:
+        return
+    elapsed = time.perf_counter() - started
+    current.statements += 1
+    current.db_time += elapsed
+    if current.log_statements is not None and len(current.log_statements) < MAX_LOGGED_STATEMENTS:
+        current.log_statements.append([round(elapsed * 1000, 3), statement[:MAX_STATEMENT_LENGTH]])
+
+
+def jwt_required(fn):
+    """
+    Dekorator wymagający poprawnego żetonu dostępowego JWT (odpowiednik ``flask_jwt_extended.jwt_required``),
+    mierzący czas weryfikacji żetonu
+
+    :param fn: Metoda zasobu
+    :return: Metoda zasobu poprzedzona weryfikacją żetonu
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            verify_jwt_in_request()
+        finally:
+            jwt_duration.observe(time.perf_counter() - started, _endpoint())
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def jwt_refresh_token_required(fn):
+    """
+    Dekorator wymagający poprawnego żetonu odświeżającego JWT (odpowiednik
+    ``flask_jwt_extended.jwt_refresh_token_required``), mierzący czas weryfikacji żetonu
+
+    :param fn: Metoda zasobu
+    :return: Metoda zasobu poprzedzona weryfikacją żetonu
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            verify_jwt_refresh_token_in_request()
+        finally:
+            jwt_duration.observe(time.perf_counter() - started, _endpoint())
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def timed_representation(representation):
+    """
+    Tworzy funkcję serializującą odpowiedź zasobu (reprezentację biblioteki Flask-RESTful), mierzącą czas serializacji
+
+    :param representation: Funkcja serializująca odpowiedź
+    :return: Funkcja serializująca odpowiedź, mierząca czas serializacji
+    """
+    @wraps(representation)
+    def wrapper(data, code, headers=None):
+        started = time.perf_counter()
+        response = representation(data, code, headers)
+        serialization_duration.observe(time.perf_counter() - started, _endpoint())
+        return response
+    return wrapper
+
+
+def render():
+    """
+    Zapisuje wszystkie pomiary w formacie tekstowym Prometheus
+
+    :return: Tekst w formacie Prometheus
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app, api):
+    """
+    Rejestruje funkcje wykonujące pomiary w aplikacji oraz w silnikach bazy danych
+
+    :param app: Obiekt aplikacji Flask
+    :param api: Obiekt klasy flask_restful.Api
+    """
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.before_request(before_request)
+    app.after_request(after_request)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    api.representations['application/json'] = timed_representation(api.representations['application/json'])
@@ -0,0 +1,238 @@
+"""
+Moduł odpowiadający za tworzenie i aktualizację schematu bazy danych.
+
+Numer wersji schematu przechowywany jest w tabeli ``schema_version``. Podczas uruchamiania aplikacji wykonywane są
+kolejno wszystkie migracje o numerach wyższych niż zapisany, dzięki czemu pliki bazy danych utworzone przez starsze
+wersje aplikacji są aktualizowane bez utraty danych. Każda migracja jest idempotentna - równoległe uruchomienie
+migracji przez kilka procesów serwera lub ponowne wykonanie przerwanej migracji nie powoduje błędów.
+
+Nowe migracje należy dopisywać na końcu listy ``MIGRATIONS``.
+"""
+import bisect
+
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+import models
+
+VERSION_TABLE = "schema_version"
+
+
+def _create_missing_indexes(connection, table):
+    """
+    Tworzy zadeklarowane w modelu indeksy tabeli, których brakuje w bazie danych
+
+    :param connection: Połączenie z bazą danych
+    :param table: Tabela (obiekt klasy sqlalchemy.Table)
+    """
+    existing = {index['name'] for index in db.inspect(connection).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(connection)
+
+
+def create_tables(connection):
+    """
+    Tworzy brakujące tabele wraz z indeksami
+
+    :param connection: Połączenie z bazą danych
+    """
+    db.Model.metadata.create_all(connection)
+
+
+def add_token_expiry(connection):
+    """
+    Dodaje kolumnę z datą wygaśnięcia żetonu do tabeli unieważnionych żetonów
+
+    :param connection: Połączenie z bazą danych
+    """
+    table = models.RevokedTokenModel.__table__
+    columns = {column['name'] for column in db.inspect(connection).get_columns(table.name)}
+    if 'expires' not in columns:
+        connection.execute(f'ALTER TABLE {table.name} ADD COLUMN expires DATETIME')
+    _create_missing_indexes(connection, table)
+
+
+def remove_duplicates(connection):
+    """
+    Usuwa zduplikowane wpisy w tabeli wyników (pozostawiając wpis z największym postępem) oraz zduplikowane zagadki
+    (pozostawiając zagadkę dodaną jako pierwszą), aby umożliwić utworzenie indeksów unikalnych
+
+    :param connection: Połączenie z bazą danych
+    """
+    scoreboard = models.ScoreboardEntryModel.__table__
+    duplicates = connection.execute(
+        db.select([scoreboard.c.user_id, scoreboard.c.game_id])
+        .group_by(scoreboard.c.user_id, scoreboard.c.game_id)
+        .having(db.func.count() > 1)
+    ).fetchall()
+    removed = []
+    for user_id, game_id in duplicates:
+        rows = connection.execute(
+            db.select([scoreboard.c.id])
+            .where(db.and_(scoreboard.c.user_id == user_id, scoreboard.c.game_id == game_id))
+            .order_by(db.func.coalesce(scoreboard.c.finished, False).desc(), scoreboard.c.current_riddle.desc(),
+                      scoreboard.c.id)
+        ).fetchall()
+        removed.extend(row.id for row in rows[1:])
+    for start in range(0, len(removed), 500):
+        chunk = removed[start:start + 500]
+        for model, column in ((models.ProgressEventModel, 'entry_id'), (models.LeaderboardEntryModel, 'entry_id'),
+                              (models.ScoreboardEntryModel, 'id')):
+            table = model.__table__
+            connection.execute(table.delete().where(table.c[column].in_(chunk)))
+
+    riddles = models.RiddleModel.__table__
+    kept = db.select([db.func.min(riddles.c.id)]).group_by(riddles.c.game_id, riddles.c.riddle_no)
+    connection.execute(riddles.delete().where(riddles.c.id.notin_(kept)))
+
+
+def add_lookup_indexes(connection):
+    """
+    Tworzy indeksy kolumn wykorzystywanych przy wyszukiwaniu wpisów w tabeli wyników, zagadek i zdarzeń
+
+    :param connection: Połączenie z bazą danych
+    """
+    for model in (models.ScoreboardEntryModel, models.RiddleModel, models.ProgressEventModel):
+        _create_missing_indexes(connection, model.__table__)
+
+
+def add_split_times(connection):
+    """
+    Tworzy tabelę międzyczasów i wypełnia ją na podstawie zdarzeń zapisanych dotąd w dzienniku zdarzeń
+
+    :param connection: Połączenie z bazą danych
+    """
+    table = models.SplitTimeModel.__table__
+    table.create(connection, checkfirst=True)
+    _create_missing_indexes(connection, table)
+    if connection.execute(db.select([db.func.count()]).select_from(table)).scalar():
+        return
+    scoreboard = models.ScoreboardEntryModel.__table__
+    events = models.ProgressEventModel.__table__
+    previous = {(row.id, 0): row.time_begin
+                for row in connection.execute(db.select([scoreboard.c.id, scoreboard.c.time_begin]))}
+    rows = connection.execute(
+        db.select([events.c.entry_id, events.c.user_id, events.c.game_id, events.c.kind, events.c.riddle_no,
+                   events.c.created])
+        .where(events.c.kind != models.ProgressEventModel.START)
+    ).fetchall()
+    splits = models.SplitTimeModel.splits_from_events([tuple(row) for row in rows], previous)
+    for start in range(0, len(splits), 500):
+        connection.execute(table.insert(), splits[start:start + 500])
+
+
+def add_game_counters(connection):
+    """
+    Tworzy tabelę liczników statystyk gier i wypełnia ją na podstawie bieżącego stanu tabeli wyników
+
+    :param connection: Połączenie z bazą danych
+    """
+    counters = models.GameCounterModel
+    table = counters.__table__
+    table.create(connection, checkfirst=True)
+    if connection.execute(db.select([db.func.count()]).select_from(table)).scalar():
+        return
+    scoreboard = models.ScoreboardEntryModel.__table__
+    keys = []
+    for row in connection.execute(db.select([scoreboard.c.game_id, scoreboard.c.current_riddle, scoreboard.c.finished,
+                                             scoreboard.c.time_begin, scoreboard.c.time_end])):
+        keys.extend((row.game_id, counters.REACHED, riddle_no) for riddle_no in range(1, row.current_riddle + 1))
+        if row.finished:
+            keys.append((row.game_id, counters.FINISHED, 0))
+            if row.time_end is not None:
+                seconds = (row.time_end - row.time_begin).total_seconds()
+                bucket = bisect.bisect_left(counters.FINISH_TIME_BUCKETS, seconds)
+                keys.append((row.game_id, counters.FINISH_TIME, bucket))
+    values = {}
+    for key in keys:
+        values[key] = values.get(key, 0) + 1
+    rows = [{'game_id': game_id, 'metric': metric, 'bucket': bucket, 'value': value}
+            for (game_id, metric, bucket), value in values.items()]
+    for start in range(0, len(rows), 500):
+        connection.execute(table.insert(), rows[start:start + 500])
+
+
+def add_archive(connection):
+    """
+    Tworzy tabelę archiwum ukończonych gier oraz indeks daty zakończenia gry w tabeli wyników, wykorzystywany przy
+    wyszukiwaniu wpisów do przeniesienia
+
+    :param connection: Połączenie z bazą danych
+    """
+    table = models.ArchivedEntryModel.__table__
+    table.create(connection, checkfirst=True)
+    _create_missing_indexes(connection, table)
+    _create_missing_indexes(connection, models.ScoreboardEntryModel.__table__)
+
+
+def add_job_leases(connection):
+    """
+    Tworzy tabelę dzierżaw zadań wykonywanych w tle
+
+    :param connection: Połączenie z bazą danych
+    """
+    models.JobLeaseModel.__table__.create(connection, checkfirst=True)
+
+
+def add_idempotency_key_game(connection):
+    """
+    Dodaje kolumnę z identyfikatorem gry do tabeli kluczy idempotentności
+
+    :param connection: Połączenie z bazą danych
+    """
+    table = models.IdempotencyKeyModel.__table__
+    columns = {column['name'] for column in db.inspect(connection).get_columns(table.name)}
+    if 'game_id' not in columns:
+        connection.execute(f'ALTER TABLE {table.name} ADD COLUMN game_id INTEGER')
+
+
+MIGRATIONS = [
+    (1, create_tables),
+    (2, add_token_expiry),
+    (3, remove_duplicates),
+    (4, add_lookup_indexes),
+    (5, add_split_times),
+    (6, add_game_counters),
+    (7, add_archive),
+    (8, add_job_leases),
+    (9, add_idempotency_key_game),
+]
+
+
+def current_version(connection):
+    """
+    Pobiera numer wersji schematu bazy danych
+
+    :param connection: Połączenie z bazą danych
+    :return: Numer wersji schematu lub 0, jeżeli schemat nie był dotąd aktualizowany
+    """
+    return connection.execute(f'SELECT MAX(version) FROM {VERSION_TABLE}').scalar() or 0
+
+
+def upgrade(engine=None, retries=3):
+    """
+    Aktualizuje schemat bazy danych do najnowszej wersji. Każda migracja wykonywana jest w osobnej transakcji wraz
+    z zapisem nowego numeru wersji.
+
+    :param engine: Silnik bazy danych (domyślnie silnik aplikacji)
+    :param retries: Liczba prób wykonania migracji w przypadku konfliktu z innym procesem
+    :return: Numer wersji schematu po aktualizacji
+    """
+    engine = engine or db.engine
+    with engine.begin() as connection:
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version INTEGER NOT NULL)')
+    for version, migration in MIGRATIONS:
+        for attempt in range(retries):
+            try:
+                with engine.begin() as connection:
+                    if current_version(connection) >= version:
+                        break
+                    migration(connection)
+                    connection.execute(f'INSERT INTO {VERSION_TABLE} (version) VALUES ({version})')
+                break
+            except DBAPIError:
+                if attempt == retries - 1:
+                    raise
+    with engine.connect() as connection:
+        return current_version(connection)
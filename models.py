@@ -1,9 +1,30 @@
 """
 Moduł zawierający modele wpisów do bazy danych oraz metody pomocnicze
 """
+from flask import current_app
+
 from app import db
-from passlib.hash import pbkdf2_sha256 as sha256
+from hashing import hasher
+from serialization import legacy_datetime, objects_to_dicts, rows_to_dicts
+import bisect
 import datetime as dt
+import heapq
+import json
+
+
+def insert_or_ignore(table):
+    """
+    Tworzy polecenie INSERT pomijane przez bazę danych, jeżeli naruszałoby ograniczenie unikalności
+
+    :param table: Tabela (obiekt klasy sqlalchemy.Table)
+    :return: Polecenie INSERT właściwe dla używanej bazy danych
+    """
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    if db.engine.dialect.name == 'mysql':
+        return table.insert().prefix_with("IGNORE")
+    return table.insert().prefix_with("OR IGNORE")
 
 
 class UserModel(db.Model):
@@ -44,15 +65,33 @@ class UserModel(db.Model):
         """
         return cls.query.filter_by(id=uid).first()
 
+    @classmethod
+    def is_admin(cls, uid):
+        """
+        Sprawdza w bazie danych, czy użytkownik posiada prawa administratora aplikacji
+
+        :param uid: Identyfikator użytkownika w bazie danych
+        :return: Informacja o posiadaniu praw administratora (True/False)
+        """
+        return bool(db.session.query(cls.isadmin).filter(cls.id == uid).scalar())
+
+    def get_claims(self):
+        """
+        Tworzy zestaw dodatkowych informacji zapisywanych w żetonie JWT
+
+        :return: Słownik zawierający identyfikator użytkownika oraz informację o prawach administratora
+        """
+        return {"id": self.id, "admin": self.isadmin if self.isadmin is not None else False}
+
     @staticmethod
     def generate_hash(password):
         """
         Generuje skrót hasła
 
         :param password: Hasło
-        :return: Skrót hasła w standardzie SHA-256
+        :return: Skrót hasła w standardzie PBKDF2-SHA256
         """
-        return sha256.hash(password)
+        return hasher.hash(password)
 
     @staticmethod
     def verify_hash(password, pwdhash):
@@ -63,7 +102,17 @@ class UserModel(db.Model):
         :param pwdhash: Skrót hasła wygenerowany podczas rejestracji
         :return: Informacja o zgodności haseł (True/False)
         """
-        return sha256.verify(password, pwdhash)
+        return hasher.verify(password, pwdhash)
+
+    def rehash_if_needed(self, password):
+        """
+        Generuje ponownie skrót hasła, jeżeli zapisany skrót korzysta z nieaktualnych parametrów
+
+        :param password: Poprawne hasło użytkownika
+        """
+        if hasher.needs_rehash(self.password):
+            self.password = UserModel.generate_hash(password)
+            self.save_to_db()
 
 
 class RevokedTokenModel(db.Model):
@@ -73,7 +122,8 @@ class RevokedTokenModel(db.Model):
 
     __tablename__ = 'revoked_tokens'
     id = db.Column(db.Integer, primary_key=True)
-    jti = db.Column(db.String(120))
+    jti = db.Column(db.String(120), index=True)
+    expires = db.Column(db.DateTime, index=True)
 
     def add(self):
         """
@@ -93,6 +143,98 @@ class RevokedTokenModel(db.Model):
         query = cls.query.filter_by(jti=jti).first()
         return bool(query)
 
+    @classmethod
+    def find_since(cls, last_id, missing_ids=()):
+        """
+        Pobiera żetony unieważnione po wskazanym wpisie oraz wpisy o wskazanych identyfikatorach
+
+        :param last_id: Identyfikator ostatniego znanego wpisu
+        :param missing_ids: Identyfikatory wcześniejszych wpisów, których dotąd nie odczytano (np. zapisywanych przez
+                            transakcje zatwierdzone później niż transakcje zapisujące kolejne wpisy)
+        :return: Lista krotek (identyfikator wpisu, identyfikator żetonu, data wygaśnięcia żetonu)
+        """
+        condition = cls.id > last_id
+        if missing_ids:
+            condition = db.or_(condition, cls.id.in_(list(missing_ids)))
+        return db.session.query(cls.id, cls.jti, cls.expires) \
+            .filter(condition) \
+            .order_by(cls.id) \
+            .all()
+
+    @classmethod
+    def prune_expired(cls):
+        """
+        Usuwa z bazy danych wpisy dotyczące żetonów, których ważność już wygasła. Najnowszy wpis nie jest usuwany, aby
+        baza SQLite nie przydzieliła jego identyfikatora ponownie (pamięci podręczne procesów pobierają tylko wpisy
+        o identyfikatorach większych od ostatnio znanego).
+
+        :return: Liczba usuniętych wpisów
+        """
+        newest = db.session.query(db.func.max(cls.id)).scalar()
+        if newest is None:
+            return 0
+        deleted = cls.query.filter(cls.expires < dt.datetime.utcnow(), cls.id < newest) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+class ContentVersionModel(db.Model):
+    """
+    Model przechowujący w bazie danych numery wersji treści gier (listy gier, szczegółów gry oraz jej zagadek).
+
+    Numery wersji są rosnące w obrębie całej tabeli - każda zmiana otrzymuje numer większy od wszystkich
+    dotychczasowych, dzięki czemu zmiany wprowadzone od ostatniego odczytu można pobrać jednym zapytaniem.
+    Numery przydzielane są przez zwiększenie licznika (wpis o kluczu ``REVISION_KEY``) w transakcji zapisującej
+    zmianę. Blokada wpisu licznika szereguje transakcje, więc numery są unikalne, a zmiany zatwierdzane są w kolejności
+    rosnących numerów.
+    """
+    __tablename__ = "content_versions"
+
+    REVISION_KEY = "@revision"
+
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, index=True)
+
+    @classmethod
+    def bump(cls, keys):
+        """
+        Zwiększa numery wersji wskazanych treści
+
+        :param keys: Klucze treści (np. ``catalogue`` lub ``game:1``)
+        :return: Słownik przyporządkowujący kluczom nowe numery wersji
+        """
+        table = cls.__table__
+        increment = table.update().where(table.c.key == cls.REVISION_KEY) \
+            .values(version=table.c.version + len(keys))
+        try:
+            if db.session.execute(increment).rowcount == 0:
+                db.session.execute(insert_or_ignore(table).from_select(
+                    ['key', 'version'],
+                    db.select([db.literal(cls.REVISION_KEY), db.func.coalesce(db.func.max(table.c.version), 0)])
+                ))
+                db.session.execute(increment)
+            current = db.session.query(cls.version).filter(cls.key == cls.REVISION_KEY).scalar() - len(keys)
+            versions = {}
+            for offset, key in enumerate(keys, 1):
+                versions[key] = current + offset
+                db.session.merge(cls(key=key, version=current + offset))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return versions
+
+    @classmethod
+    def find_since(cls, last_version):
+        """
+        Pobiera treści zmienione po wskazanej wersji
+
+        :param last_version: Ostatni znany numer wersji
+        :return: Lista krotek (klucz, numer wersji)
+        """
+        return db.session.query(cls.key, cls.version).filter(cls.version > last_version).all()
+
 
 class GameModel(db.Model):
     """
@@ -100,6 +242,8 @@ class GameModel(db.Model):
     """
     __tablename__ = "games"
 
+    FIELDS = ('id', 'title', 'description', 'riddles')
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(500))
@@ -122,7 +266,23 @@ class GameModel(db.Model):
 
         :return: Wszystkie rekordy z tabeli gier, zapisane w postaci JSON
         """
-        return cls.serialize(GameModel.query.all())
+        rows = db.session.query(*[getattr(cls, field) for field in cls.FIELDS]).all()
+        return {'games': rows_to_dicts(rows, cls.FIELDS)}
+
+    @classmethod
+    def page(cls, fields, after=None, limit=50):
+        """
+        Pobiera stronę listy gier posortowanej według identyfikatora, wczytując z bazy danych tylko wybrane kolumny
+
+        :param fields: Nazwy pól do pobrania (podzbiór FIELDS)
+        :param after: Identyfikator ostatniej gry z poprzedniej strony
+        :param limit: Maksymalna liczba gier na stronie
+        :return: Lista krotek zawierających identyfikator gry (``key_id``) oraz wybrane pola
+        """
+        query = db.session.query(cls.id.label('key_id'), *[getattr(cls, field) for field in fields])
+        if after is not None:
+            query = query.filter(cls.id > after)
+        return query.order_by(cls.id).limit(limit).all()
 
     @classmethod
     def serialize(cls, objects):
@@ -132,15 +292,7 @@ class GameModel(db.Model):
         :param objects: Lista obiektów klasy GameModel
         :return: Słownik zgodny z notacją JSON zawierający informacje o obiektach klasy GameModel
         """
-        def to_json(x):
-            return {
-                'id': x.id,
-                'title': x.title,
-                'description': x.description,
-                'riddles': x.riddles
-            }
-
-        return {'games': list(map(lambda x: to_json(x), objects))}
+        return {'games': objects_to_dicts(objects, cls.FIELDS)}
 
     def save_to_db(self):
         """
@@ -149,12 +301,35 @@ class GameModel(db.Model):
         db.session.add(self)
         db.session.commit()
 
+    def save_with_riddles(self, riddles):
+        """
+        Dodaje grę wraz z zagadkami do bazy danych w jednej transakcji.
+
+        Zagadki są wstawiane jednym poleceniem INSERT wykonywanym wsadowo (executemany). W przypadku błędu żaden
+        rekord nie zostaje zapisany.
+
+        :param riddles: Lista słowników z danymi zagadek (bez identyfikatora gry)
+        """
+        try:
+            db.session.add(self)
+            db.session.flush()
+            db.session.execute(RiddleModel.__table__.insert(), [dict(riddle, game_id=self.id) for riddle in riddles])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
 
 class RiddleModel(db.Model):
     """
     Model przechowujący w bazie danych informacje o zagadkach powiązanych z grami
     """
     __tablename__ = "riddles"
+    __table_args__ = (
+        db.Index("uq_riddles_game_riddle", "game_id", "riddle_no", unique=True),
+    )
+
+    FIELDS = ('id', 'game_id', 'description', 'riddle_no', 'latitude', 'longitude', 'radius', 'dominant_object')
 
     id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, db.ForeignKey("games.id"))
@@ -175,6 +350,22 @@ class RiddleModel(db.Model):
         """
         return cls.query.filter_by(game_id=game_id).order_by(cls.riddle_no).all()
 
+    @classmethod
+    def find_first_riddles(cls):
+        """
+        Wyszukuje pierwszą zagadkę każdej gry wraz z informacjami o grze
+
+        :return: Lista krotek (identyfikator gry, tytuł, opis, liczba zagadek, szerokość i długość geograficzna
+                 pierwszej zagadki)
+        """
+        first = db.session.query(cls.game_id, db.func.min(cls.riddle_no).label('riddle_no')) \
+            .group_by(cls.game_id).subquery()
+        return db.session.query(GameModel.id, GameModel.title, GameModel.description, GameModel.riddles,
+                                cls.latitude, cls.longitude) \
+            .join(first, db.and_(cls.game_id == first.c.game_id, cls.riddle_no == first.c.riddle_no)) \
+            .join(GameModel, GameModel.id == cls.game_id) \
+            .all()
+
     @classmethod
     def print_riddles_for_game(cls, game_id):
         """
@@ -183,7 +374,9 @@ class RiddleModel(db.Model):
         :param game_id: Identyfikator gry
         :return: Wszystkie pasujące rekordy w tabeli zagadek, zapisane zgodnie z notacją JSON
         """
-        return cls.serialize(cls.find_riddles_for_game(game_id))
+        rows = db.session.query(*[getattr(cls, field) for field in cls.FIELDS]) \
+            .filter(cls.game_id == game_id).order_by(cls.riddle_no).all()
+        return {'riddles': rows_to_dicts(rows, cls.FIELDS)}
 
     @classmethod
     def serialize(cls, objects):
@@ -193,18 +386,7 @@ class RiddleModel(db.Model):
         :param objects: Lista obiektów klasy RiddleModel
         :return: Słownik zgodny z notacją JSON zawierający informacje o obiektach klasy RiddleModel
         """
-        def to_json(x):
-            return {
-                'id': x.id,
-                'game_id': x.game_id,
-                'description': x.description,
-                'riddle_no': x.riddle_no,
-                'latitude': x.latitude,
-                'longitude': x.longitude,
-                'radius': x.radius,
-                'dominant_object': x.dominant_object
-            }
-        return {'riddles': list(map(lambda x: to_json(x), objects))}
+        return {'riddles': objects_to_dicts(objects, cls.FIELDS)}
 
     def save_to_db(self):
         """
@@ -220,12 +402,20 @@ class ScoreboardEntryModel(db.Model):
     """
     __tablename__ = "scoreboard"
 
+    FIELDS = ('id', 'user_id', 'game_id', 'finished', 'current_riddle', 'time_begin', 'time_end')
+    FORMATTERS = {'time_begin': legacy_datetime, 'time_end': legacy_datetime}
+    __table_args__ = (
+        db.Index("uq_scoreboard_user_game", "user_id", "game_id", unique=True),
+        db.Index("ix_scoreboard_user_time", "user_id", "time_begin"),
+        db.Index("ix_scoreboard_time_end", "time_end"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     game_id = db.Column(db.Integer, db.ForeignKey("games.id"))
     finished = db.Column(db.Boolean, default=False)
     current_riddle = db.Column(db.Integer, nullable=False, default=1)
-    time_begin = db.Column(db.DateTime, default=dt.datetime.now())
+    time_begin = db.Column(db.DateTime, default=dt.datetime.now)
     time_end = db.Column(db.DateTime)
 
     @classmethod
@@ -238,25 +428,123 @@ class ScoreboardEntryModel(db.Model):
         return cls.query.all()
 
     @classmethod
-    def filter_by_user(cls, username):
+    def get_statistics(cls, batch_size=500):
+        """
+        Pobiera postęp wszystkich graczy we wszystkich grach jednym zapytaniem do bazy danych.
+
+        Zapytanie łączy tabelę wyników z tabelami użytkowników i gier, pobierając wyłącznie kolumny
+        potrzebne do wygenerowania statystyk. Wiersze wczytywane są z bazy danych partiami w trakcie iteracji.
+
+        :param batch_size: Liczba wierszy wczytywanych jednocześnie
+        :return: Iterator krotek (nazwa użytkownika, tytuł gry, numer zagadki, ukończenie, czas rozpoczęcia,
+                 czas zakończenia)
+        """
+        return db.session.query(
+            UserModel.username,
+            GameModel.title,
+            cls.current_riddle,
+            cls.finished,
+            cls.time_begin,
+            cls.time_end
+        ).join(UserModel, cls.user_id == UserModel.id) \
+            .join(GameModel, cls.game_id == GameModel.id) \
+            .yield_per(batch_size)
+
+    @classmethod
+    def get_export(cls, game_id=None, since=None, until=None, batch_size=500, include_archived=False):
+        """
+        Pobiera postęp graczy wraz z nazwami użytkowników i tytułami gier na potrzeby raportów, posortowany według
+        kolejności dołączania graczy do gier.
+
+        Wiersze wczytywane są z bazy danych partiami w trakcie iteracji (na serwerach bazy danych - za pomocą kursora
+        po stronie serwera), dzięki czemu zużycie pamięci nie zależy od liczby wierszy. Wpisy z archiwum są
+        odczytywane równolegle i scalane według identyfikatora wpisu.
+
+        :param game_id: Identyfikator gry (None - wszystkie gry)
+        :param since: Najwcześniejsza data dołączenia do gry (włącznie, None - bez ograniczenia)
+        :param until: Data dołączenia do gry, przed którą musi dołączyć gracz (None - bez ograniczenia)
+        :param batch_size: Liczba wierszy wczytywanych jednocześnie
+        :param include_archived: Informacja, czy uwzględnić wpisy z archiwum
+        :return: Iterator krotek (identyfikator wpisu, identyfikator użytkownika, nazwa użytkownika, identyfikator
+                 gry, tytuł gry, numer zagadki, ukończenie, czas rozpoczęcia, czas zakończenia)
+        """
+        query = db.session.query(
+            cls.id,
+            cls.user_id,
+            UserModel.username,
+            cls.game_id,
+            GameModel.title,
+            cls.current_riddle,
+            cls.finished,
+            cls.time_begin,
+            cls.time_end
+        ).join(UserModel, cls.user_id == UserModel.id) \
+            .join(GameModel, cls.game_id == GameModel.id)
+        if game_id is not None:
+            query = query.filter(cls.game_id == game_id)
+        if since is not None:
+            query = query.filter(cls.time_begin >= since)
+        if until is not None:
+            query = query.filter(cls.time_begin < until)
+        rows = query.order_by(cls.id).yield_per(batch_size)
+        if not include_archived:
+            return rows
+        archived = ArchivedEntryModel.get_export(game_id, since, until, batch_size)
+        return heapq.merge(rows, archived, key=lambda row: row[0])
+
+    @classmethod
+    def filter_by_user(cls, user_id):
         """
         Pobiera postęp konkretnego użytkownika we wszystkich grach, do których dołączył
 
-        :param username: Nazwa użytkownika
+        :param user_id: Identyfikator użytkownika
         :return: Wszystkie pasujące rekordy w bazie danych, posortowane malejąco według daty dołączenia do gry
         """
-        user = UserModel.find_by_username(username)
-        return cls.query.filter_by(user_id=user.id).order_by(cls.time_begin.desc()).all()
+        return cls.query.filter_by(user_id=user_id).order_by(cls.time_begin.desc()).all()
 
     @classmethod
-    def print_by_user(cls, username):
+    def page_by_user(cls, user_id, fields, after=None, limit=50, include_archived=False):
+        """
+        Pobiera stronę listy gier, do których dołączył użytkownik, posortowanej malejąco według daty dołączenia do gry,
+        wczytując z bazy danych tylko wybrane kolumny
+
+        :param user_id: Identyfikator użytkownika
+        :param fields: Nazwy pól do pobrania (podzbiór FIELDS)
+        :param after: Klucz (data dołączenia do gry, identyfikator wpisu) ostatniego wpisu z poprzedniej strony
+        :param limit: Maksymalna liczba wpisów na stronie
+        :param include_archived: Informacja, czy uwzględnić wpisy z archiwum
+        :return: Lista krotek zawierających klucz wpisu (``key_time``, ``key_id``) oraz wybrane pola
+        """
+        query = db.session.query(cls.time_begin.label('key_time'), cls.id.label('key_id'),
+                                 *[getattr(cls, field) for field in fields]) \
+            .filter(cls.user_id == user_id)
+        if after is not None:
+            time_begin, entry_id = after
+            query = query.filter(db.or_(
+                cls.time_begin < time_begin,
+                db.and_(cls.time_begin == time_begin, cls.id < entry_id)
+            ))
+        rows = query.order_by(cls.time_begin.desc(), cls.id.desc()).limit(limit).all()
+        if include_archived:
+            rows = sorted(rows + ArchivedEntryModel.page_by_user(user_id, fields, after, limit),
+                          key=lambda row: (row.key_time, row.key_id), reverse=True)[:limit]
+        return rows
+
+    @classmethod
+    def print_by_user(cls, user_id, include_archived=False):
         """
         Wypisuje postęp użytkownika w grach, do których dołączył
 
-        :param username: Nazwa użytkownika
+        :param user_id: Identyfikator użytkownika
+        :param include_archived: Informacja, czy uwzględnić wpisy z archiwum
         :return: Postęp użytkownika w grach, do których dołączył, zapisany zgodnie z notacją JSON
         """
-        return cls.serialize(cls.filter_by_user(username))
+        rows = db.session.query(*[getattr(cls, field) for field in cls.FIELDS]) \
+            .filter(cls.user_id == user_id).order_by(cls.time_begin.desc()).all()
+        if include_archived:
+            rows = sorted(rows + ArchivedEntryModel.find_by_user(user_id, cls.FIELDS),
+                          key=lambda row: row.time_begin, reverse=True)
+        return {'game_data': rows_to_dicts(rows, cls.FIELDS, cls.FORMATTERS)}
 
     @classmethod
     def serialize(cls, objects):
@@ -266,40 +554,193 @@ class ScoreboardEntryModel(db.Model):
         :param objects: Lista obiektów klasy ScoreboardEntryModel
         :return: Słownik zgodny z notacją JSON zawierający informacje o obiektach klasy ScoreboardEntryModel
         """
-        def to_json(x):
-            return {
-                'id': x.id,
-                'user_id': x.user_id,
-                'game_id': x.game_id,
-                'finished': x.finished,
-                'current_riddle': x.current_riddle,
-                'time_begin': str(x.time_begin),
-                'time_end': str(x.time_end)
-            }
-        return {'game_data': list(map(lambda x: to_json(x), objects))}
+        return {'game_data': objects_to_dicts(objects, cls.FIELDS, cls.FORMATTERS)}
 
     @classmethod
-    def filter_by_user_and_game(cls, username, game_id):
+    def filter_by_user_and_game(cls, user_id, game_id):
         """
         Pobiera postęp użytkownika w wybranej grze
 
-        :param username: Nazwa użytkownika
+        :param user_id: Identyfikator użytkownika
         :param game_id: Identyfikator gry
         :return: Pierwszy pasujący rekord w bazie danych, zawierający informację o postępie w grze
         """
-        user = UserModel.find_by_username(username)
-        return cls.query.filter_by(user_id=user.id, game_id=game_id).first()
+        return cls.query.filter_by(user_id=user_id, game_id=game_id).first()
 
     @classmethod
-    def print_by_user_and_game(cls, username, game_id):
+    def print_by_user_and_game(cls, user_id, game_id, include_archived=False):
         """
         Wypisuje postęp użytkownika w wybranej grze
 
-        :param username: Nazwa użytkownika
+        :param user_id: Identyfikator użytkownika
         :param game_id: Identyfikator gry
+        :param include_archived: Informacja, czy szukać wpisu również w archiwum
         :return: Pierwszy pasujący rekord w bazie danych, zawierający informację o postępie w grze
         """
-        return cls.serialize([cls.filter_by_user_and_game(username, game_id)])
+        entry = cls.filter_by_user_and_game(user_id, game_id)
+        if entry is None and include_archived:
+            rows = ArchivedEntryModel.find_by_user(user_id, cls.FIELDS, game_id)
+            if rows:
+                return {'game_data': rows_to_dicts(rows, cls.FIELDS, cls.FORMATTERS)}
+        return cls.serialize([entry])
+
+    @classmethod
+    def start(cls, user_id, username, game):
+        """
+        Dołącza użytkownika do gry, tworząc wpis w tabeli wyników oraz w tabeli rankingu i zwiększając liczniki
+        statystyk gry.
+
+        Wpis tworzony jest jednym poleceniem INSERT, pomijanym przez bazę danych, jeżeli użytkownik już dołączył do gry
+        (indeks unikalny ``uq_scoreboard_user_game``), dzięki czemu równoległe zapytania nie tworzą zduplikowanych
+        wpisów. Archiwum sprawdzane jest po utworzeniu wpisu, w tej samej transakcji - wpis przeniesiony do archiwum
+        przed jego utworzeniem jest wtedy widoczny, a wpis przenoszony później blokuje utworzenie nowego.
+
+        :param user_id: Identyfikator użytkownika
+        :param username: Nazwa użytkownika
+        :param game: Obiekt klasy GameModel
+        :return: Utworzony obiekt klasy ScoreboardEntryModel lub None, jeżeli użytkownik już dołączył do gry
+        """
+        entry = cls(user_id=user_id, game_id=game.id, finished=False, current_riddle=1, time_begin=dt.datetime.now())
+        result = db.session.execute(insert_or_ignore(cls.__table__).values(
+            user_id=entry.user_id,
+            game_id=entry.game_id,
+            finished=entry.finished,
+            current_riddle=entry.current_riddle,
+            time_begin=entry.time_begin
+        ))
+        if result.rowcount != 1 or ArchivedEntryModel.exists_for(user_id, game.id):
+            db.session.rollback()
+            return None
+        entry.id = result.inserted_primary_key[0]
+        db.session.add(LeaderboardEntryModel.from_entry(entry, username, game.title))
+        db.session.add(ProgressEventModel.for_entry(entry, ProgressEventModel.START))
+        GameCounterModel.increment(GameCounterModel.increments_for(game.id, ProgressEventModel.START, 1))
+        db.session.commit()
+        return entry
+
+    @classmethod
+    def advance(cls, user_id, game_id, expected_riddle=None, idempotency_key=None):
+        """
+        Przesuwa użytkownika do kolejnej zagadki lub oznacza grę jako ukończoną, aktualizując przy tym tabelę rankingu
+        i liczniki statystyk gry oraz zapisując zdarzenie w dzienniku zdarzeń i czas rozwiązania zagadki w tabeli
+        międzyczasów.
+
+        Postęp zmieniany jest jednym warunkowym poleceniem UPDATE, porównującym numer bieżącej zagadki z liczbą zagadek
+        w grze, dzięki czemu równoległe zapytania nie mogą przesunąć gracza dwukrotnie. Jeżeli podano oczekiwany numer
+        zagadki, wpis jest zmieniany tylko wtedy, gdy gracz nadal rozwiązuje tę zagadkę. Klucz idempotentności
+        zapisywany jest w tej samej transakcji co zmiana postępu.
+
+        :param user_id: Identyfikator użytkownika
+        :param game_id: Identyfikator gry
+        :param expected_riddle: Oczekiwany numer bieżącej zagadki lub None
+        :param idempotency_key: Klucz idempotentności zapytania lub None
+        :return: Krotka (informacja, czy postęp został zmieniony, obiekt klasy ScoreboardEntryModel lub None, jeżeli
+                 użytkownik nie dołączył do gry)
+        :raises sqlalchemy.exc.IntegrityError: Jeżeli klucz idempotentności został już wykorzystany
+        """
+        now = dt.datetime.now()
+        if idempotency_key is not None:
+            IdempotencyKeyModel.reserve(user_id, idempotency_key, game_id, now)
+        riddles = db.select([GameModel.riddles]).where(GameModel.id == cls.game_id).as_scalar()
+        last_riddle = cls.current_riddle >= riddles
+        conditions = [cls.user_id == user_id, cls.game_id == game_id, cls.finished.isnot(True)]
+        if expected_riddle is not None:
+            conditions.append(cls.current_riddle == expected_riddle)
+        updated = cls.query.filter(*conditions).update({
+            cls.current_riddle: db.case([(last_riddle, cls.current_riddle)], else_=cls.current_riddle + 1),
+            cls.finished: db.case([(last_riddle, True)], else_=cls.finished),
+            cls.time_end: db.case([(last_riddle, now)], else_=cls.time_end)
+        }, synchronize_session=False)
+        if not updated:
+            db.session.rollback()
+            return False, cls.filter_by_user_and_game(user_id, game_id)
+        entry = cls.query.populate_existing().filter_by(user_id=user_id, game_id=game_id).first()
+        LeaderboardEntryModel.update_from(entry)
+        event = ProgressEventModel.for_entry(
+            entry, ProgressEventModel.FINISH if entry.finished else ProgressEventModel.ADVANCE)
+        db.session.add(event)
+        SplitTimeModel.record_many([(event.entry_id, event.user_id, event.game_id, event.kind, event.riddle_no,
+                                     event.created)])
+        GameCounterModel.increment(GameCounterModel.increments_for(
+            entry.game_id, event.kind, event.riddle_no,
+            (entry.time_end - entry.time_begin).total_seconds() if entry.finished else None))
+        if idempotency_key is not None:
+            IdempotencyKeyModel.complete(user_id, idempotency_key, cls.serialize([entry]))
+        db.session.commit()
+        return True, entry
+
+    @classmethod
+    def find_active_for_users(cls, user_ids):
+        """
+        Pobiera nieukończone gry wskazanych użytkowników wraz z liczbą zagadek w każdej z gier
+
+        :param user_ids: Identyfikatory użytkowników
+        :return: Lista krotek (identyfikator wpisu, identyfikator użytkownika, identyfikator gry,
+                 numer bieżącej zagadki, czas rozpoczęcia gry, liczba zagadek w grze)
+        """
+        user_ids = list(user_ids)
+        rows = []
+        for start in range(0, len(user_ids), 500):
+            rows.extend(db.session.query(cls.id, cls.user_id, cls.game_id, cls.current_riddle, cls.time_begin,
+                                         GameModel.riddles)
+                        .join(GameModel, cls.game_id == GameModel.id)
+                        .filter(cls.user_id.in_(user_ids[start:start + 500]), cls.finished.isnot(True))
+                        .all())
+        return rows
+
+    @classmethod
+    def apply_progress(cls, updates):
+        """
+        Zapisuje w jednej transakcji postęp wielu graczy w tabeli wyników, w tabeli rankingu, w dzienniku zdarzeń,
+        w tabeli międzyczasów oraz w licznikach statystyk gier.
+
+        Aktualizacje wykonywane są wsadowo (executemany). Wpis jest zmieniany tylko wtedy, gdy gra nie została
+        ukończona, a numer bieżącej zagadki jest równy oczekiwanemu, dzięki czemu równoległe zmiany postępu nie są
+        nadpisywane. Jeżeli część wpisów zmieniła się w międzyczasie, aktualizacje są powtarzane pojedynczo.
+
+        :param updates: Lista słowników z kluczami ``id``, ``user_id``, ``game_id``, ``expected``, ``current_riddle``,
+                        ``finished``, ``time_end``, ``rank_group``, ``rank_value`` oraz ``events`` (lista krotek
+                        (rodzaj zdarzenia, numer zagadki, czas zdarzenia))
+        :return: Lista zapisanych aktualizacji
+        """
+        if not updates:
+            return []
+        columns = ('id', 'expected', 'current_riddle', 'finished', 'time_end', 'rank_group', 'rank_value')
+        params = [{'b_' + key: update[key] for key in columns} for update in updates]
+        statements = []
+        for table, key in ((cls.__table__, 'id'), (LeaderboardEntryModel.__table__, 'entry_id')):
+            values = {
+                'current_riddle': db.bindparam('b_current_riddle'),
+                'finished': db.bindparam('b_finished'),
+                'time_end': db.bindparam('b_time_end')
+            }
+            if table is LeaderboardEntryModel.__table__:
+                values.update(rank_group=db.bindparam('b_rank_group'), rank_value=db.bindparam('b_rank_value'))
+            statements.append(table.update().where(db.and_(
+                table.c[key] == db.bindparam('b_id'),
+                table.c.current_riddle == db.bindparam('b_expected'),
+                table.c.finished.isnot(True)
+            )).values(values))
+        scoreboard_update, leaderboard_update = statements
+
+        if db.session.execute(scoreboard_update, params).rowcount != len(params):
+            db.session.rollback()
+            applied = [index for index, param in enumerate(params)
+                       if db.session.execute(scoreboard_update, param).rowcount == 1]
+            updates = [updates[index] for index in applied]
+            params = [params[index] for index in applied]
+        if params:
+            db.session.execute(leaderboard_update, params)
+            events = [(update['id'], update['user_id'], update['game_id'], kind, riddle_no, created)
+                      for update in updates for kind, riddle_no, created in update['events']]
+            ProgressEventModel.record_many(events)
+            SplitTimeModel.record_many(events)
+            GameCounterModel.increment([
+                key for update in updates for kind, riddle_no, _ in update['events']
+                for key in GameCounterModel.increments_for(update['game_id'], kind, riddle_no, update['rank_value'])
+            ])
+        db.session.commit()
+        return updates
 
     def save_to_db(self):
         """
@@ -307,3 +748,904 @@ class ScoreboardEntryModel(db.Model):
         """
         db.session.add(self)
         db.session.commit()
+
+
+class LeaderboardEntryModel(db.Model):
+    """
+    Model przechowujący w bazie danych ranking graczy, aktualizowany przy każdej zmianie postępu w grze.
+
+    Każdy wpis odpowiada jednemu wpisowi w tabeli wyników i zawiera zdenormalizowaną nazwę użytkownika oraz tytuł gry.
+    Kolejność w rankingu wyznaczają kolumny ``rank_group`` (0 - gra ukończona, 1 - gra w toku) oraz ``rank_value``
+    (czas ukończenia gry w sekundach lub ujemny znacznik czasu rozpoczęcia gry), dzięki czemu ranking globalny
+    i ranking pojedynczej gry można odczytywać stronami bezpośrednio z indeksu.
+    """
+    __tablename__ = "leaderboard"
+    __table_args__ = (
+        db.Index("ix_leaderboard_rank", "rank_group", "rank_value", "entry_id"),
+        db.Index("ix_leaderboard_game_rank", "game_id", "rank_group", "rank_value", "entry_id"),
+    )
+
+    entry_id = db.Column(db.Integer, db.ForeignKey("scoreboard.id"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"))
+    username = db.Column(db.String(120), nullable=False)
+    game_title = db.Column(db.String(100), nullable=False)
+    finished = db.Column(db.Boolean, default=False)
+    current_riddle = db.Column(db.Integer, nullable=False, default=1)
+    time_begin = db.Column(db.DateTime)
+    time_end = db.Column(db.DateTime)
+    rank_group = db.Column(db.Integer, nullable=False)
+    rank_value = db.Column(db.Float, nullable=False)
+
+    @staticmethod
+    def rank_of(finished, time_begin, time_end):
+        """
+        Wyznacza pozycję wpisu w rankingu
+
+        :param finished: Informacja o ukończeniu gry
+        :param time_begin: Czas rozpoczęcia gry
+        :param time_end: Czas zakończenia gry
+        :return: Krotka (grupa, wartość) - najpierw gry ukończone, następnie gry w toku, w obu grupach według
+                 czasu gry
+        """
+        if finished and time_end is not None:
+            return 0, (time_end - time_begin).total_seconds()
+        return 1, -time_begin.timestamp()
+
+    @classmethod
+    def from_entry(cls, entry, username, game_title):
+        """
+        Tworzy wpis w rankingu na podstawie wpisu w tabeli wyników
+
+        :param entry: Obiekt klasy ScoreboardEntryModel
+        :param username: Nazwa użytkownika
+        :param game_title: Tytuł gry
+        :return: Obiekt klasy LeaderboardEntryModel
+        """
+        rank_group, rank_value = cls.rank_of(entry.finished, entry.time_begin, entry.time_end)
+        return cls(
+            entry_id=entry.id,
+            user_id=entry.user_id,
+            game_id=entry.game_id,
+            username=username,
+            game_title=game_title,
+            finished=bool(entry.finished),
+            current_riddle=entry.current_riddle,
+            time_begin=entry.time_begin,
+            time_end=entry.time_end,
+            rank_group=rank_group,
+            rank_value=rank_value
+        )
+
+    @classmethod
+    def update_from(cls, entry):
+        """
+        Aktualizuje wpis w rankingu po zmianie postępu w grze. Nie zatwierdza transakcji.
+
+        :param entry: Obiekt klasy ScoreboardEntryModel
+        """
+        rank_group, rank_value = cls.rank_of(entry.finished, entry.time_begin, entry.time_end)
+        cls.query.filter_by(entry_id=entry.id).update({
+            cls.finished: bool(entry.finished),
+            cls.current_riddle: entry.current_riddle,
+            cls.time_end: entry.time_end,
+            cls.rank_group: rank_group,
+            cls.rank_value: rank_value
+        }, synchronize_session=False)
+
+    @classmethod
+    def backfill(cls):
+        """
+        Tworzy wpisy w rankingu dla wpisów w tabeli wyników, które jeszcze ich nie posiadają
+        (np. utworzonych przed wprowadzeniem tabeli rankingu)
+
+        :return: Liczba utworzonych wpisów
+        """
+        missing = db.session.query(ScoreboardEntryModel, UserModel.username, GameModel.title) \
+            .join(UserModel, ScoreboardEntryModel.user_id == UserModel.id) \
+            .join(GameModel, ScoreboardEntryModel.game_id == GameModel.id) \
+            .outerjoin(cls, cls.entry_id == ScoreboardEntryModel.id) \
+            .filter(cls.entry_id.is_(None)) \
+            .all()
+        if missing:
+            db.session.add_all([cls.from_entry(entry, username, title) for entry, username, title in missing])
+            db.session.commit()
+        return len(missing)
+
+    @classmethod
+    def page(cls, game_id=None, after=None, limit=50, columns=None, include_archived=False):
+        """
+        Pobiera stronę rankingu, korzystając z paginacji opartej na kluczu (keyset pagination)
+
+        :param game_id: Identyfikator gry (None oznacza ranking globalny)
+        :param after: Klucz (grupa, wartość, identyfikator wpisu) ostatniego wpisu z poprzedniej strony
+        :param limit: Maksymalna liczba wpisów na stronie
+        :param columns: Nazwy kolumn do pobrania (None oznacza pobranie całych obiektów)
+        :param include_archived: Informacja, czy uwzględnić wpisy z archiwum (zawsze jako gry ukończone)
+        :return: Lista obiektów klasy LeaderboardEntryModel lub krotek zawierających klucz wpisu i wybrane kolumny
+        """
+        query = cls._select(columns, (cls.rank_group, cls.rank_value))
+        if game_id is not None:
+            query = query.filter(cls.game_id == game_id)
+        if after is not None:
+            group, value, entry_id = after
+            query = query.filter(db.or_(
+                cls.rank_group > group,
+                db.and_(cls.rank_group == group, cls.rank_value > value),
+                db.and_(cls.rank_group == group, cls.rank_value == value, cls.entry_id > entry_id)
+            ))
+        rows = query.order_by(cls.rank_group, cls.rank_value, cls.entry_id).limit(limit).all()
+        if include_archived:
+            rows = sorted(rows + ArchivedEntryModel.page(game_id, after, limit, columns),
+                          key=lambda row: (row.rank_group, row.rank_value, row.entry_id))[:limit]
+        return rows
+
+    @classmethod
+    def page_by_entry(cls, game_id=None, after=None, limit=50, columns=None, include_archived=False):
+        """
+        Pobiera stronę listy wpisów posortowanej według identyfikatora wpisu w tabeli wyników (w kolejności dołączania
+        graczy do gier)
+
+        :param game_id: Identyfikator gry (None oznacza wszystkie gry)
+        :param after: Identyfikator ostatniego wpisu z poprzedniej strony
+        :param limit: Maksymalna liczba wpisów na stronie
+        :param columns: Nazwy kolumn do pobrania (None oznacza pobranie całych obiektów)
+        :param include_archived: Informacja, czy uwzględnić wpisy z archiwum
+        :return: Lista obiektów klasy LeaderboardEntryModel lub krotek zawierających klucz wpisu i wybrane kolumny
+        """
+        query = cls._select(columns, (cls.rank_group, cls.rank_value))
+        if game_id is not None:
+            query = query.filter(cls.game_id == game_id)
+        if after is not None:
+            query = query.filter(cls.entry_id > after)
+        rows = query.order_by(cls.entry_id).limit(limit).all()
+        if include_archived:
+            rows = sorted(rows + ArchivedEntryModel.page(game_id, after, limit, columns, by_rank=False),
+                          key=lambda row: row.entry_id)[:limit]
+        return rows
+
+    @classmethod
+    def _select(cls, columns, keys):
+        if columns is None:
+            return cls.query
+        keys = list(keys) + [cls.entry_id]
+        names = {key.key for key in keys}
+        return db.session.query(*keys, *[getattr(cls, name) for name in columns if name not in names])
+
+
+class ProgressEventModel(db.Model):
+    """
+    Model przechowujący w bazie danych dziennik zdarzeń dotyczących postępu graczy (rozpoczęcie gry, przejście do
+    kolejnej zagadki, ukończenie gry). Wpisy są wyłącznie dopisywane.
+    """
+    __tablename__ = "progress_events"
+
+    START = 'start'
+    ADVANCE = 'advance'
+    FINISH = 'finish'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey("scoreboard.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"))
+    kind = db.Column(db.String(10), nullable=False)
+    riddle_no = db.Column(db.Integer, nullable=False)
+    created = db.Column(db.DateTime, nullable=False, default=dt.datetime.now)
+
+    @classmethod
+    def for_entry(cls, entry, kind):
+        """
+        Tworzy zdarzenie dotyczące wpisu w tabeli wyników
+
+        :param entry: Obiekt klasy ScoreboardEntryModel po zmianie postępu
+        :param kind: Rodzaj zdarzenia (START, ADVANCE lub FINISH)
+        :return: Obiekt klasy ProgressEventModel
+        """
+        return cls(
+            entry_id=entry.id,
+            user_id=entry.user_id,
+            game_id=entry.game_id,
+            kind=kind,
+            riddle_no=entry.current_riddle,
+            created=entry.time_end if kind == cls.FINISH else
+            entry.time_begin if kind == cls.START else dt.datetime.now()
+        )
+
+    @classmethod
+    def record_many(cls, events):
+        """
+        Zapisuje wiele zdarzeń jednym poleceniem INSERT wykonywanym wsadowo (executemany). Nie zatwierdza transakcji.
+
+        :param events: Lista krotek (identyfikator wpisu, identyfikator użytkownika, identyfikator gry, rodzaj
+                       zdarzenia, numer zagadki, czas zdarzenia)
+        """
+        if events:
+            db.session.execute(cls.__table__.insert(), [{
+                'entry_id': entry_id,
+                'user_id': user_id,
+                'game_id': game_id,
+                'kind': kind,
+                'riddle_no': riddle_no,
+                'created': created
+            } for entry_id, user_id, game_id, kind, riddle_no, created in events])
+
+    @classmethod
+    def last_id(cls):
+        """
+        Pobiera identyfikator ostatniego zdarzenia
+
+        :return: Identyfikator ostatniego zdarzenia lub 0, jeżeli dziennik jest pusty
+        """
+        return db.session.query(db.func.max(cls.id)).scalar() or 0
+
+    @classmethod
+    def find_since(cls, last_id, missing_ids=(), limit=1000):
+        """
+        Pobiera zdarzenia zapisane po wskazanym zdarzeniu oraz zdarzenia o wskazanych identyfikatorach wraz
+        z bieżącym stanem wpisu w rankingu
+
+        :param last_id: Identyfikator ostatniego znanego zdarzenia
+        :param missing_ids: Identyfikatory wcześniejszych zdarzeń, których dotąd nie odczytano (np. zapisywanych przez
+                            transakcje zatwierdzone później niż transakcje zapisujące kolejne zdarzenia)
+        :param limit: Maksymalna liczba zdarzeń
+        :return: Lista krotek (obiekt klasy ProgressEventModel, obiekt klasy LeaderboardEntryModel)
+        """
+        condition = cls.id > last_id
+        if missing_ids:
+            condition = db.or_(condition, cls.id.in_(list(missing_ids)))
+        return db.session.query(cls, LeaderboardEntryModel) \
+            .join(LeaderboardEntryModel, LeaderboardEntryModel.entry_id == cls.entry_id) \
+            .filter(condition) \
+            .order_by(cls.id) \
+            .limit(limit) \
+            .all()
+
+
+class SplitTimeModel(db.Model):
+    """
+    Model przechowujący w bazie danych czasy przejścia poszczególnych zagadek (międzyczasy).
+
+    Międzyczas wyznaczany jest ze zdarzeń przejścia do kolejnej zagadki i ukończenia gry w chwili ich zapisu
+    w dzienniku zdarzeń, w tej samej transakcji. Czas rozwiązania zagadki liczony jest od rozwiązania poprzedniej
+    zagadki (lub od rozpoczęcia gry w przypadku pierwszej zagadki). Indeks ``ix_split_times_segment`` pozwala
+    odczytywać ranking pojedynczej zagadki (odcinka gry) stronami bezpośrednio z indeksu.
+    """
+    __tablename__ = "split_times"
+    __table_args__ = (
+        db.Index("ix_split_times_segment", "game_id", "riddle_no", "seconds", "entry_id"),
+    )
+
+    entry_id = db.Column(db.Integer, db.ForeignKey("scoreboard.id"), primary_key=True)
+    riddle_no = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"))
+    seconds = db.Column(db.Float, nullable=False)
+    elapsed = db.Column(db.Float, nullable=False)
+    completed = db.Column(db.DateTime, nullable=False)
+
+    @staticmethod
+    def solved_riddle(kind, riddle_no):
+        """
+        Wyznacza numer zagadki rozwiązanej w chwili zdarzenia
+
+        :param kind: Rodzaj zdarzenia (ProgressEventModel.START, ADVANCE lub FINISH)
+        :param riddle_no: Numer zagadki zapisany w zdarzeniu
+        :return: Numer rozwiązanej zagadki lub None, jeżeli zdarzenie nie oznacza rozwiązania zagadki
+        """
+        if kind == ProgressEventModel.ADVANCE:
+            return riddle_no - 1
+        if kind == ProgressEventModel.FINISH:
+            return riddle_no
+        return None
+
+    @classmethod
+    def splits_from_events(cls, events, previous):
+        """
+        Wyznacza międzyczasy na podstawie zdarzeń
+
+        :param events: Lista krotek (identyfikator wpisu, identyfikator użytkownika, identyfikator gry, rodzaj
+                       zdarzenia, numer zagadki, czas zdarzenia)
+        :param previous: Słownik przyporządkowujący parom (identyfikator wpisu, numer zagadki) czas rozwiązania
+                         zagadki, zawierający również czasy rozpoczęcia gier (pod numerem zagadki 0); uzupełniany
+                         o wyznaczone międzyczasy
+        :return: Lista słowników z danymi międzyczasów
+        """
+        solved_events = sorted((entry_id, cls.solved_riddle(kind, riddle_no), user_id, game_id, created)
+                               for entry_id, user_id, game_id, kind, riddle_no, created in events
+                               if cls.solved_riddle(kind, riddle_no) is not None)
+        splits = []
+        for entry_id, solved, user_id, game_id, created in solved_events:
+            if (entry_id, solved - 1) not in previous or (entry_id, 0) not in previous:
+                continue
+            previous[(entry_id, solved)] = created
+            splits.append({
+                'entry_id': entry_id,
+                'riddle_no': solved,
+                'user_id': user_id,
+                'game_id': game_id,
+                'seconds': (created - previous[(entry_id, solved - 1)]).total_seconds(),
+                'elapsed': (created - previous[(entry_id, 0)]).total_seconds(),
+                'completed': created
+            })
+        return splits
+
+    @classmethod
+    def record_many(cls, events):
+        """
+        Zapisuje międzyczasy wynikające ze zdarzeń jednym poleceniem INSERT wykonywanym wsadowo (executemany).
+        Czasy rozwiązania poprzednich zagadek pobierane są z bazy danych według klucza głównego.
+        Nie zatwierdza transakcji.
+
+        :param events: Lista krotek (identyfikator wpisu, identyfikator użytkownika, identyfikator gry, rodzaj
+                       zdarzenia, numer zagadki, czas zdarzenia)
+        """
+        keys = set()
+        for entry_id, _, _, kind, riddle_no, _ in events:
+            solved = cls.solved_riddle(kind, riddle_no)
+            if solved is not None:
+                keys.update(((entry_id, 0), (entry_id, solved - 1)))
+        if not keys:
+            return
+        keys = list(keys)
+        previous = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            previous.update(((row.id, 0), row.time_begin) for row in db.session.query(
+                ScoreboardEntryModel.id, ScoreboardEntryModel.time_begin
+            ).filter(ScoreboardEntryModel.id.in_({entry_id for entry_id, _ in chunk})))
+            previous.update(((row.entry_id, row.riddle_no), row.completed) for row in db.session.query(
+                cls.entry_id, cls.riddle_no, cls.completed
+            ).filter(db.tuple_(cls.entry_id, cls.riddle_no).in_([key for key in chunk if key[1] > 0])))
+        splits = cls.splits_from_events(events, previous)
+        if splits:
+            db.session.execute(cls.__table__.insert(), splits)
+
+    @classmethod
+    def find_for_entry(cls, entry_id):
+        """
+        Pobiera międzyczasy wpisu w tabeli wyników
+
+        :param entry_id: Identyfikator wpisu w tabeli wyników
+        :return: Lista krotek (numer zagadki, czas rozwiązania zagadki w sekundach, czas od rozpoczęcia gry
+                 w sekundach, chwila rozwiązania zagadki), posortowana według numeru zagadki
+        """
+        return db.session.query(cls.riddle_no, cls.seconds, cls.elapsed, cls.completed) \
+            .filter(cls.entry_id == entry_id) \
+            .order_by(cls.riddle_no) \
+            .all()
+
+    @classmethod
+    def page_segment(cls, game_id, riddle_no, after=None, limit=50):
+        """
+        Pobiera stronę rankingu zagadki (odcinka gry), posortowanego rosnąco według czasu rozwiązania zagadki
+
+        :param game_id: Identyfikator gry
+        :param riddle_no: Numer zagadki
+        :param after: Klucz (czas rozwiązania zagadki, identyfikator wpisu) ostatniego wpisu z poprzedniej strony
+        :param limit: Maksymalna liczba wpisów na stronie
+        :return: Lista krotek (identyfikator wpisu, nazwa użytkownika, czas rozwiązania zagadki w sekundach, czas od
+                 rozpoczęcia gry w sekundach)
+        """
+        query = db.session.query(cls.entry_id, UserModel.username, cls.seconds, cls.elapsed) \
+            .join(UserModel, UserModel.id == cls.user_id) \
+            .filter(cls.game_id == game_id, cls.riddle_no == riddle_no)
+        if after is not None:
+            seconds, entry_id = after
+            query = query.filter(db.or_(
+                cls.seconds > seconds,
+                db.and_(cls.seconds == seconds, cls.entry_id > entry_id)
+            ))
+        return query.order_by(cls.seconds, cls.entry_id).limit(limit).all()
+
+
+class GameCounterModel(db.Model):
+    """
+    Model przechowujący w bazie danych liczniki, na podstawie których wyznaczane są statystyki gier.
+
+    Liczniki zwiększane są przy każdej zmianie postępu graczy, w tej samej transakcji co zmiana postępu:
+
+    - ``reached`` - liczba graczy, którzy dotarli do zagadki o numerze ``bucket`` (dotarcie do pierwszej zagadki
+      oznacza rozpoczęcie gry),
+    - ``finished`` - liczba graczy, którzy ukończyli grę (``bucket`` równy 0),
+    - ``finish_time`` - histogram czasów ukończenia gry; ``bucket`` to numer przedziału w FINISH_TIME_BUCKETS
+      (granice przedziałów rosną geometrycznie, co około 19%, od około 1 sekundy do około 68 godzin).
+
+    Odczyt statystyk gry wymaga więc pobrania liczby wierszy zależnej od liczby zagadek, a nie od liczby graczy.
+    """
+    __tablename__ = "game_counters"
+
+    REACHED = 'reached'
+    FINISHED = 'finished'
+    FINISH_TIME = 'finish_time'
+    FINISH_TIME_BUCKETS = tuple(60 * 2 ** (index / 4) for index in range(-24, 49))
+
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"), primary_key=True, autoincrement=False)
+    metric = db.Column(db.String(20), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def increments_for(cls, game_id, kind, riddle_no, finish_seconds=None):
+        """
+        Wyznacza zmiany liczników wynikające ze zdarzenia
+
+        :param game_id: Identyfikator gry
+        :param kind: Rodzaj zdarzenia (ProgressEventModel.START, ADVANCE lub FINISH)
+        :param riddle_no: Numer zagadki zapisany w zdarzeniu
+        :param finish_seconds: Czas ukończenia gry w sekundach (dla zdarzenia FINISH)
+        :return: Lista kluczy liczników (identyfikator gry, nazwa licznika, przedział) do zwiększenia o 1
+        """
+        if kind == ProgressEventModel.FINISH:
+            return [(game_id, cls.FINISHED, 0),
+                    (game_id, cls.FINISH_TIME, bisect.bisect_left(cls.FINISH_TIME_BUCKETS, finish_seconds))]
+        return [(game_id, cls.REACHED, riddle_no)]
+
+    @classmethod
+    def increment(cls, keys):
+        """
+        Zwiększa liczniki dwoma poleceniami wykonywanymi wsadowo (executemany): brakujące liczniki są tworzone
+        z wartością 0, a następnie zwiększane. Nie zatwierdza transakcji.
+
+        :param keys: Lista kluczy liczników (identyfikator gry, nazwa licznika, przedział); klucz może się powtarzać
+        """
+        deltas = {}
+        for key in keys:
+            deltas[key] = deltas.get(key, 0) + 1
+        if not deltas:
+            return
+        table = cls.__table__
+        db.session.execute(insert_or_ignore(table), [
+            {'game_id': game_id, 'metric': metric, 'bucket': bucket, 'value': 0}
+            for game_id, metric, bucket in deltas
+        ])
+        db.session.execute(table.update().where(db.and_(
+            table.c.game_id == db.bindparam('b_game_id'),
+            table.c.metric == db.bindparam('b_metric'),
+            table.c.bucket == db.bindparam('b_bucket')
+        )).values(value=table.c.value + db.bindparam('b_delta')), [
+            {'b_game_id': game_id, 'b_metric': metric, 'b_bucket': bucket, 'b_delta': delta}
+            for (game_id, metric, bucket), delta in deltas.items()
+        ])
+
+    @classmethod
+    def find_for_game(cls, game_id):
+        """
+        Pobiera liczniki gry
+
+        :param game_id: Identyfikator gry
+        :return: Słownik przyporządkowujący nazwom liczników słowniki {przedział: wartość}
+        """
+        counters = {cls.REACHED: {}, cls.FINISHED: {}, cls.FINISH_TIME: {}}
+        for metric, bucket, value in db.session.query(cls.metric, cls.bucket, cls.value).filter(cls.game_id == game_id):
+            counters.setdefault(metric, {})[bucket] = value
+        return counters
+
+    @classmethod
+    def quantile(cls, histogram, fraction):
+        """
+        Szacuje kwantyl czasu ukończenia gry na podstawie histogramu, zakładając równomierny rozkład wartości
+        wewnątrz przedziału
+
+        :param histogram: Słownik {numer przedziału: liczba wartości}
+        :param fraction: Rząd kwantyla (od 0 do 1)
+        :return: Szacowana wartość kwantyla w sekundach lub None, jeżeli histogram jest pusty
+        """
+        total = sum(histogram.values())
+        if not total:
+            return None
+        target = fraction * total
+        cumulative = 0
+        for bucket in sorted(histogram):
+            count = histogram[bucket]
+            if count and cumulative + count >= target:
+                lower = cls.FINISH_TIME_BUCKETS[bucket - 1] if bucket > 0 else 0.0
+                if bucket >= len(cls.FINISH_TIME_BUCKETS):
+                    return lower
+                return lower + (cls.FINISH_TIME_BUCKETS[bucket] - lower) * (target - cumulative) / count
+            cumulative += count
+        return None
+
+
+class ArchivedEntryModel(db.Model):
+    """
+    Model przechowujący w bazie danych archiwum ukończonych gier - zwarte wpisy przeniesione z tabeli wyników.
+
+    Wpis archiwum zachowuje identyfikator wpisu w tabeli wyników, numer ostatniej zagadki, czasy rozpoczęcia
+    i zakończenia gry oraz czas ukończenia gry w sekundach. Dziennik zdarzeń, międzyczasy i wpis w rankingu
+    przenoszonego wpisu są usuwane; statystyki gier (GameCounterModel) nie zmieniają się, ponieważ liczniki nie są
+    zmniejszane przy archiwizacji. Zapytania o postęp graczy, ranking i statystyki odczytują archiwum tylko na wyraźne
+    żądanie (parametr ``include_archived``).
+    """
+    __tablename__ = "scoreboard_archive"
+    __table_args__ = (
+        db.Index("uq_scoreboard_archive_user_game", "user_id", "game_id", unique=True),
+        db.Index("ix_scoreboard_archive_user_time", "user_id", "time_begin"),
+        db.Index("ix_scoreboard_archive_rank", "seconds", "id"),
+        db.Index("ix_scoreboard_archive_game_rank", "game_id", "seconds", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"))
+    current_riddle = db.Column(db.Integer, nullable=False)
+    time_begin = db.Column(db.DateTime, nullable=False)
+    time_end = db.Column(db.DateTime, nullable=False)
+    seconds = db.Column(db.Float, nullable=False)
+    archived = db.Column(db.DateTime, nullable=False, default=dt.datetime.now)
+
+    @classmethod
+    def columns(cls, names):
+        """
+        Tworzy wyrażenia odpowiadające kolumnom tabeli wyników i tabeli rankingu, dzięki czemu wiersze archiwum mogą
+        być łączone z wierszami tych tabel
+
+        :param names: Nazwy kolumn tabeli wyników lub tabeli rankingu
+        :return: Lista wyrażeń oznaczonych podanymi nazwami
+        """
+        mapping = {
+            'entry_id': cls.id,
+            'finished': db.true(),
+            'username': UserModel.username,
+            'game_title': GameModel.title,
+            'rank_group': db.literal_column('0', db.Integer),
+            'rank_value': cls.seconds
+        }
+        return [(mapping[name] if name in mapping else getattr(cls, name)).label(name) for name in names]
+
+    @classmethod
+    def _select(cls, names):
+        query = db.session.query(*cls.columns(names)).select_from(cls)
+        if 'username' in names:
+            query = query.join(UserModel, cls.user_id == UserModel.id)
+        if 'game_title' in names:
+            query = query.join(GameModel, cls.game_id == GameModel.id)
+        return query
+
+    @classmethod
+    def exists_for(cls, user_id, game_id):
+        """
+        Sprawdza, czy w archiwum znajduje się wpis użytkownika w wybranej grze
+
+        :param user_id: Identyfikator użytkownika
+        :param game_id: Identyfikator gry
+        :return: Informacja, czy wpis istnieje (True/False)
+        """
+        return db.session.query(cls.id).filter_by(user_id=user_id, game_id=game_id).first() is not None
+
+    @classmethod
+    def find_by_user(cls, user_id, fields, game_id=None):
+        """
+        Pobiera zarchiwizowane wpisy użytkownika
+
+        :param user_id: Identyfikator użytkownika
+        :param fields: Nazwy pól tabeli wyników do pobrania
+        :param game_id: Identyfikator gry (None - wszystkie gry)
+        :return: Lista krotek zawierających wybrane pola, posortowana malejąco według daty dołączenia do gry
+        """
+        query = cls._select(fields).filter(cls.user_id == user_id)
+        if game_id is not None:
+            query = query.filter(cls.game_id == game_id)
+        return query.order_by(cls.time_begin.desc(), cls.id.desc()).all()
+
+    @classmethod
+    def page_by_user(cls, user_id, fields, after=None, limit=50):
+        """
+        Pobiera stronę zarchiwizowanych wpisów użytkownika (odpowiednik ScoreboardEntryModel.page_by_user)
+
+        :param user_id: Identyfikator użytkownika
+        :param fields: Nazwy pól tabeli wyników do pobrania
+        :param after: Klucz (data dołączenia do gry, identyfikator wpisu) ostatniego wpisu z poprzedniej strony
+        :param limit: Maksymalna liczba wpisów na stronie
+        :return: Lista krotek zawierających klucz wpisu (``key_time``, ``key_id``) oraz wybrane pola
+        """
+        query = db.session.query(cls.time_begin.label('key_time'), cls.id.label('key_id'), *cls.columns(fields)) \
+            .filter(cls.user_id == user_id)
+        if after is not None:
+            time_begin, entry_id = after
+            query = query.filter(db.or_(
+                cls.time_begin < time_begin,
+                db.and_(cls.time_begin == time_begin, cls.id < entry_id)
+            ))
+        return query.order_by(cls.time_begin.desc(), cls.id.desc()).limit(limit).all()
+
+    @classmethod
+    def page(cls, game_id=None, after=None, limit=50, columns=None, by_rank=True):
+        """
+        Pobiera stronę zarchiwizowanych wpisów w kolejności rankingu lub w kolejności dołączania graczy do gier
+        (odpowiednik LeaderboardEntryModel.page i LeaderboardEntryModel.page_by_entry)
+
+        :param game_id: Identyfikator gry (None oznacza wszystkie gry)
+        :param after: Klucz ostatniego wpisu z poprzedniej strony - (grupa, wartość, identyfikator wpisu) w kolejności
+                      rankingu lub identyfikator wpisu
+        :param limit: Maksymalna liczba wpisów na stronie
+        :param columns: Nazwy kolumn tabeli rankingu do pobrania (None oznacza wszystkie kolumny)
+        :param by_rank: Informacja, czy wpisy należy posortować według pozycji w rankingu (True) czy według kolejności
+                        dołączania graczy do gier (False)
+        :return: Lista krotek zawierających klucz wpisu (``rank_group``, ``rank_value``, ``entry_id``) oraz wybrane
+                 kolumny
+        """
+        keys = ['rank_group', 'rank_value', 'entry_id']
+        if columns is None:
+            columns = [column.key for column in LeaderboardEntryModel.__table__.columns]
+        query = cls._select(keys + [name for name in columns if name not in keys])
+        if game_id is not None:
+            query = query.filter(cls.game_id == game_id)
+        if not by_rank:
+            if after is not None:
+                query = query.filter(cls.id > after)
+            return query.order_by(cls.id).limit(limit).all()
+        if after is not None:
+            group, value, entry_id = after
+            if group > 0:
+                return []
+            if group == 0:
+                query = query.filter(db.or_(cls.seconds > value, db.and_(cls.seconds == value, cls.id > entry_id)))
+        return query.order_by(cls.seconds, cls.id).limit(limit).all()
+
+    @classmethod
+    def get_statistics(cls, batch_size=500):
+        """
+        Pobiera zarchiwizowane wpisy na potrzeby statystyk (odpowiednik ScoreboardEntryModel.get_statistics)
+
+        :param batch_size: Liczba wierszy wczytywanych jednocześnie
+        :return: Iterator krotek (nazwa użytkownika, tytuł gry, numer zagadki, ukończenie, czas rozpoczęcia,
+                 czas zakończenia)
+        """
+        return cls._select(['username', 'game_title', 'current_riddle', 'finished', 'time_begin', 'time_end']) \
+            .yield_per(batch_size)
+
+    @classmethod
+    def get_export(cls, game_id=None, since=None, until=None, batch_size=500):
+        """
+        Pobiera zarchiwizowane wpisy na potrzeby raportów (odpowiednik ScoreboardEntryModel.get_export)
+
+        :param game_id: Identyfikator gry (None - wszystkie gry)
+        :param since: Najwcześniejsza data dołączenia do gry (włącznie, None - bez ograniczenia)
+        :param until: Data dołączenia do gry, przed którą musi dołączyć gracz (None - bez ograniczenia)
+        :param batch_size: Liczba wierszy wczytywanych jednocześnie
+        :return: Iterator krotek w postaci zwracanej przez ScoreboardEntryModel.get_export
+        """
+        query = cls._select(['entry_id', 'user_id', 'username', 'game_id', 'game_title', 'current_riddle', 'finished',
+                             'time_begin', 'time_end'])
+        if game_id is not None:
+            query = query.filter(cls.game_id == game_id)
+        if since is not None:
+            query = query.filter(cls.time_begin >= since)
+        if until is not None:
+            query = query.filter(cls.time_begin < until)
+        return query.order_by(cls.id).yield_per(batch_size)
+
+    @classmethod
+    def archive_finished(cls, before, batch_size=500):
+        """
+        Przenosi do archiwum jedną partię wpisów w tabeli wyników dotyczących gier ukończonych przed podaną datą,
+        w jednej transakcji.
+
+        Ukończone wpisy nie są już zmieniane, więc przeniesienie nie koliduje ze zmianami postępu graczy. Najnowszy
+        wpis tabeli wyników nigdy nie jest przenoszony - baza SQLite nadaje nowym wierszom identyfikator o 1 większy
+        od największego istniejącego, więc usunięcie ostatniego wpisu pozwoliłoby ponownie wykorzystać identyfikator
+        zapisany w archiwum.
+
+        :param before: Data zakończenia gry, przed którą wpis jest przenoszony do archiwum
+        :param batch_size: Maksymalna liczba przenoszonych wpisów
+        :return: Liczba przeniesionych wpisów
+        """
+        scoreboard = ScoreboardEntryModel
+        newest = db.session.query(db.func.max(scoreboard.id)).scalar()
+        if newest is None:
+            return 0
+        rows = db.session.query(scoreboard.id, scoreboard.user_id, scoreboard.game_id, scoreboard.current_riddle,
+                                scoreboard.time_begin, scoreboard.time_end) \
+            .filter(scoreboard.time_end < before, scoreboard.finished.is_(True), scoreboard.id < newest) \
+            .order_by(scoreboard.time_end) \
+            .limit(batch_size) \
+            .all()
+        if not rows:
+            db.session.rollback()
+            return 0
+        now = dt.datetime.now()
+        db.session.execute(cls.__table__.insert(), [{
+            'id': row.id,
+            'user_id': row.user_id,
+            'game_id': row.game_id,
+            'current_riddle': row.current_riddle,
+            'time_begin': row.time_begin,
+            'time_end': row.time_end,
+            'seconds': (row.time_end - row.time_begin).total_seconds(),
+            'archived': now
+        } for row in rows])
+        ids = [row.id for row in rows]
+        for model, column in ((ProgressEventModel, ProgressEventModel.entry_id),
+                              (SplitTimeModel, SplitTimeModel.entry_id),
+                              (LeaderboardEntryModel, LeaderboardEntryModel.entry_id),
+                              (scoreboard, scoreboard.id)):
+            model.query.filter(column.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        return len(rows)
+
+
+class IdempotencyKeyModel(db.Model):
+    """
+    Model przechowujący w bazie danych klucze idempotentności (nagłówek ``Idempotency-Key``) wraz z odpowiedziami
+    udzielonymi na zapytania, dzięki czemu ponowione przez klienta zapytanie nie zmienia ponownie stanu gry. Klucz
+    należy do użytkownika i jest związany z grą, której dotyczyło pierwsze zapytanie.
+
+    Klucze starsze niż ``IDEMPOTENCY_KEY_TTL_SECONDS`` sekund są usuwane przez zadanie wykonywane w tle
+    (moduł scheduler).
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    key = db.Column(db.String(100), primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"))
+    created = db.Column(db.DateTime, nullable=False, default=dt.datetime.now, index=True)
+    response = db.Column(db.Text)
+
+    @classmethod
+    def find(cls, user_id, key):
+        """
+        Pobiera grę, której dotyczyło zapytanie z podanym kluczem, oraz udzieloną na nie odpowiedź
+
+        :param user_id: Identyfikator użytkownika
+        :param key: Klucz idempotentności
+        :return: Krotka (identyfikator gry lub None dla kluczy zapisanych przed dodaniem tej informacji, odpowiedź
+                 zgodna z notacją JSON lub None, jeżeli zapytanie jest nadal przetwarzane) albo None, jeżeli klucz nie
+                 został wykorzystany
+        """
+        row = db.session.query(cls.game_id, cls.response).filter_by(user_id=user_id, key=key).first()
+        if row is None:
+            return None
+        return row.game_id, json.loads(row.response) if row.response is not None else None
+
+    @classmethod
+    def reserve(cls, user_id, key, game_id, now):
+        """
+        Zapisuje klucz w bieżącej transakcji. Nie zatwierdza transakcji.
+
+        :param user_id: Identyfikator użytkownika
+        :param key: Klucz idempotentności
+        :param game_id: Identyfikator gry, której dotyczy zapytanie
+        :param now: Bieżący czas
+        :raises sqlalchemy.exc.IntegrityError: Jeżeli klucz został już wykorzystany
+        """
+        db.session.add(cls(user_id=user_id, key=key, game_id=game_id, created=now))
+        db.session.flush()
+
+    @classmethod
+    def complete(cls, user_id, key, response):
+        """
+        Zapisuje odpowiedź udzieloną na zapytanie z podanym kluczem. Nie zatwierdza transakcji.
+
+        :param user_id: Identyfikator użytkownika
+        :param key: Klucz idempotentności
+        :param response: Odpowiedź zgodna z notacją JSON
+        """
+        cls.query.filter_by(user_id=user_id, key=key).update({cls.response: json.dumps(response)},
+                                                             synchronize_session=False)
+
+    @classmethod
+    def prune_expired(cls, now):
+        """
+        Usuwa z bazy danych klucze starsze niż ``IDEMPOTENCY_KEY_TTL_SECONDS`` sekund
+
+        :param now: Bieżący czas
+        :return: Liczba usuniętych kluczy
+        """
+        expired = now - dt.timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_TTL_SECONDS'])
+        deleted = cls.query.filter(cls.created < expired).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+class JobLeaseModel(db.Model):
+    """
+    Model przechowujący w bazie danych dzierżawy zadań wykonywanych w tle (moduł scheduler) oraz informacje
+    o ostatnim wykonaniu każdego zadania.
+
+    Proces serwera może wykonać zadanie tylko po przejęciu dzierżawy - jednym warunkowym poleceniem UPDATE, które
+    zmienia wiersz tylko wtedy, gdy nadszedł termin wykonania zadania, a poprzednia dzierżawa została zwolniona lub
+    wygasła. Zadanie wykonuje więc w danej chwili co najwyżej jeden proces, a dzierżawa procesu, który przerwał pracę,
+    wygasa po upływie ustalonego czasu.
+    """
+    __tablename__ = "job_leases"
+
+    FIELDS = ('name', 'owner', 'expires', 'next_run', 'last_started', 'last_finished', 'last_status', 'last_duration',
+              'last_result', 'runs', 'failures')
+    FORMATTERS = dict({name: legacy_datetime for name in ('expires', 'next_run', 'last_started', 'last_finished')},
+                      last_result=lambda value: json.loads(value) if value is not None else None)
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))
+    expires = db.Column(db.DateTime)
+    next_run = db.Column(db.DateTime, nullable=False)
+    last_started = db.Column(db.DateTime)
+    last_finished = db.Column(db.DateTime)
+    last_status = db.Column(db.String(10))
+    last_duration = db.Column(db.Float)
+    last_result = db.Column(db.Text)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def register(cls, names, now):
+        """
+        Tworzy brakujące wiersze zadań z terminem wykonania równym bieżącemu czasowi
+
+        :param names: Nazwy zadań
+        :param now: Bieżący czas
+        """
+        if names:
+            db.session.execute(insert_or_ignore(cls.__table__), [
+                {'name': name, 'next_run': now, 'runs': 0, 'failures': 0} for name in names
+            ])
+            db.session.commit()
+
+    @classmethod
+    def find_due(cls, names, now):
+        """
+        Pobiera nazwy zadań, których termin wykonania już nadszedł i które nie są wykonywane przez inny proces
+
+        :param names: Nazwy zadań
+        :param now: Bieżący czas
+        :return: Lista nazw zadań
+        """
+        return [name for name, in db.session.query(cls.name).filter(
+            cls.name.in_(names),
+            cls.next_run <= now,
+            db.or_(cls.expires.is_(None), cls.expires < now)
+        )]
+
+    @classmethod
+    def acquire(cls, name, owner, now, expires):
+        """
+        Przejmuje dzierżawę zadania, jeżeli nadszedł termin jego wykonania i nie jest ono wykonywane przez inny proces
+
+        :param name: Nazwa zadania
+        :param owner: Identyfikator procesu przejmującego dzierżawę
+        :param now: Bieżący czas
+        :param expires: Czas wygaśnięcia dzierżawy
+        :return: Informacja, czy dzierżawa została przejęta (True/False)
+        """
+        acquired = cls.query.filter(
+            cls.name == name,
+            cls.next_run <= now,
+            db.or_(cls.expires.is_(None), cls.expires < now)
+        ).update({cls.owner: owner, cls.expires: expires, cls.last_started: now}, synchronize_session=False)
+        db.session.commit()
+        return acquired == 1
+
+    @classmethod
+    def release(cls, name, owner, finished, next_run, status, duration, result):
+        """
+        Zwalnia dzierżawę zadania, zapisując wynik jego wykonania i termin następnego wykonania
+
+        :param name: Nazwa zadania
+        :param owner: Identyfikator procesu, który przejął dzierżawę
+        :param finished: Czas zakończenia zadania
+        :param next_run: Termin następnego wykonania zadania
+        :param status: Wynik wykonania (``ok``, ``error`` lub ``timeout``)
+        :param duration: Czas wykonania zadania w sekundach
+        :param result: Wynik zadania lub opis błędu zapisany zgodnie z notacją JSON
+        """
+        cls.query.filter(cls.name == name, cls.owner == owner).update({
+            cls.owner: None,
+            cls.expires: None,
+            cls.next_run: next_run,
+            cls.last_finished: finished,
+            cls.last_status: status,
+            cls.last_duration: duration,
+            cls.last_result: result,
+            cls.runs: cls.runs + 1,
+            cls.failures: cls.failures + (0 if status == 'ok' else 1)
+        }, synchronize_session=False)
+        db.session.commit()
+
+    @classmethod
+    def print_all(cls):
+        """
+        Wypisuje stan wszystkich zadań
+
+        :return: Lista zadań zapisana zgodnie z notacją JSON
+        """
+        rows = db.session.query(*[getattr(cls, field) for field in cls.FIELDS]).order_by(cls.name).all()
+        return {'jobs': rows_to_dicts(rows, cls.FIELDS, cls.FORMATTERS)}
@@ -1,15 +1,46 @@
 """
 Moduł zawierający zasoby interfejsu API aplikacji
 """
-from flask import jsonify
-from flask_jwt_extended import (create_access_token, create_refresh_token, jwt_required, jwt_refresh_token_required,
+from flask import current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import (create_access_token, create_refresh_token,
                                 get_jwt_identity, get_raw_jwt, set_access_cookies, set_refresh_cookies,
                                 unset_jwt_cookies,
                                 get_jwt_claims)
-from flask_restful import Resource, reqparse
+from flask_restful import Resource, inputs, reqparse
+from sqlalchemy.exc import IntegrityError
+import base64
+import csv
+import datetime as dt
+import io
+import itertools
+import json
 
 from app import db
-from models import UserModel, RevokedTokenModel, GameModel, RiddleModel, ScoreboardEntryModel
+from database import read_only
+from metrics import jwt_required, jwt_refresh_token_required
+import metrics
+from hashing import HashingOverloadedError
+from cache import revoked_tokens, riddle_geometry, game_locations, content_versions, responses
+import bundles
+import serialization
+import streaming
+import tracking
+from models import (UserModel, GameModel, RiddleModel, ScoreboardEntryModel, LeaderboardEntryModel,
+                    IdempotencyKeyModel, SplitTimeModel, GameCounterModel, ArchivedEntryModel, JobLeaseModel)
+
+
+def local_datetime(value):
+    """
+    Odczytuje datę zapisaną w formacie ISO 8601 z parametru zapytania
+
+    :param value: Data w formacie ISO 8601; data bez strefy czasowej traktowana jest jako czas lokalny serwera
+    :return: Data w czasie lokalnym serwera, bez strefy czasowej (tak jak daty zapisane w bazie danych)
+    """
+    value = dt.datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
 
 parser = reqparse.RequestParser()
 parser.add_argument('username', help='This field cannot be blank', required=True)
@@ -29,6 +60,311 @@ riddle_parser.add_argument('description', help='This field cannot be blank', req
 riddle_parser.add_argument('radius', help='This field cannot be blank', required=True)
 riddle_parser.add_argument('dominant_object', help='This field cannot be blank', required=True)
 
+advance_parser = reqparse.RequestParser()
+advance_parser.add_argument('latitude', type=float)
+advance_parser.add_argument('longitude', type=float)
+advance_parser.add_argument('expected_riddle', type=int)
+
+nearby_parser = reqparse.RequestParser()
+nearby_parser.add_argument('lat', type=float, required=True, location='args', help='This field cannot be blank')
+nearby_parser.add_argument('lon', type=float, required=True, location='args', help='This field cannot be blank')
+nearby_parser.add_argument('km', type=float, default=5.0, location='args')
+
+stats_parser = reqparse.RequestParser()
+stats_parser.add_argument('mode', location='args')
+stats_parser.add_argument('game_id', type=int, location='args')
+stats_parser.add_argument('limit', type=int, location='args')
+stats_parser.add_argument('cursor', location='args')
+stats_parser.add_argument('fields', location='args')
+stats_parser.add_argument('include_archived', type=inputs.boolean, default=False, location='args')
+
+export_parser = reqparse.RequestParser()
+export_parser.add_argument('format', choices=('csv', 'ndjson'), default='csv', location='args',
+                           help='Supported formats: csv, ndjson')
+export_parser.add_argument('game_id', type=int, location='args')
+export_parser.add_argument('since', type=local_datetime, location='args', help='Expected an ISO 8601 date')
+export_parser.add_argument('until', type=local_datetime, location='args', help='Expected an ISO 8601 date')
+export_parser.add_argument('include_archived', type=inputs.boolean, default=False, location='args')
+
+list_parser = reqparse.RequestParser()
+list_parser.add_argument('limit', type=int, location='args')
+list_parser.add_argument('cursor', location='args')
+list_parser.add_argument('fields', location='args')
+
+archive_parser = reqparse.RequestParser()
+archive_parser.add_argument('include_archived', type=inputs.boolean, default=False, location='args')
+
+user_games_parser = list_parser.copy()
+user_games_parser.add_argument('include_archived', type=inputs.boolean, default=False, location='args')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_POSITION_SAMPLES = 10000
+MAX_CLOCK_SKEW_SECONDS = 60
+MAX_NEARBY_KM = 100.0
+OVERLOADED_RESPONSE = {'message': 'Server is busy, please try again later'}, 503, {'Retry-After': '1'}
+SPLIT_FIELDS = ('riddle_no', 'seconds', 'elapsed_seconds', 'completed')
+SEGMENT_FIELDS = ('entry_id', 'username', 'seconds', 'elapsed_seconds')
+EXPORT_FIELDS = ('entry_id', 'user_id', 'username', 'game_id', 'game', 'current_riddle', 'finished', 'time_begin',
+                 'time_end', 'elapsed_seconds')
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+RIDDLE_IMPORT_FIELDS = ('riddle_no', 'latitude', 'longitude', 'description', 'radius', 'dominant_object')
+STATISTICS_FIELDS = {
+    'username': (('username',), lambda row, now: row.username),
+    'game': (('game_title',), lambda row, now: row.game_title),
+    'current_riddle': (('current_riddle',), lambda row, now: row.current_riddle),
+    'finished': (('finished',), lambda row, now: row.finished),
+    'time_begin': (('time_begin',), lambda row, now: int(row.time_begin.timestamp() * 1000)),
+    'elapsed_seconds': (('time_begin',), lambda row, now: row.rank_value if row.rank_group == 0
+                        else (now - row.time_begin).total_seconds())
+}
+
+
+def encode_cursor(key):
+    """
+    Koduje klucz ostatniego elementu strony do postaci nieprzezroczystego kursora
+
+    :param key: Lista lub krotka wartości, według których posortowano wyniki
+    :return: Kursor w postaci tekstu
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Dekoduje kursor utworzony przez funkcję encode_cursor
+
+    :param cursor: Kursor w postaci tekstu
+    :return: Lista wartości, według których posortowano wyniki, lub None w przypadku niepoprawnego kursora
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+    return key if isinstance(key, list) else None
+
+
+def is_paged(args):
+    """
+    Sprawdza, czy zapytanie o listę zawiera parametry stronicowania lub wyboru pól
+
+    :param args: Argumenty zapytania
+    :return: Informacja, czy należy zwrócić stronę listy (True/False)
+    """
+    return any(args[name] is not None for name in ('limit', 'cursor', 'fields'))
+
+
+def page_size(args):
+    """
+    Wyznacza liczbę elementów na stronie na podstawie parametru ``limit``
+
+    :param args: Argumenty zapytania
+    :return: Liczba elementów na stronie (od 1 do MAX_PAGE_SIZE)
+    """
+    return min(max(args['limit'] or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+
+
+def parse_fields(value, allowed):
+    """
+    Przetwarza parametr ``fields`` zawierający listę pól rozdzielonych przecinkami
+
+    :param value: Wartość parametru lub None
+    :param allowed: Dozwolone nazwy pól, w kolejności domyślnej
+    :return: Lista wybranych pól (wszystkie dozwolone pola, jeżeli parametr nie został podany) lub None, jeżeli lista
+             zawiera niedozwolone pole
+    """
+    if not value:
+        return list(allowed)
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields or any(field not in allowed for field in fields):
+        return None
+    return fields
+
+
+def invalid_fields(allowed):
+    """
+    Tworzy odpowiedź na zapytanie z niepoprawnym parametrem ``fields``
+
+    :param allowed: Dozwolone nazwy pól
+    :return: Odpowiedź z kodem 400
+    """
+    return {"message": f"Field list must be a comma-separated subset of: {', '.join(allowed)}"}, 400
+
+
+def validate_game_import(game, riddles):
+    """
+    Sprawdza poprawność danych gry i jej zagadek przesłanych do zaimportowania
+
+    :param game: Słownik z danymi gry (``title``, ``description``, ``riddles``)
+    :param riddles: Lista słowników z danymi zagadek
+    :return: Krotka (dane gry, lista danych zagadek, lista błędów); każdy błąd zawiera numer wiersza (0 dla danych
+             gry, 1 i kolejne dla zagadek), nazwę pola oraz opis błędu
+    """
+    errors = []
+
+    def error(row, field, message):
+        errors.append({'row': row, 'field': field, 'message': message})
+
+    title = str(game.get('title') or '').strip()
+    if not title or len(title) > 100:
+        error(0, 'title', 'Title is required and must be at most 100 characters long')
+    description = game.get('description')
+    if description is not None and len(str(description)) > 500:
+        error(0, 'description', 'Description must be at most 500 characters long')
+    try:
+        riddle_count = int(game.get('riddles', len(riddles)))
+    except (TypeError, ValueError):
+        riddle_count = None
+        error(0, 'riddles', 'Riddle count must be an integer')
+    if riddle_count is not None and riddle_count != len(riddles):
+        error(0, 'riddles', f'Game declares {riddle_count} riddles but {len(riddles)} were given')
+
+    out_riddles = []
+    seen = {}
+    for row, riddle in enumerate(riddles, 1):
+        if not isinstance(riddle, dict):
+            error(row, None, 'Riddle must be an object')
+            continue
+        out = {}
+        for field, convert in (('riddle_no', int), ('latitude', float), ('longitude', float)):
+            try:
+                out[field] = convert(riddle[field])
+            except KeyError:
+                error(row, field, 'This field cannot be blank')
+            except (TypeError, ValueError):
+                error(row, field, f'Value {riddle[field]!r} is invalid')
+        try:
+            out['radius'] = int(riddle.get('radius') or 100)
+            if out['radius'] <= 0:
+                error(row, 'radius', 'Radius must be positive')
+        except (TypeError, ValueError):
+            error(row, 'radius', f'Value {riddle["radius"]!r} is invalid')
+        for field, limit in (('description', 500), ('dominant_object', 100)):
+            value = riddle.get(field)
+            if field == 'dominant_object' and not value:
+                error(row, field, 'This field cannot be blank')
+            elif value is not None and len(str(value)) > limit:
+                error(row, field, f'Value must be at most {limit} characters long')
+            out[field] = str(value) if value is not None else None
+        if 'latitude' in out and not -90 <= out['latitude'] <= 90:
+            error(row, 'latitude', 'Latitude must be between -90 and 90')
+        if 'longitude' in out and not -180 <= out['longitude'] <= 180:
+            error(row, 'longitude', 'Longitude must be between -180 and 180')
+        if 'riddle_no' in out:
+            if out['riddle_no'] in seen:
+                error(row, 'riddle_no', f'Riddle number is already used in row {seen[out["riddle_no"]]}')
+            else:
+                seen[out['riddle_no']] = row
+            if not 1 <= out['riddle_no'] <= len(riddles):
+                error(row, 'riddle_no', f'Riddle number must be between 1 and {len(riddles)}')
+        out_riddles.append(out)
+
+    out_game = {'title': title, 'description': description, 'riddles': riddle_count}
+    return out_game, out_riddles, errors
+
+
+def cached_body(key, version, build):
+    """
+    Pobiera zserializowaną treść odpowiedzi z pamięci podręcznej, tworząc ją w razie potrzeby
+
+    :param key: Klucz treści (np. ``game-1``)
+    :param version: Numer wersji treści
+    :param build: Funkcja zwracająca treść odpowiedzi zgodną z notacją JSON lub None, jeżeli treść nie istnieje
+    :return: Treść odpowiedzi w formacie JSON (bytes) lub None, jeżeli treść nie istnieje
+    """
+    body = responses.get((key, version))
+    if body is None:
+        data = build()
+        if data is None:
+            return None
+        body = serialization.dumps(data) + b"\n"
+        responses.put((key, version), body)
+    return body
+
+
+def game_details(game_id):
+    """
+    Pobiera informacje o grze
+
+    :param game_id: Identyfikator gry
+    :return: Informacje o grze zapisane zgodnie z notacją JSON lub None, jeżeli gra nie istnieje
+    """
+    game = GameModel.find_by_id(game_id)
+    return GameModel.serialize([game]) if game is not None else None
+
+
+def prewarm_caches():
+    """
+    Wypełnia pamięci podręczne bieżącego procesu: wczytuje unieważnione żetony JWT oraz katalog gier - listę gier,
+    indeks przestrzenny gier oraz dla każdej gry jej szczegóły, zagadki, geometrię zagadek i stałe części pakietów gry
+    """
+    revoked_tokens.sync(force=True)
+    content_versions.sync(force=True)
+    catalogue = cached_body("games", content_versions.get("catalogue"), GameModel.return_all)
+    game_locations.load()
+    for game in json.loads(catalogue)['games']:
+        game_id = game['id']
+        version = content_versions.get(f"game:{game_id}")
+        cached_body(f"game-{game_id}", version, lambda: game_details(game_id))
+        cached_body(f"riddles-{game_id}", version, lambda: RiddleModel.print_riddles_for_game(game_id))
+        riddle_geometry.get_game(game_id)
+        for encoding in bundles.ENCODINGS:
+            bundles.get_static_part(game_id, encoding)
+
+
+def cached_json_response(key, version, build, private=False):
+    """
+    Tworzy odpowiedź JSON z treścią przechowywaną w pamięci podręcznej oraz obsługuje zapytania warunkowe.
+
+    Znacznik ETag wyznaczany jest z klucza i numeru wersji treści, dlatego odpowiedź 304 (Not Modified) na zapytanie
+    z nagłówkiem If-None-Match nie wymaga odwołania do bazy danych ani serializacji.
+
+    :param key: Klucz treści (np. ``game-1``)
+    :param version: Numer wersji treści
+    :param build: Funkcja zwracająca treść odpowiedzi zgodną z notacją JSON lub None, jeżeli treść nie istnieje
+    :param private: Informacja, czy odpowiedź może być przechowywana wyłącznie w pamięci podręcznej klienta
+    :return: Obiekt odpowiedzi Flask
+    """
+    etag = f"{key}.v{version}"
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        body = cached_body(key, version, build)
+        if body is None:
+            return {"message": "Not found"}, 404
+        response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'public, no-cache'
+    return response
+
+
+def get_current_user_id():
+    """
+    Pobiera identyfikator aktualnie zalogowanego użytkownika z żetonu JWT
+
+    Żetony wystawione przed dodaniem identyfikatora do żetonu są obsługiwane przez wyszukanie użytkownika
+    w bazie danych.
+
+    :return: Identyfikator użytkownika
+    """
+    user_id = get_jwt_claims().get('id')
+    if user_id is None:
+        user_id = UserModel.find_by_username(get_jwt_identity()).id
+    return user_id
+
+
+def has_admin_rights():
+    """
+    Sprawdza, czy aktualnie zalogowany użytkownik posiada prawa administratora aplikacji
+
+    Informacja zapisana w żetonie JWT może być nieaktualna, dlatego uprawnienia są sprawdzane w bazie danych.
+    Dzięki temu nadanie lub odebranie praw administratora działa natychmiast, również dla wcześniej wystawionych
+    żetonów.
+
+    :return: Informacja o posiadaniu praw administratora (True/False)
+    """
+    return UserModel.is_admin(get_current_user_id())
+
 
 class UserRegistration(Resource):
     """
@@ -42,10 +378,13 @@ class UserRegistration(Resource):
         if UserModel.find_by_username(data['username']):
             return {'message': f"User {data['username']} already exists"}
 
-        new_user = UserModel(
-            username=data['username'],
-            password=UserModel.generate_hash(data['password'])
-        )
+        try:
+            new_user = UserModel(
+                username=data['username'],
+                password=UserModel.generate_hash(data['password'])
+            )
+        except HashingOverloadedError:
+            return OVERLOADED_RESPONSE
         try:
             new_user.save_to_db()
             return {
@@ -59,6 +398,10 @@ class UserLogin(Resource):
     """
     Zasób odpowiadający za zalogowanie użytkownika i przydzielenie mu żetonu dostępowego JWT (JSON Web Token).
 
+    Jeżeli skrót hasła użytkownika wygenerowano z nieaktualnymi parametrami, po poprawnym zalogowaniu skrót jest
+    generowany ponownie. Gdy pula procesów obliczających skróty jest przeciążona, skrót pozostaje bez zmian (zostanie
+    wygenerowany przy kolejnym logowaniu), a użytkownik zostaje zalogowany.
+
     Udziela odpowiedzi na zapytania wysłane metodą POST.
     """
     def post(self):
@@ -68,9 +411,19 @@ class UserLogin(Resource):
         if not current_user:
             return {'message': f'User {data["username"]} doesn\'t exist'}
 
-        if UserModel.verify_hash(data['password'], current_user.password):
-            access_token = create_access_token(identity=data['username'])
-            refresh_token = create_refresh_token(identity=data['username'])
+        try:
+            password_valid = UserModel.verify_hash(data['password'], current_user.password)
+        except HashingOverloadedError:
+            return OVERLOADED_RESPONSE
+
+        if password_valid:
+            try:
+                current_user.rehash_if_needed(data['password'])
+            except HashingOverloadedError:
+                current_app.logger.warning("Password hashing pool is busy, skipping rehash for user %s",
+                                           current_user.username)
+            access_token = create_access_token(identity=current_user)
+            refresh_token = create_refresh_token(identity=current_user)
             resp = jsonify({
                 'message': f'Logged in as {current_user.username}',
                 'access_token': access_token,
@@ -91,15 +444,14 @@ class UserLogout(Resource):
     """
     @jwt_refresh_token_required
     def post(self):
-        jti = get_raw_jwt()['jti']
+        raw_jwt = get_raw_jwt()
         try:
-            revoked_token = RevokedTokenModel(jti=jti)
-            revoked_token.add()
+            revoked_tokens.add(raw_jwt['jti'], dt.datetime.utcfromtimestamp(raw_jwt['exp']))
             resp = jsonify({'message': 'Refresh token has been revoked'})
             unset_jwt_cookies(resp)
             return resp
-        except Exception as e:
-            print(e)
+        except Exception:
+            current_app.logger.exception("Failed to revoke token")
             return {'message': 'Something went wrong'}, 500
 
 
@@ -112,7 +464,8 @@ class TokenRefresh(Resource):
     @jwt_refresh_token_required
     def post(self):
         current_user = get_jwt_identity()
-        access_token = create_access_token(identity=current_user)
+        claims = get_jwt_claims()
+        access_token = create_access_token(identity=current_user, user_claims=claims if 'id' in claims else None)
         resp = jsonify({'access_token': access_token})
         set_access_cookies(resp, access_token)
         return resp
@@ -122,66 +475,296 @@ class GameDetailsResource(Resource):
     """
     Zasób odpowiadający za wyświetlenie szczegółów dotyczących wybranej gry
 
+    Odpowiedź zawiera znacznik ETag i jest przechowywana w pamięci podręcznej do czasu zmiany wersji gry.
+
     Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT.
     """
     @jwt_required
     def get(self, game_id):
-        return GameModel.serialize([GameModel.find_by_id(game_id)])
+        return cached_json_response(f"game-{game_id}", content_versions.get(f"game:{game_id}"),
+                                    lambda: game_details(game_id), private=True)
 
 
 class RiddleListResource(Resource):
     """
     Zasób odpowiadający za wyświetlenie zagadek powiązanych z wybraną grą
 
+    Odpowiedź zawiera znacznik ETag i jest przechowywana w pamięci podręcznej do czasu zmiany wersji gry.
+
     Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT.
     """
     @jwt_required
     def get(self, game_id):
-        return RiddleModel.print_riddles_for_game(game_id)
+        return cached_json_response(f"riddles-{game_id}", content_versions.get(f"game:{game_id}"),
+                                    lambda: RiddleModel.print_riddles_for_game(game_id), private=True)
+
+
+class GameBundleResource(Resource):
+    """
+    Zasób odpowiadający za pobranie pakietu gry: informacji o grze, wszystkich zagadek oraz postępu aktualnie
+    zalogowanego użytkownika w jednej odpowiedzi.
+
+    Pakiet kodowany jest w formacie MessagePack (jeżeli nagłówek Accept wskazuje ``application/msgpack``) lub JSON,
+    kompresowanym algorytmem gzip, jeżeli pozwala na to nagłówek Accept-Encoding.
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT.
+    """
+    @jwt_required
+    def get(self, game_id):
+        entry = ScoreboardEntryModel.filter_by_user_and_game(get_current_user_id(), game_id)
+        progress = ScoreboardEntryModel.serialize([entry])['game_data'][0] if entry is not None else None
+        encoding = bundles.choose_encoding(request.accept_mimetypes, request.accept_encodings)
+        body = bundles.encode_bundle(game_id, progress, encoding)
+        if body is None:
+            return {"message": "Not found"}, 404
+        response = current_app.response_class(
+            body,
+            mimetype=bundles.MSGPACK_MIMETYPES[0] if encoding == 'msgpack' else bundles.JSON_MIMETYPE
+        )
+        if encoding == 'gzip':
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept, Accept-Encoding'
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
 
 
 class UserGamesStatusResource(Resource):
     """
     Zasób odpowiadający za wyświetlenie postępu aktualnie zalogowanego użytkownika we wszystkich grach
 
+    Parametry ``limit`` i ``cursor`` dzielą listę na strony (od najpóźniej rozpoczętej gry), a parametr ``fields``
+    ogranicza zwracane pola. Bez tych parametrów zwracana jest pełna lista. Parametr ``include_archived=true``
+    dołącza do listy gry przeniesione do archiwum.
+
     Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT.
     """
     @jwt_required
     def get(self):
-        current_user = get_jwt_identity()
-        return ScoreboardEntryModel.print_by_user(current_user)
+        args = user_games_parser.parse_args()
+        if not is_paged(args):
+            return ScoreboardEntryModel.print_by_user(get_current_user_id(), args['include_archived'])
+        fields = parse_fields(args['fields'], ScoreboardEntryModel.FIELDS)
+        if fields is None:
+            return invalid_fields(ScoreboardEntryModel.FIELDS)
+        after = None
+        if args['cursor']:
+            after = decode_cursor(args['cursor'])
+            try:
+                after = (dt.datetime.fromisoformat(after[0]), int(after[1]))
+            except (IndexError, TypeError, ValueError):
+                return {"message": "Invalid cursor"}, 400
+        limit = page_size(args)
+        rows = ScoreboardEntryModel.page_by_user(get_current_user_id(), fields, after, limit + 1,
+                                                 args['include_archived'])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor((rows[-1].key_time.isoformat(), rows[-1].key_id))
+        return {
+            "game_data": serialization.rows_to_dicts([row[2:] for row in rows], fields,
+                                                     ScoreboardEntryModel.FORMATTERS),
+            "next_cursor": next_cursor
+        }
 
 
 class GameProgressResource(Resource):
     """
     Zasób odpowiadający za wyświetlenie postępu aktualnie zalogowanego użytkownika w wybranej grze
 
+    Parametr ``include_archived=true`` pozwala odczytać postęp w grze przeniesionej do archiwum.
+
     Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT.
     """
     @jwt_required
     def get(self, game_id):
-        current_user = get_jwt_identity()
-        return ScoreboardEntryModel.print_by_user_and_game(current_user, game_id)
+        args = archive_parser.parse_args()
+        return ScoreboardEntryModel.print_by_user_and_game(get_current_user_id(), game_id, args['include_archived'])
+
+
+class GameSplitsResource(Resource):
+    """
+    Zasób odpowiadający za wyświetlenie czasów rozwiązania kolejnych zagadek (międzyczasów) przez aktualnie
+    zalogowanego użytkownika w wybranej grze
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT.
+    """
+    @jwt_required
+    def get(self, game_id):
+        entry = ScoreboardEntryModel.filter_by_user_and_game(get_current_user_id(), game_id)
+        if entry is None:
+            return {"message": "Game not started"}, 404
+        return {
+            "splits": serialization.rows_to_dicts(SplitTimeModel.find_for_entry(entry.id), SPLIT_FIELDS,
+                                                  {'completed': serialization.legacy_datetime})
+        }
+
+
+class SegmentLeaderboardResource(Resource):
+    """
+    Zasób odpowiadający za pobranie rankingu wybranej zagadki (odcinka gry), posortowanego rosnąco według czasu
+    rozwiązania zagadki.
+
+    Ranking odczytywany jest z tabeli międzyczasów, uzupełnianej przy każdej zmianie postępu graczy. Parametry
+    ``limit`` i ``cursor`` dzielą ranking na strony, a parametr ``fields`` ogranicza zwracane pola.
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET.
+    """
+    @read_only
+    def get(self, game_id, riddle_no):
+        args = list_parser.parse_args()
+        fields = parse_fields(args['fields'], SEGMENT_FIELDS)
+        if fields is None:
+            return invalid_fields(SEGMENT_FIELDS)
+        after = None
+        if args['cursor']:
+            after = decode_cursor(args['cursor'])
+            if after is None or len(after) != 2 or not isinstance(after[0], (int, float)) \
+                    or not isinstance(after[1], int):
+                return {"message": "Invalid cursor"}, 400
+        limit = page_size(args)
+        rows = SplitTimeModel.page_segment(game_id, riddle_no, after, limit + 1)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor((rows[-1].seconds, rows[-1].entry_id))
+        entries = serialization.rows_to_dicts(rows, SEGMENT_FIELDS)
+        return {
+            "riddle_no": riddle_no,
+            "entries": [{field: entry[field] for field in fields} for entry in entries],
+            "next_cursor": next_cursor
+        }
+
+
+class GameAnalyticsResource(Resource):
+    """
+    Zasób odpowiadający za pobranie statystyk wybranej gry: liczby graczy, którzy rozpoczęli i ukończyli grę, odsetka
+    ukończeń, mediany i 90. percentyla czasu ukończenia gry (szacowanych na podstawie histogramu) oraz lejka zagadek -
+    dla każdej zagadki liczby graczy, którzy do niej dotarli i ją rozwiązali, oraz odsetka graczy, którzy na niej
+    zakończyli grę lub nadal ją rozwiązują.
+
+    Statystyki wyznaczane są z liczników aktualizowanych przy każdej zmianie postępu graczy.
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT użytkownika
+    z prawami administratora.
+    """
+    @jwt_required
+    @read_only
+    def get(self, game_id):
+        if not has_admin_rights():
+            return {"message": "Admin privileges are required to perform this action"}, 403
+        game = GameModel.find_by_id(game_id)
+        if game is None:
+            return {"message": "Game not found"}, 404
+        counters = GameCounterModel.find_for_game(game_id)
+        reached = counters[GameCounterModel.REACHED]
+        histogram = counters[GameCounterModel.FINISH_TIME]
+        started = reached.get(1, 0)
+        finished = counters[GameCounterModel.FINISHED].get(0, 0)
+        funnel = []
+        for riddle_no in range(1, game.riddles + 1):
+            count = reached.get(riddle_no, 0)
+            solved = reached.get(riddle_no + 1, 0) if riddle_no < game.riddles else finished
+            funnel.append({
+                "riddle_no": riddle_no,
+                "reached": count,
+                "solved": solved,
+                "drop_off_rate": (count - solved) / count if count else None
+            })
+        return {
+            "game_id": game_id,
+            "started": started,
+            "finished": finished,
+            "completion_rate": finished / started if started else None,
+            "finish_time_seconds": {
+                "p50": GameCounterModel.quantile(histogram, 0.5),
+                "p90": GameCounterModel.quantile(histogram, 0.9)
+            },
+            "funnel": funnel
+        }
+
+
+def stored_response(user_id, game_id, idempotency_key):
+    """
+    Pobiera odpowiedź udzieloną wcześniej na zapytanie o przejście do kolejnej zagadki z podanym kluczem
+    idempotentności
+
+    :param user_id: Identyfikator użytkownika
+    :param game_id: Identyfikator gry, której dotyczy bieżące zapytanie
+    :param idempotency_key: Klucz idempotentności
+    :return: Zapisana odpowiedź, odpowiedź z kodem 422, jeżeli klucz wykorzystano w innej grze, lub None, jeżeli
+             klucz nie został wykorzystany albo zapytanie jest nadal przetwarzane
+    """
+    stored = IdempotencyKeyModel.find(user_id, idempotency_key)
+    if stored is None:
+        return None
+    stored_game_id, response = stored
+    if stored_game_id is not None and stored_game_id != game_id:
+        return {"message": "Idempotency-Key was already used for another game"}, 422
+    return response
 
 
 class GameAdvancementResource(Resource):
     """
     Zasób odpowiadający za aktualizację postępu aktualnie zalogowanego użytkownika we wskazanej grze
 
+    Serwer sprawdza, czy gracz znajduje się w obszarze bieżącej zagadki (``latitude``, ``longitude``). Położenie jest
+    wymagane, chyba że wyłączono opcję ``GEOFENCE_REQUIRE_LOCATION`` - wtedy zapytania bez położenia nie są
+    sprawdzane. Jeżeli położenie zagadki jest nieznane, gracz nie zostaje przesunięty.
+
+    Parametr ``expected_riddle`` określa numer zagadki, którą zdaniem klienta rozwiązał gracz - jeżeli gracz został
+    w międzyczasie przesunięty do innej zagadki, zwracany jest kod 409 wraz z bieżącym postępem. Zapytanie
+    z nagłówkiem ``Idempotency-Key`` wykorzystanym już wcześniej przez użytkownika nie zmienia postępu, a zwraca
+    odpowiedź udzieloną na pierwsze zapytanie. Klucz wykorzystany wcześniej w innej grze powoduje zwrócenie kodu 422.
+
     Udziela odpowiedzi na zapytania wysłane metodą POST zawierające "ciasteczko" z żetonem JWT.
     """
     @jwt_required
     def post(self, game_id):
-        import datetime as dt
-        current_user = get_jwt_identity()
-        current_progress = ScoreboardEntryModel.filter_by_user_and_game(current_user, game_id)
-        current_game = GameModel.find_by_id(game_id)
-        if current_progress.current_riddle + 1 > current_game.riddles:
-            current_progress.finished = True
-            current_progress.time_end = dt.datetime.now()
+        args = advance_parser.parse_args()
+        user_id = get_current_user_id()
+        idempotency_key = request.headers.get('Idempotency-Key') or None
+        if idempotency_key is not None:
+            if len(idempotency_key) > 100:
+                return {"message": "Idempotency-Key header is too long"}, 400
+            stored = stored_response(user_id, game_id, idempotency_key)
+            if stored is not None:
+                return stored
+        expected_riddle = args['expected_riddle']
+        if args['latitude'] is None or args['longitude'] is None:
+            if current_app.config['GEOFENCE_REQUIRE_LOCATION']:
+                return {"message": "Player location is required"}, 400
         else:
-            current_progress.current_riddle = ScoreboardEntryModel.current_riddle + 1
-        db.session.commit()
+            if expected_riddle is None:
+                current_progress = ScoreboardEntryModel.filter_by_user_and_game(user_id, game_id)
+                if current_progress is None:
+                    return {"message": "Game not started"}, 404
+                expected_riddle = current_progress.current_riddle
+            target = riddle_geometry.get(game_id, expected_riddle)
+            if target is None:
+                if ScoreboardEntryModel.filter_by_user_and_game(user_id, game_id) is None:
+                    return {"message": "Game not started"}, 404
+                return {"message": "Riddle location is unknown"}, 403
+            if not target.contains(args['latitude'], args['longitude']):
+                return {
+                    "message": "You are too far from the riddle location",
+                    "distance": round(target.distance(args['latitude'], args['longitude']))
+                }, 403
+        try:
+            advanced, current_progress = ScoreboardEntryModel.advance(user_id, game_id, expected_riddle,
+                                                                      idempotency_key)
+        except IntegrityError:
+            db.session.rollback()
+            if idempotency_key is None:
+                raise
+            stored = stored_response(user_id, game_id, idempotency_key)
+            if stored is None:
+                return {"message": "Request with this Idempotency-Key is already being processed"}, 409
+            return stored
+        if current_progress is None:
+            return {"message": "Game not started"}, 404
+        if not advanced:
+            message = "Game already finished" if current_progress.finished else "Riddle already solved"
+            return dict(ScoreboardEntryModel.serialize([current_progress]), message=message), 409
         return ScoreboardEntryModel.serialize([current_progress])
 
 
@@ -193,54 +776,231 @@ class GameStartResource(Resource):
     """
     @jwt_required
     def post(self, game_id):
-        username = get_jwt_identity()
-        user = UserModel.find_by_username(username)
-        is_game_started = ScoreboardEntryModel.filter_by_user_and_game(username, game_id)
-        print(is_game_started)
-        if is_game_started is None:
-            game = ScoreboardEntryModel(
-                user_id=user.id,
-                game_id=game_id
-            )
-            game.save_to_db()
-        return ScoreboardEntryModel.serialize(ScoreboardEntryModel.filter_by_user(username))
+        user_id = get_current_user_id()
+        game = GameModel.find_by_id(game_id)
+        if game is None:
+            return {"message": "Game not found"}, 404
+        ScoreboardEntryModel.start(user_id, get_jwt_identity(), game)
+        return ScoreboardEntryModel.serialize(ScoreboardEntryModel.filter_by_user(user_id))
 
 
 class StatisticsResource(Resource):
     """
     Zasób odpowiadający za pobranie postępu wszystkich graczy we wszystkich grach.
 
+    Parametr ``mode=leaderboard`` zwraca posortowany ranking (najpierw gry ukończone, następnie według czasu gry),
+    opcjonalnie ograniczony do jednej gry (``game_id``) i podzielony na strony (``limit``, ``cursor``).
+    Bez tego parametru wpisy zwracane są w kolejności dołączania graczy do gier - w całości (przesyłane
+    w częściach) lub, jeżeli podano parametr ``limit``, ``cursor`` lub ``fields``, stronami. Parametr ``fields``
+    ogranicza zwracane pola. Gry przeniesione do archiwum uwzględniane są tylko z parametrem ``include_archived=true``.
+
     Udziela odpowiedzi na zapytania wysłane metodą GET.
     """
+    @read_only
     def get(self):
-        import datetime as dt
-        out_entries = []
-        scoreboard = ScoreboardEntryModel.get_all_entries()
-        for sbentry in scoreboard:
-            user = UserModel.find_by_id(sbentry.user_id)
-            game = GameModel.find_by_id(sbentry.game_id)
-            elapsed_seconds = (sbentry.time_end - sbentry.time_begin).total_seconds() \
-                if sbentry.time_end else (dt.datetime.now() - sbentry.time_begin).total_seconds()
-            entry = {
-                "username": user.username,
-                "game": game.title,
-                "current_riddle": sbentry.current_riddle,
-                "finished": sbentry.finished,
-                "time_begin": int(sbentry.time_begin.timestamp() * 1000),
+        args = stats_parser.parse_args()
+        if args['mode'] == 'leaderboard' or is_paged(args):
+            return self.get_page(args, args['mode'] == 'leaderboard')
+        entries = self.entries(args['include_archived'])
+        return current_app.response_class(stream_with_context(serialization.stream_list("entries", entries)),
+                                          mimetype='application/json')
+
+    @staticmethod
+    def entries(include_archived=False):
+        """
+        Generator wpisów zawierających postęp wszystkich graczy we wszystkich grach
+
+        :param include_archived: Informacja, czy uwzględnić wpisy z archiwum
+        :return: Generator słowników zgodnych z notacją JSON
+        """
+        now = dt.datetime.now()
+        rows = ScoreboardEntryModel.get_statistics()
+        if include_archived:
+            rows = itertools.chain(rows, ArchivedEntryModel.get_statistics())
+        for username, title, current_riddle, finished, time_begin, time_end in rows:
+            elapsed_seconds = (time_end - time_begin).total_seconds() \
+                if time_end else (now - time_begin).total_seconds()
+            yield {
+                "username": username,
+                "game": title,
+                "current_riddle": current_riddle,
+                "finished": finished,
+                "time_begin": int(time_begin.timestamp() * 1000),
                 "elapsed_seconds": elapsed_seconds
             }
-            out_entries.append(entry)
-        return {"entries": out_entries}
+
+    @staticmethod
+    def get_page(args, by_rank):
+        """
+        Pobiera stronę rankingu graczy lub listy wpisów, wczytując z bazy danych tylko kolumny potrzebne do utworzenia
+        wybranych pól
+
+        :param args: Argumenty zapytania
+        :param by_rank: Informacja, czy wpisy należy posortować według pozycji w rankingu (True) czy według kolejności
+                        dołączania graczy do gier (False)
+        :return: Strona wpisów oraz kursor kolejnej strony, zapisane zgodnie z notacją JSON
+        """
+        fields = parse_fields(args['fields'], STATISTICS_FIELDS)
+        if fields is None:
+            return invalid_fields(STATISTICS_FIELDS)
+        limit = page_size(args)
+        after = None
+        if args['cursor']:
+            after = decode_cursor(args['cursor'])
+            types = (int, (int, float), int) if by_rank else (int,)
+            if after is None or len(after) != len(types) \
+                    or not all(isinstance(value, kind) for value, kind in zip(after, types)):
+                return {"message": "Invalid cursor"}, 400
+            if not by_rank:
+                after = after[0]
+        columns = list(dict.fromkeys(column for field in fields for column in STATISTICS_FIELDS[field][0]))
+        page = LeaderboardEntryModel.page if by_rank else LeaderboardEntryModel.page_by_entry
+        rows = page(args['game_id'], after, limit + 1, columns, args['include_archived'])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor((last.rank_group, last.rank_value, last.entry_id) if by_rank
+                                        else (last.entry_id,))
+        now = dt.datetime.now()
+        return {
+            "entries": [{field: STATISTICS_FIELDS[field][1](row, now) for field in fields} for row in rows],
+            "next_cursor": next_cursor
+        }
+
+
+class StatisticsExportResource(Resource):
+    """
+    Zasób odpowiadający za eksport postępu wszystkich graczy (wraz z nazwami użytkowników i tytułami gier) na potrzeby
+    raportów, w formacie CSV (``format=csv``, domyślnie) lub NDJSON (``format=ndjson``).
+
+    Wpisy można ograniczyć do jednej gry (``game_id``) oraz do graczy, którzy dołączyli do gry w podanym przedziale
+    czasu (``since`` - włącznie, ``until`` - wyłącznie; daty w formacie ISO 8601). Parametr ``include_archived=true``
+    dołącza wpisy przeniesione do archiwum. Wpisy odczytywane są z bazy danych partiami i przesyłane w częściach, więc
+    zużycie pamięci nie zależy od liczby wpisów.
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT użytkownika
+    z prawami administratora.
+    """
+    @jwt_required
+    @read_only
+    def get(self):
+        if not has_admin_rights():
+            return {"message": "Admin privileges are required to perform this action"}, 403
+        args = export_parser.parse_args()
+        rows = self.rows(args['game_id'], args['since'], args['until'], args['include_archived'])
+        if args['format'] == 'csv':
+            body = serialization.stream_csv(EXPORT_FIELDS, rows)
+        else:
+            body = serialization.stream_ndjson(dict(zip(EXPORT_FIELDS, row)) for row in rows)
+        response = current_app.response_class(stream_with_context(body), mimetype=EXPORT_MIMETYPES[args['format']])
+        response.headers['Content-Disposition'] = f'attachment; filename=scoreboard.{args["format"]}'
+        return response
+
+    @staticmethod
+    def rows(game_id, since, until, include_archived=False):
+        """
+        Generator wierszy eksportu
+
+        :param game_id: Identyfikator gry (None - wszystkie gry)
+        :param since: Najwcześniejsza data dołączenia do gry (None - bez ograniczenia)
+        :param until: Data dołączenia do gry, przed którą musi dołączyć gracz (None - bez ograniczenia)
+        :param include_archived: Informacja, czy uwzględnić wpisy z archiwum
+        :return: Generator krotek zawierających wartości pól w kolejności EXPORT_FIELDS
+        """
+        now = dt.datetime.now()
+        for entry_id, user_id, username, entry_game_id, title, current_riddle, finished, time_begin, time_end \
+                in ScoreboardEntryModel.get_export(game_id, since, until, include_archived=include_archived):
+            yield (
+                entry_id,
+                user_id,
+                username,
+                entry_game_id,
+                title,
+                current_riddle,
+                finished,
+                time_begin.isoformat(),
+                time_end.isoformat() if time_end else None,
+                ((time_end or now) - time_begin).total_seconds()
+            )
+
+
+class StatisticsStreamResource(Resource):
+    """
+    Zasób odpowiadający za przesyłanie zmian w postępie graczy w czasie rzeczywistym (Server-Sent Events).
+
+    Po połączeniu widz otrzymuje zdarzenie ``snapshot`` z początkiem rankingu, a następnie zdarzenia ``progress``
+    dla każdego rozpoczęcia gry, przejścia do kolejnej zagadki i ukończenia gry oraz okresowo aktualny ranking.
+    Po osiągnięciu limitu widzów połączonych z procesem (``SSE_MAX_SUBSCRIBERS``) zwracany jest kod 503.
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET.
+    """
+    def get(self):
+        try:
+            subscriber = streaming.broadcaster.subscribe()
+        except streaming.SubscriberLimitError:
+            retry_after = str(int(current_app.config['SSE_KEEPALIVE_SECONDS']))
+            return {"message": "Too many spectators are connected, please try again later"}, 503, \
+                {'Retry-After': retry_after}
+        response = current_app.response_class(stream_with_context(streaming.broadcaster.stream(subscriber)),
+                                              mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class AllGamesResource(Resource):
     """
     Zasób odpowiadający za pobranie wszystkich dostępnych na serwerze gier.
 
+    Odpowiedź zawiera znacznik ETag i jest przechowywana w pamięci podręcznej do czasu zmiany listy gier.
+    Parametry ``limit`` i ``cursor`` dzielą listę na strony, a parametr ``fields`` ogranicza zwracane pola.
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET.
+    """
+    def get(self):
+        args = list_parser.parse_args()
+        if not is_paged(args):
+            return cached_json_response("games", content_versions.get("catalogue"), GameModel.return_all)
+        fields = parse_fields(args['fields'], GameModel.FIELDS)
+        if fields is None:
+            return invalid_fields(GameModel.FIELDS)
+        after = None
+        if args['cursor']:
+            after = decode_cursor(args['cursor'])
+            if after is None or len(after) != 1 or not isinstance(after[0], int):
+                return {"message": "Invalid cursor"}, 400
+            after = after[0]
+        limit = page_size(args)
+
+        def build():
+            rows = GameModel.page(fields, after, limit + 1)
+            next_cursor = encode_cursor((rows[limit - 1].key_id,)) if len(rows) > limit else None
+            return {
+                "games": serialization.rows_to_dicts([row[1:] for row in rows[:limit]], fields),
+                "next_cursor": next_cursor
+            }
+        return cached_json_response(f"games-{after}-{limit}-{'.'.join(fields)}", content_versions.get("catalogue"),
+                                    build)
+
+
+class NearbyGamesResource(Resource):
+    """
+    Zasób odpowiadający za wyszukanie gier, których pierwsza zagadka znajduje się w pobliżu gracza.
+
+    Przyjmuje parametry ``lat``, ``lon`` oraz ``km`` (promień wyszukiwania w kilometrach, domyślnie 5).
+    Gry są zwracane w kolejności rosnącej odległości.
+
     Udziela odpowiedzi na zapytania wysłane metodą GET.
     """
     def get(self):
-        return GameModel.return_all()
+        args = nearby_parser.parse_args()
+        if not (-90 <= args['lat'] <= 90 and -180 <= args['lon'] <= 180) or not 0 < args['km'] <= MAX_NEARBY_KM:
+            return {"message": f"Invalid coordinates or radius (at most {MAX_NEARBY_KM:g} km)"}, 400
+        games = []
+        for distance, game in game_locations.nearby(args['lat'], args['lon'], args['km'] * 1000):
+            games.append(dict(game, distance=round(distance)))
+        return {'games': games}
 
 
 class GameCreationResource(Resource):
@@ -251,8 +1011,7 @@ class GameCreationResource(Resource):
     """
     @jwt_required
     def put(self):
-        claims = get_jwt_claims()
-        if claims["admin"]:
+        if has_admin_rights():
             data = game_parser.parse_args()
             newgame = GameModel(
                 title=data["title"],
@@ -260,6 +1019,7 @@ class GameCreationResource(Resource):
                 riddles=int(data["riddles"])
             )
             newgame.save_to_db()
+            content_versions.bump("catalogue", f"game:{newgame.id}")
             return GameModel.serialize([newgame])
         else:
             return {"message": "Admin privileges are required to perform this action"}
@@ -273,8 +1033,7 @@ class RiddleCreationResource(Resource):
     """
     @jwt_required
     def put(self, game_id):
-        claims = get_jwt_claims()
-        if claims["admin"]:
+        if has_admin_rights():
             data = riddle_parser.parse_args()
             newriddle = RiddleModel(
                 game_id=game_id,
@@ -285,7 +1044,133 @@ class RiddleCreationResource(Resource):
                 radius=int(data["radius"]),
                 dominant_object=data["dominant_object"]
             )
-            newriddle.save_to_db()
+            try:
+                newriddle.save_to_db()
+            except IntegrityError:
+                db.session.rollback()
+                return {"message": f"Riddle {newriddle.riddle_no} already exists in this game"}, 409
+            content_versions.bump(f"game:{game_id}")
             return RiddleModel.serialize([newriddle])
         else:
             return {"message": "Admin privileges are required to perform this action"}
+
+
+class PositionBatchResource(Resource):
+    """
+    Zasób odpowiadający za przyjmowanie położenia graczy przesyłanego wsadowo przez aplikacje mobilne.
+
+    Treść zapytania to obiekt JSON z listą ``samples``, której elementy zawierają pola ``timestamp`` (sekundy od
+    początku epoki Unix), ``latitude``, ``longitude`` oraz opcjonalnie ``user_id``. Próbki innych użytkowników może
+    przesyłać wyłącznie administrator aplikacji. Próbki ze znacznikiem czasu późniejszym od czasu serwera o więcej niż
+    ``MAX_CLOCK_SKEW_SECONDS`` sekund są odrzucane. Gracz, którego próbka znalazła się w obszarze bieżącej zagadki,
+    automatycznie przechodzi do kolejnej zagadki (czas osiągnięcia zagadki to czas otrzymania zapytania). Jedno
+    zapytanie przesuwa gracza co najwyżej o jedną zagadkę.
+
+    Udziela odpowiedzi na zapytania wysłane metodą POST zawierające "ciasteczko" z żetonem JWT.
+    """
+    @jwt_required
+    def post(self):
+        data = request.get_json(silent=True) or {}
+        samples = data.get('samples')
+        if not isinstance(samples, list) or not samples:
+            return {"message": "Field 'samples' must be a non-empty list"}, 400
+        if len(samples) > MAX_POSITION_SAMPLES:
+            return {"message": f"At most {MAX_POSITION_SAMPLES} samples can be sent at once"}, 413
+        current_user_id = get_current_user_id()
+        received = dt.datetime.now()
+        latest = received.timestamp() + MAX_CLOCK_SKEW_SECONDS
+        user_ids, timestamps, latitudes, longitudes = [], [], [], []
+        for index, sample in enumerate(samples):
+            try:
+                user_id = int(sample.get('user_id', current_user_id))
+                timestamp = float(sample['timestamp'])
+                latitude = float(sample['latitude'])
+                longitude = float(sample['longitude'])
+            except (AttributeError, KeyError, TypeError, ValueError):
+                return {"message": f"Sample {index} is invalid"}, 400
+            if not 0 <= timestamp <= latest:
+                return {"message": f"Sample {index} has an invalid timestamp"}, 400
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                return {"message": f"Sample {index} has invalid coordinates"}, 400
+            user_ids.append(user_id)
+            timestamps.append(timestamp)
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+        if any(user_id != current_user_id for user_id in user_ids) and not has_admin_rights():
+            return {"message": "Admin privileges are required to send samples of other users"}, 403
+        advanced = tracking.ingest_samples(user_ids, timestamps, latitudes, longitudes, received)
+        return {"processed": len(samples), "advanced": advanced}
+
+
+class GameImportResource(Resource):
+    """
+    Zasób odpowiadający za zaimportowanie gry wraz ze wszystkimi zagadkami.
+
+    Dane przyjmowane są w postaci JSON (``{"game": {...}, "riddles": [...]}``) lub CSV (``Content-Type: text/csv``,
+    wiersz nagłówka z polami zagadek, dane gry w parametrach ``title``, ``description`` i ``riddles`` adresu).
+    Wszystkie dane są sprawdzane przed zapisem, a gra i zagadki zapisywane są w jednej transakcji. W przypadku
+    błędów zwracana jest lista błędów dla poszczególnych wierszy i nic nie zostaje zapisane.
+
+    Udziela odpowiedzi na zapytania wysłane metodą PUT. Wymaga posiadania praw administratora aplikacji.
+    """
+    @jwt_required
+    def put(self):
+        if not has_admin_rights():
+            return {"message": "Admin privileges are required to perform this action"}
+        if request.mimetype == 'text/csv':
+            game = request.args.to_dict()
+            try:
+                riddles = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+            except csv.Error as e:
+                return {"message": f"Invalid CSV data: {e}"}, 400
+            riddles = [{key: value for key, value in riddle.items() if key in RIDDLE_IMPORT_FIELDS and value != ''}
+                       for riddle in riddles]
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict) or not isinstance(data.get('game'), dict) \
+                    or not isinstance(data.get('riddles'), list):
+                return {"message": "Request body must contain 'game' object and 'riddles' list"}, 400
+            game, riddles = data['game'], data['riddles']
+        game, riddles, errors = validate_game_import(game, riddles)
+        if errors:
+            return {"message": "Validation failed", "errors": errors}, 400
+        newgame = GameModel(**game)
+        try:
+            newgame.save_with_riddles(riddles)
+        except Exception:
+            current_app.logger.exception("Importing game %r failed", game.get('title'))
+            return {'message': 'Something went wrong'}, 500
+        content_versions.bump("catalogue", f"game:{newgame.id}")
+        result = GameModel.serialize([newgame])
+        result.update(RiddleModel.print_riddles_for_game(newgame.id))
+        return result
+
+
+class MetricsResource(Resource):
+    """
+    Zasób udostępniający pomiary wydajności bieżącego procesu serwera w formacie tekstowym Prometheus.
+
+    Jeżeli ustawiono opcję ``METRICS_TOKEN``, zapytanie musi zawierać nagłówek ``Authorization: Bearer <token>``.
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET.
+    """
+    def get(self):
+        token = current_app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return {"message": "Invalid metrics token"}, 401
+        return current_app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+class JobListResource(Resource):
+    """
+    Zasób odpowiadający za wyświetlenie stanu zadań wykonywanych w tle: dzierżawy, terminu następnego wykonania oraz
+    wyniku, czasu i liczby wykonań zadania.
+
+    Udziela odpowiedzi na zapytania wysłane metodą GET zawierające "ciasteczko" z żetonem JWT użytkownika
+    z prawami administratora.
+    """
+    @jwt_required
+    def get(self):
+        if not has_admin_rights():
+            return {"message": "Admin privileges are required to perform this action"}, 403
+        return JobLeaseModel.print_all()
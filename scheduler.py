@@ -0,0 +1,263 @@
+"""
+Moduł odpowiadający za okresowe zadania porządkowe wykonywane w tle.
+
+Każdy proces roboczy serwera uruchamia przy pierwszym zapytaniu wątek harmonogramu, który co około
+``SCHEDULER_POLL_SECONDS`` sekund sprawdza, czy nadszedł termin wykonania któregoś z zadań. Zadanie wykonuje tylko ten
+proces, który przejmie jego dzierżawę w bazie danych (JobLeaseModel), więc przy wielu procesach roboczych każde
+zadanie wykonywane jest raz w ustalonym odstępie czasu. Zadania nie są wykonywane w wątkach obsługujących zapytania.
+
+Odstępy między wykonaniami zadań oraz między kolejnymi sprawdzeniami są losowo wydłużane lub skracane
+(o ``SCHEDULER_JITTER`` ich długości), aby procesy uruchomione jednocześnie nie odwoływały się do bazy danych w tej
+samej chwili. Czas wykonywania poleceń SQL zadania ograniczony jest do jego limitu czasu (database.statement_deadline).
+Liczba i czas wykonania zadań udostępniane są przez zasób ``/metrics``, a wynik ostatniego wykonania każdego zadania -
+przez zasób ``/jobs``.
+
+Odstęp między wykonaniami i limit czasu (w sekundach) każdego zadania zawiera ustawienie ``SCHEDULER_JOBS``.
+Harmonogram można wyłączyć, ustawiając zmienną środowiskową ``SCHEDULER_ENABLED=0``.
+"""
+import collections
+import datetime as dt
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+from app import db
+import database
+import metrics
+from models import IdempotencyKeyModel, JobLeaseModel, LeaderboardEntryModel, RevokedTokenModel
+
+log = logging.getLogger("fieldgame.scheduler")
+
+Job = collections.namedtuple('Job', ('name', 'function'))
+
+
+def prune_revoked_tokens(deadline):
+    """
+    Usuwa z bazy danych wpisy dotyczące unieważnionych żetonów JWT, których ważność już wygasła
+
+    :param deadline: Termin zakończenia zadania (wartość zegara ``time.monotonic``)
+    :return: Słownik zawierający liczbę usuniętych wpisów
+    """
+    return {"deleted": RevokedTokenModel.prune_expired()}
+
+
+def prune_idempotency_keys(deadline):
+    """
+    Usuwa z bazy danych klucze idempotentności, których ważność wygasła
+
+    :param deadline: Termin zakończenia zadania (wartość zegara ``time.monotonic``)
+    :return: Słownik zawierający liczbę usuniętych kluczy
+    """
+    return {"deleted": IdempotencyKeyModel.prune_expired(dt.datetime.now())}
+
+
+def refresh_leaderboard(deadline):
+    """
+    Uzupełnia ranking graczy o wpisy, których w nim brakuje
+
+    :param deadline: Termin zakończenia zadania (wartość zegara ``time.monotonic``)
+    :return: Słownik zawierający liczbę utworzonych wpisów
+    """
+    return {"added": LeaderboardEntryModel.backfill()}
+
+
+def archive_games(deadline):
+    """
+    Przenosi do archiwum wpisy dotyczące gier ukończonych ponad ``ARCHIVE_AFTER_DAYS`` dni temu
+
+    :param deadline: Termin zakończenia zadania (wartość zegara ``time.monotonic``)
+    :return: Słownik zawierający liczbę przeniesionych wpisów i datę graniczną
+    """
+    import archive
+    return archive.archive_finished_games(deadline=deadline)
+
+
+def _sqlite_connection():
+    """
+    Otwiera połączenie z główną bazą danych, jeżeli jest to baza SQLite
+
+    :return: Połączenie biblioteki sqlite3 (pobrane z puli połączeń) lub None
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    return db.engine.raw_connection()
+
+
+def sqlite_checkpoint(deadline):
+    """
+    Przenosi zawartość dziennika WAL do pliku bazy SQLite i skraca plik dziennika do zera
+
+    :param deadline: Termin zakończenia zadania (wartość zegara ``time.monotonic``)
+    :return: Słownik z wynikiem polecenia ``wal_checkpoint`` lub None, jeżeli nie jest używana baza SQLite
+    """
+    connection = _sqlite_connection()
+    if connection is None:
+        return None
+    try:
+        busy, log_frames, checkpointed = connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    finally:
+        connection.close()
+    return {"busy": bool(busy), "log_frames": log_frames, "checkpointed_frames": checkpointed}
+
+
+def sqlite_optimize(deadline):
+    """
+    Aktualizuje statystyki wykorzystywane przez planistę zapytań bazy SQLite (``ANALYZE``) oraz odzyskuje wolne miejsce
+    w pliku bazy (``VACUUM``), jeżeli wolne strony stanowią co najmniej ``SQLITE_VACUUM_FREE_RATIO`` rozmiaru pliku.
+    Polecenie ``VACUUM`` blokuje zapisy na czas przebudowy pliku, dlatego wykonywane jest tylko wtedy, gdy jest to
+    opłacalne.
+
+    :param deadline: Termin zakończenia zadania (wartość zegara ``time.monotonic``)
+    :return: Słownik z udziałem wolnych stron i informacją o przebudowie pliku lub None, jeżeli nie jest używana baza
+             SQLite
+    """
+    connection = _sqlite_connection()
+    if connection is None:
+        return None
+    try:
+        connection.execute("PRAGMA analysis_limit = 1000")
+        connection.execute("ANALYZE")
+        connection.commit()
+        pages = connection.execute("PRAGMA page_count").fetchone()[0]
+        free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        free_ratio = free / pages if pages else 0.0
+        vacuumed = free_ratio >= current_app.config['SQLITE_VACUUM_FREE_RATIO']
+        if vacuumed:
+            connection.execute("VACUUM")
+    finally:
+        connection.close()
+    return {"free_ratio": round(free_ratio, 4), "vacuumed": vacuumed}
+
+
+JOBS = (
+    Job('prune_revoked_tokens', prune_revoked_tokens),
+    Job('prune_idempotency_keys', prune_idempotency_keys),
+    Job('refresh_leaderboard', refresh_leaderboard),
+    Job('archive_games', archive_games),
+    Job('sqlite_checkpoint', sqlite_checkpoint),
+    Job('sqlite_optimize', sqlite_optimize),
+)
+
+
+class Scheduler:
+    """
+    Harmonogram zadań wykonywanych w tle przez bieżący proces
+    """
+    def __init__(self, jobs=JOBS):
+        self.jobs = {job.name: job for job in jobs}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._registered = False
+        self.owner = None
+
+    def ensure_running(self, app):
+        """
+        Uruchamia wątek harmonogramu, jeżeli nie został jeszcze uruchomiony w bieżącym procesie
+
+        :param app: Obiekt aplikacji Flask
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._registered = False
+            self.owner = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+            self._thread = threading.Thread(target=self._run, args=(app,), name="scheduler", daemon=True)
+            self._thread.start()
+
+    @staticmethod
+    def _jittered(seconds, jitter):
+        return seconds * random.uniform(1 - jitter, 1 + jitter)
+
+    def run_pending(self):
+        """
+        Wykonuje zadania, których termin wykonania nadszedł i których dzierżawę udało się przejąć.
+        Wymaga kontekstu aplikacji.
+
+        :return: Słownik przyporządkowujący nazwom wykonanych zadań wynik wykonania (``ok``, ``error`` lub ``timeout``)
+        """
+        if self.owner is None:
+            self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        settings = current_app.config['SCHEDULER_JOBS']
+        names = [name for name in self.jobs if name in settings]
+        if not self._registered:
+            JobLeaseModel.register(names, dt.datetime.now())
+            self._registered = True
+        statuses = {}
+        for name in JobLeaseModel.find_due(names, dt.datetime.now()):
+            interval, timeout = settings[name]
+            now = dt.datetime.now()
+            if JobLeaseModel.acquire(name, self.owner, now, now + dt.timedelta(seconds=2 * timeout)):
+                statuses[name] = self.run_job(self.jobs[name], interval, timeout)
+        return statuses
+
+    def run_job(self, job, interval, timeout):
+        """
+        Wykonuje zadanie, którego dzierżawę przejął bieżący proces, i zwalnia dzierżawę, zapisując wynik wykonania
+
+        :param job: Zadanie (obiekt klasy Job)
+        :param interval: Odstęp między wykonaniami zadania w sekundach
+        :param timeout: Limit czasu wykonania zadania w sekundach
+        :return: Wynik wykonania (``ok``, ``error`` lub ``timeout``)
+        """
+        began = time.monotonic()
+        deadline = began + timeout
+        try:
+            with database.statement_deadline(deadline):
+                result = json.dumps(job.function(deadline))
+            status = 'ok' if time.monotonic() <= deadline else 'timeout'
+        except Exception as e:
+            db.session.rollback()
+            status = 'timeout' if time.monotonic() > deadline else 'error'
+            result = json.dumps(f"{type(e).__name__}: {e}")
+            if status == 'timeout':
+                log.warning("Background job %s exceeded its timeout of %s seconds", job.name, timeout)
+            else:
+                log.exception("Background job %s failed", job.name)
+        duration = time.monotonic() - began
+        metrics.job_runs_total.inc(job.name, status)
+        metrics.job_duration.observe(duration, job.name)
+        finished = dt.datetime.now()
+        next_run = finished + dt.timedelta(seconds=self._jittered(interval, current_app.config['SCHEDULER_JITTER']))
+        JobLeaseModel.release(job.name, self.owner, finished, next_run, status, duration, result)
+        return status
+
+    def _run(self, app):
+        with app.app_context():
+            while True:
+                time.sleep(self._jittered(app.config['SCHEDULER_POLL_SECONDS'], app.config['SCHEDULER_JITTER']))
+                try:
+                    self.run_pending()
+                except Exception:
+                    db.session.rollback()
+                    log.exception("Background job scheduler failed")
+                finally:
+                    db.session.remove()
+
+
+scheduler = Scheduler()
+
+
+def _start_scheduler():
+    scheduler.ensure_running(current_app._get_current_object())
+
+
+def init_app(app):
+    """
+    Rejestruje w aplikacji funkcję uruchamiającą wątek harmonogramu przy pierwszym zapytaniu obsługiwanym przez proces
+    (po rozwidleniu procesu nadrzędnego serwera GUnicorn)
+
+    :param app: Obiekt aplikacji Flask
+    """
+    if app.config['SCHEDULER_ENABLED']:
+        app.before_request(_start_scheduler)
@@ -0,0 +1,163 @@
+"""
+Moduł odpowiadający za serializację odpowiedzi do formatu JSON (oraz eksportów do formatów NDJSON i CSV).
+
+Listy obiektów serializowane są na podstawie krotek zawierających wyłącznie kolumny pobrane z bazy danych (bez
+tworzenia obiektów modeli), przy użyciu wspólnych dla wszystkich modeli funkcji formatujących poszczególne pola.
+Odpowiedzi kodowane są jednym, przygotowanym raz koderem standardowego modułu json (napisanym w języku C). Duże listy
+i eksporty mogą być przesyłane klientowi w częściach, bez budowania całej odpowiedzi w pamięci.
+
+Odpowiedzi są identyczne (co do bajtu) z odpowiedziami tworzonymi wcześniej przez bibliotekę Flask-RESTful (funkcja
+``json.dumps`` z ustawieniami domyślnymi): po separatorach ``,`` i ``:`` występuje spacja, znaki spoza ASCII zapisywane
+są jako sekwencje ``\\uXXXX``, a daty zapisywane są jako tekst w postaci zwracanej przez funkcję ``str`` (również brak
+daty, zapisywany jako ``"None"``).
+"""
+import csv
+import datetime as dt
+import io
+import json
+
+from flask import make_response
+
+STREAM_BATCH_SIZE = 500
+
+
+def legacy_datetime(value):
+    """
+    Formatuje datę w postaci stosowanej w odpowiedziach interfejsu API
+
+    :param value: Data (obiekt klasy datetime) lub None
+    :return: Tekst zwrócony przez funkcję ``str`` (``"None"`` dla brakującej daty)
+    """
+    return str(value)
+
+
+def _default(value):
+    if isinstance(value, (dt.datetime, dt.date)):
+        return legacy_datetime(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(check_circular=False, default=_default)
+
+
+def dumps(data):
+    """
+    Koduje dane do formatu JSON
+
+    :param data: Dane zgodne z notacją JSON; daty zapisywane są w postaci zwracanej przez funkcję ``str``
+    :return: Dane w formacie JSON (bytes)
+    """
+    return _encoder.encode(data).encode()
+
+
+def output_json(data, code, headers=None):
+    """
+    Tworzy odpowiedź zasobu w formacie JSON (reprezentacja ``application/json`` biblioteki Flask-RESTful)
+
+    :param data: Dane odpowiedzi
+    :param code: Kod odpowiedzi HTTP
+    :param headers: Dodatkowe nagłówki odpowiedzi
+    :return: Odpowiedź
+    """
+    response = make_response(dumps(data) + b"\n", code)
+    response.headers.extend(headers or {})
+    return response
+
+
+def rows_to_dicts(rows, fields, formatters=None):
+    """
+    Zamienia krotki pobrane z bazy danych na słowniki zgodne z notacją JSON
+
+    :param rows: Lista krotek zawierających wartości pól w kolejności ``fields``
+    :param fields: Nazwy pól
+    :param formatters: Słownik funkcji formatujących wartości wybranych pól
+    :return: Lista słowników
+    """
+    formatted = [(index, formatters[field]) for index, field in enumerate(fields) if field in (formatters or ())]
+    if not formatted:
+        return [dict(zip(fields, row)) for row in rows]
+    result = []
+    for row in rows:
+        values = list(row)
+        for index, formatter in formatted:
+            values[index] = formatter(values[index])
+        result.append(dict(zip(fields, values)))
+    return result
+
+
+def objects_to_dicts(objects, fields, formatters=None):
+    """
+    Zamienia obiekty modeli na słowniki zgodne z notacją JSON
+
+    :param objects: Lista obiektów modelu
+    :param fields: Nazwy pól (atrybutów obiektów)
+    :param formatters: Słownik funkcji formatujących wartości wybranych pól
+    :return: Lista słowników
+    """
+    return rows_to_dicts([tuple(getattr(obj, field) for field in fields) for obj in objects], fields, formatters)
+
+
+def stream_list(key, items, batch_size=STREAM_BATCH_SIZE):
+    """
+    Generator odpowiedzi w formacie JSON zawierającej jedną listę, kodowanej i przesyłanej w częściach
+
+    :param key: Nazwa pola zawierającego listę
+    :param items: Elementy listy (dowolny obiekt iterowalny, np. generator)
+    :param batch_size: Liczba elementów kodowanych jednocześnie
+    :return: Generator kolejnych fragmentów odpowiedzi (bytes)
+    """
+    yield b"{" + dumps(key) + b": ["
+    batch = []
+    separator = b""
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield separator + dumps(batch)[1:-1]
+            separator = b", "
+            batch = []
+    if batch:
+        yield separator + dumps(batch)[1:-1]
+    yield b"]}\n"
+
+
+def stream_ndjson(items, batch_size=STREAM_BATCH_SIZE):
+    """
+    Generator odpowiedzi w formacie NDJSON (jeden obiekt JSON w każdym wierszu), kodowanej i przesyłanej w częściach
+
+    :param items: Obiekty zgodne z notacją JSON (dowolny obiekt iterowalny, np. generator)
+    :param batch_size: Liczba obiektów kodowanych jednocześnie
+    :return: Generator kolejnych fragmentów odpowiedzi (bytes)
+    """
+    batch = []
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= batch_size:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def stream_csv(fields, rows, batch_size=STREAM_BATCH_SIZE):
+    """
+    Generator odpowiedzi w formacie CSV (z wierszem nagłówka), kodowanej i przesyłanej w częściach
+
+    :param fields: Nazwy kolumn
+    :param rows: Wiersze - krotki wartości w kolejności ``fields``; brak wartości (None) zapisywany jest jako
+                 pusta komórka (dowolny obiekt iterowalny, np. generator)
+    :param batch_size: Liczba wierszy kodowanych jednocześnie
+    :return: Generator kolejnych fragmentów odpowiedzi (bytes, UTF-8)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    yield buffer.getvalue().encode()
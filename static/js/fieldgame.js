@@ -22,15 +22,16 @@ function getGames() {
     })
 }
 
-function getStatistics() {
+function getStatistics(cursor) {
+    var params = {mode: "leaderboard", limit: 100}
+    if(cursor) params.cursor = cursor
     $.ajax("/stats", {
         method: "GET",
         dataType: "json",
+        data: params,
         success: function(data, status, jqXHR) {
-            var list = data.entries
-            list.sort(statSorter);
             var tableBody = $("#stat-details")
-            for(var entry of list) {
+            for(var entry of data.entries) {
                 var row = $("<tr>");
                 var cellUsername = $("<td>").text(entry.username)
                 var cellGameName = $("<td>").text(entry.game)
@@ -38,12 +39,63 @@ function getStatistics() {
                 row.append(cellUsername, cellGameName, cellPlayTime);
                 tableBody.append(row);
             }
+            var buttonMore = $("#stat-more")
+            buttonMore.off("click")
+            if(data.next_cursor) {
+                buttonMore.on("click", function() {getStatistics(data.next_cursor)}).show()
+            } else {
+                buttonMore.hide()
+            }
+        }
+    })
+}
+
+function watchStatistics() {
+    if(!window.EventSource) {
+        getStatistics()
+        return
+    }
+    var entries = {}
+    var source = new EventSource("/stats/stream")
+    source.addEventListener("snapshot", function(event) {
+        entries = {}
+        for(var entry of JSON.parse(event.data).entries) {
+            entry.received = Date.now()
+            entries[entry.entry_id] = entry
         }
+        renderStatistics(entries)
+    })
+    source.addEventListener("progress", function(event) {
+        var entry = JSON.parse(event.data)
+        entry.received = Date.now()
+        entries[entry.entry_id] = entry
+        renderStatistics(entries)
+    })
+    setInterval(function() {renderStatistics(entries)}, 1000)
+}
+
+function renderStatistics(entries) {
+    var now = Date.now()
+    var list = Object.values(entries).map(function(entry) {
+        var elapsed = entry.finished === true ? entry.elapsed_seconds : entry.elapsed_seconds + (now - entry.received) / 1000
+        return {username: entry.username, game: entry.game, finished: entry.finished, elapsed_seconds: elapsed}
     })
+    list.sort(statSorter)
+    var tableBody = $("#stat-details")
+    tableBody.empty()
+    for(var entry of list) {
+        var row = $("<tr>");
+        var cellUsername = $("<td>").text(entry.username)
+        var cellGameName = $("<td>").text(entry.game)
+        var cellPlayTime = $("<td>").text((entry.finished === true ? "Finished in " : "Playing for ") + formatTime(entry.elapsed_seconds))
+        row.append(cellUsername, cellGameName, cellPlayTime);
+        tableBody.append(row);
+    }
 }
 
 function statSorter(a, b) {
-    return (a.finished > b.finished) ? 1 : ((a.finished === b.finished) ? ((a.elapsed_seconds > b.elapsed_seconds)? 1 : -1) : -1)
+    if(a.finished !== b.finished) return a.finished === true ? -1 : 1
+    return a.elapsed_seconds - b.elapsed_seconds
 }
 
 function formatTime(totalSeconds) {
@@ -0,0 +1,217 @@
+"""
+Moduł odpowiadający za przesyłanie zmian w statystykach graczy w czasie rzeczywistym (Server-Sent Events).
+
+Każdy proces roboczy serwera posiada jeden wątek odczytujący nowe zdarzenia z dziennika zdarzeń co
+``SSE_POLL_SECONDS`` sekund i rozsyłający je do wszystkich połączonych w tym procesie widzów. Co
+``SSE_SNAPSHOT_SECONDS`` sekund wątek przygotowuje również skrócony ranking (``SSE_SNAPSHOT_SIZE`` pierwszych
+pozycji), wysyłany nowym widzom po połączeniu oraz okresowo wszystkim widzom. Liczba zapytań do bazy danych nie
+zależy więc od liczby widzów, a gdy z procesem nie jest połączony żaden widz, wątek czeka na pierwszego widza bez
+odpytywania bazy danych.
+
+Transakcje zapisujące zdarzenia mogą zostać zatwierdzone w innej kolejności niż kolejność przydzielonych
+identyfikatorów, dlatego brakujące identyfikatory mniejsze od ostatnio odczytanego są pobierane ponownie przez
+``SSE_GAP_SECONDS`` sekund od ich wykrycia (jak w pamięci podręcznej unieważnionych żetonów - moduł cache).
+
+Każdy połączony widz zajmuje jeden wątek serwera (GUnicorn, ``--worker-class gthread``) na cały czas połączenia,
+dlatego liczba widzów jednego procesu ograniczona jest do ``SSE_MAX_SUBSCRIBERS`` - kolejni widzowie otrzymują
+odpowiedź 503. Wartość musi być mniejsza od liczby wątków procesu (opcja ``--threads``), aby pozostałe wątki mogły
+obsługiwać pozostałe zapytania.
+"""
+import datetime as dt
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from app import db
+from models import LeaderboardEntryModel, ProgressEventModel
+
+log = logging.getLogger("fieldgame.streaming")
+
+
+class SubscriberLimitError(Exception):
+    """
+    Wyjątek zgłaszany, gdy z bieżącym procesem połączonych jest już ``SSE_MAX_SUBSCRIBERS`` widzów
+    """
+
+
+def entry_to_json(row, now):
+    """
+    Serializuje wpis w rankingu do postaci przesyłanej widzom
+
+    :param row: Obiekt klasy LeaderboardEntryModel
+    :param now: Bieżący czas
+    :return: Słownik zgodny z notacją JSON
+    """
+    return {
+        "entry_id": row.entry_id,
+        "username": row.username,
+        "game": row.game_title,
+        "current_riddle": row.current_riddle,
+        "finished": row.finished,
+        "time_begin": int(row.time_begin.timestamp() * 1000),
+        "elapsed_seconds": row.rank_value if row.rank_group == 0 else (now - row.time_begin).total_seconds()
+    }
+
+
+def format_event(event, data):
+    """
+    Formatuje zdarzenie zgodnie ze standardem Server-Sent Events
+
+    :param event: Nazwa zdarzenia
+    :param data: Dane zdarzenia zgodne z notacją JSON
+    :return: Zdarzenie w postaci tekstu
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class ProgressBroadcaster:
+    """
+    Rozsyła zdarzenia dotyczące postępu graczy do widzów połączonych z bieżącym procesem
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribed = threading.Condition(self._lock)
+        self._subscribers = set()
+        self._snapshot = None
+        self._thread = None
+        self._pid = None
+
+    def subscribe(self):
+        """
+        Rejestruje nowego widza. Zgłasza wyjątek SubscriberLimitError, jeżeli osiągnięto limit widzów.
+
+        :return: Kolejka, do której trafiają zdarzenia przeznaczone dla widza; pierwszym elementem jest ranking
+        """
+        self._ensure_running(current_app._get_current_object())
+        subscriber = queue.Queue(maxsize=current_app.config['SSE_QUEUE_SIZE'])
+        with self._lock:
+            if len(self._subscribers) >= current_app.config['SSE_MAX_SUBSCRIBERS']:
+                raise SubscriberLimitError()
+            snapshot = self._snapshot
+            self._subscribers.add(subscriber)
+            self._subscribed.notify()
+        if snapshot is None:
+            snapshot = format_event("snapshot", self._build_snapshot(current_app.config['SSE_SNAPSHOT_SIZE']))
+        subscriber.put_nowait(snapshot)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """
+        Wyrejestrowuje widza
+
+        :param subscriber: Kolejka zwrócona przez metodę subscribe
+        """
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stream(self, subscriber):
+        """
+        Generator zdarzeń przesyłanych widzowi. Podczas braku zdarzeń co ``SSE_KEEPALIVE_SECONDS`` sekund wysyłany
+        jest komentarz podtrzymujący połączenie.
+
+        :param subscriber: Kolejka zwrócona przez metodę subscribe
+        :return: Generator zdarzeń w postaci tekstu
+        """
+        keepalive = current_app.config['SSE_KEEPALIVE_SECONDS']
+        try:
+            yield f"retry: {int(keepalive * 1000)}\n\n"
+            while True:
+                try:
+                    message = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def publish(self, message):
+        """
+        Przekazuje zdarzenie wszystkim widzom. Widz, którego kolejka jest pełna, zostaje rozłączony - przeglądarka
+        połączy się ponownie i otrzyma aktualny ranking.
+
+        :param message: Zdarzenie w postaci tekstu
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+    @staticmethod
+    def _build_snapshot(size):
+        now = dt.datetime.now()
+        return {"entries": [entry_to_json(row, now) for row in LeaderboardEntryModel.page(limit=size)]}
+
+    def _ensure_running(self, app):
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(app,), name="progress-broadcaster", daemon=True)
+            self._thread.start()
+
+    def _publish_events(self, last_id, gaps, grace):
+        """
+        Rozsyła widzom zdarzenia zapisane po wskazanym zdarzeniu oraz zdarzenia z brakujących identyfikatorów
+
+        :param last_id: Identyfikator ostatniego odczytanego zdarzenia
+        :param gaps: Słownik przyporządkowujący brakującym identyfikatorom czas (time.monotonic), do którego należy ich
+                     szukać; uzupełniany o nowo wykryte braki
+        :param grace: Czas (w sekundach), przez który pobierane są brakujące identyfikatory
+        :return: Identyfikator ostatniego odczytanego zdarzenia
+        """
+        now, clock = dt.datetime.now(), time.monotonic()
+        for event_id in [event_id for event_id, until in gaps.items() if until <= clock]:
+            del gaps[event_id]
+        for event, row in ProgressEventModel.find_since(last_id, gaps):
+            if event.id <= last_id:
+                gaps.pop(event.id, None)
+            else:
+                gaps.update((missing, clock + grace) for missing in range(last_id + 1, event.id))
+                last_id = event.id
+            data = entry_to_json(row, now)
+            data["event"] = event.kind
+            self.publish(format_event("progress", data))
+        return last_id
+
+    def _run(self, app):
+        with app.app_context():
+            last_id, gaps, next_snapshot = None, {}, 0.0
+            while True:
+                with self._lock:
+                    while not self._subscribers:
+                        self._snapshot = None
+                        last_id = None
+                        self._subscribed.wait()
+                try:
+                    if last_id is None:
+                        last_id, gaps, next_snapshot = ProgressEventModel.last_id(), {}, 0.0
+                    else:
+                        last_id = self._publish_events(last_id, gaps, app.config['SSE_GAP_SECONDS'])
+                    if time.monotonic() >= next_snapshot:
+                        snapshot = format_event("snapshot", self._build_snapshot(app.config['SSE_SNAPSHOT_SIZE']))
+                        with self._lock:
+                            self._snapshot = snapshot
+                        self.publish(snapshot)
+                        next_snapshot = time.monotonic() + app.config['SSE_SNAPSHOT_SECONDS']
+                except Exception:
+                    log.exception("Broadcasting progress events failed")
+                finally:
+                    db.session.remove()
+                time.sleep(app.config['SSE_POLL_SECONDS'])
+
+
+broadcaster = ProgressBroadcaster()
@@ -0,0 +1,80 @@
+"""
+Wspólne elementy testów: aplikacja pracująca na tymczasowej bazie SQLite oraz funkcje tworzące dane testowe.
+
+Testy uruchamiane są poleceniem ``python -m pytest`` w katalogu głównym repozytorium.
+"""
+import itertools
+import os
+
+import pytest
+
+from app import create_app, prepare, db
+from models import GameModel, RiddleModel, UserModel
+
+_names = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """
+    Aplikacja pracująca na tymczasowej bazie SQLite, wspólna dla wszystkich testów.
+    Pamięci podręczne modułu cache są wspólne dla całego procesu, dlatego testy nie tworzą kolejnych baz danych.
+    """
+    path = os.path.join(str(tmp_path_factory.mktemp("fieldgame")), "test.db")
+    application = create_app({
+        'SQLALCHEMY_DATABASE_URI': "sqlite:///" + path,
+        'SCHEDULER_ENABLED': False,
+        'METRICS_ENABLED': False,
+        'PASSWORD_HASH_ROUNDS': 1000,
+        'PASSWORD_HASH_WORKERS': 0,
+        'JWT_REVOCATION_SYNC_SECONDS': 3600,
+        'CONTENT_VERSION_SYNC_SECONDS': 3600
+    })
+    prepare(application)
+    with application.app_context():
+        yield application
+        db.session.remove()
+
+
+def create_user(app, admin=False):
+    """
+    Rejestruje użytkownika o unikalnej nazwie i zwraca klienta testowego z zalogowanym użytkownikiem
+
+    :param app: Obiekt aplikacji Flask
+    :param admin: Informacja, czy użytkownik ma mieć prawa administratora
+    :return: Krotka (klient testowy, identyfikator użytkownika)
+    """
+    username = f"user{next(_names)}"
+    client = app.test_client()
+    assert client.post('/register', data={'username': username, 'password': "secret"}).status_code == 200
+    user = UserModel.find_by_username(username)
+    if admin:
+        user.isadmin = True
+        db.session.commit()
+    assert client.post('/login', data={'username': username, 'password': "secret"}).status_code == 200
+    return client, user.id
+
+
+def create_game(riddles=2, latitude=50.0614, longitude=19.9366, spacing=0.005):
+    """
+    Tworzy grę z zagadkami rozmieszczonymi wzdłuż równoleżnika
+
+    :param riddles: Liczba zagadek
+    :param latitude: Szerokość geograficzna zagadek
+    :param longitude: Długość geograficzna pierwszej zagadki
+    :param spacing: Odstęp między kolejnymi zagadkami (w stopniach długości geograficznej)
+    :return: Obiekt klasy GameModel
+    """
+    game = GameModel(title=f"Game {next(_names)}", description="Test game", riddles=riddles)
+    game.save_to_db()
+    db.session.bulk_insert_mappings(RiddleModel, [{
+        'game_id': game.id,
+        'riddle_no': number,
+        'description': f"Riddle {number}",
+        'latitude': latitude,
+        'longitude': longitude + (number - 1) * spacing,
+        'radius': 50,
+        'dominant_object': "Object"
+    } for number in range(1, riddles + 1)])
+    db.session.commit()
+    return game
@@ -0,0 +1,102 @@
+"""
+Testy równoległego przesuwania gracza do kolejnej zagadki (GameAdvancementResource)
+"""
+import threading
+
+import pytest
+
+from app import db
+from models import ScoreboardEntryModel
+from conftest import create_game, create_user
+
+CONCURRENCY = 8
+
+
+def advance_concurrently(app, client, game, headers):
+    """
+    Wysyła jednocześnie ``CONCURRENCY`` zapytań o przesunięcie gracza z pierwszej do drugiej zagadki
+
+    :param app: Obiekt aplikacji Flask
+    :param client: Klient testowy z zalogowanym graczem
+    :param game: Obiekt klasy GameModel
+    :param headers: Nagłówki zapytań
+    :return: Lista par (kod odpowiedzi, treść odpowiedzi)
+    """
+    cookies = {cookie.name: cookie.value for cookie in client.cookie_jar}
+    url = f'/mygames/{game.id}/advance'
+    barrier = threading.Barrier(CONCURRENCY)
+    responses = []
+
+    def advance():
+        thread_client = app.test_client()
+        for name, value in cookies.items():
+            thread_client.set_cookie('localhost', name, value)
+        barrier.wait()
+        response = thread_client.post(url, headers=headers, data={
+            'expected_riddle': 1,
+            'latitude': 50.0614,
+            'longitude': 19.9366
+        })
+        responses.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=advance) for _ in range(CONCURRENCY)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def current_riddle(user_id, game):
+    game_id = game.id
+    db.session.remove()
+    return ScoreboardEntryModel.filter_by_user_and_game(user_id, game_id).current_riddle
+
+
+@pytest.mark.parametrize("headers", [{}, {'Idempotency-Key': "advance-1"}], ids=["without-key", "same-key"])
+def test_parallel_advances_move_player_once(app, headers):
+    game = create_game(riddles=3)
+    client, user_id = create_user(app)
+    assert client.post(f'/mygames/{game.id}/start').status_code == 200
+
+    responses = advance_concurrently(app, client, game, headers)
+
+    assert len(responses) == CONCURRENCY
+    assert all(status in (200, 409) for status, _ in responses), responses
+    assert current_riddle(user_id, game) == 2
+    if headers:
+        assert all(status == 200 or body['message'].endswith("already being processed")
+                   for status, body in responses), responses
+    else:
+        assert sum(status == 200 for status, _ in responses) == 1, responses
+
+
+def test_repeated_idempotency_key_returns_first_response(app):
+    game = create_game(riddles=3)
+    client, user_id = create_user(app)
+    client.post(f'/mygames/{game.id}/start')
+    data = {'expected_riddle': 1, 'latitude': 50.0614, 'longitude': 19.9366}
+
+    first = client.post(f'/mygames/{game.id}/advance', headers={'Idempotency-Key': "retry"}, data=data)
+    retry = client.post(f'/mygames/{game.id}/advance', headers={'Idempotency-Key': "retry"}, data=data)
+
+    assert first.status_code == retry.status_code == 200
+    assert first.get_json() == retry.get_json()
+    assert current_riddle(user_id, game) == 2
+
+
+def test_idempotency_key_from_another_game_is_rejected(app):
+    first_game = create_game(riddles=3)
+    second_game = create_game(riddles=3)
+    client, user_id = create_user(app)
+    client.post(f'/mygames/{first_game.id}/start')
+    client.post(f'/mygames/{second_game.id}/start')
+    data = {'expected_riddle': 1, 'latitude': 50.0614, 'longitude': 19.9366}
+
+    first = client.post(f'/mygames/{first_game.id}/advance', headers={'Idempotency-Key': "reused"}, data=data)
+    reused = client.post(f'/mygames/{second_game.id}/advance', headers={'Idempotency-Key': "reused"}, data=data)
+
+    assert first.status_code == 200
+    assert reused.status_code == 422
+    assert current_riddle(user_id, first_game) == 2
+    assert current_riddle(user_id, second_game) == 1
@@ -0,0 +1,69 @@
+"""
+Testy sprawdzania położenia gracza przy przejściu do kolejnej zagadki
+"""
+from app import db
+from models import RiddleModel, ScoreboardEntryModel
+from conftest import create_game, create_user
+
+RIDDLE_LOCATION = {'latitude': 50.0614, 'longitude': 19.9366}
+
+
+def start_game(app, riddles=3):
+    game = create_game(riddles=riddles)
+    client, user_id = create_user(app)
+    assert client.post(f'/mygames/{game.id}/start').status_code == 200
+    return client, user_id, game.id
+
+
+def current_riddle(user_id, game_id):
+    db.session.remove()
+    return ScoreboardEntryModel.filter_by_user_and_game(user_id, game_id).current_riddle
+
+
+def test_location_is_required_by_default(app):
+    client, user_id, game_id = start_game(app)
+
+    response = client.post(f'/mygames/{game_id}/advance', data={'expected_riddle': 1})
+
+    assert response.status_code == 400
+    assert current_riddle(user_id, game_id) == 1
+
+
+def test_player_outside_riddle_area_is_rejected(app):
+    client, user_id, game_id = start_game(app)
+
+    response = client.post(f'/mygames/{game_id}/advance', data={'latitude': 50.1, 'longitude': 19.9366})
+
+    assert response.status_code == 403
+    assert response.get_json()['distance'] > 1000
+    assert current_riddle(user_id, game_id) == 1
+
+
+def test_missing_riddle_location_fails_closed(app):
+    client, user_id, game_id = start_game(app)
+    RiddleModel.query.filter_by(game_id=game_id, riddle_no=1).delete()
+    db.session.commit()
+
+    response = client.post(f'/mygames/{game_id}/advance', data=RIDDLE_LOCATION)
+
+    assert response.status_code == 403
+    assert current_riddle(user_id, game_id) == 1
+
+
+def test_player_inside_riddle_area_advances(app):
+    client, user_id, game_id = start_game(app)
+
+    response = client.post(f'/mygames/{game_id}/advance', data=RIDDLE_LOCATION)
+
+    assert response.status_code == 200
+    assert current_riddle(user_id, game_id) == 2
+
+
+def test_location_can_be_made_optional(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'GEOFENCE_REQUIRE_LOCATION', False)
+    client, user_id, game_id = start_game(app)
+
+    response = client.post(f'/mygames/{game_id}/advance', data={'expected_riddle': 1})
+
+    assert response.status_code == 200
+    assert current_riddle(user_id, game_id) == 2
@@ -0,0 +1,56 @@
+"""
+Testy puli procesów obliczających skróty haseł
+"""
+import time
+
+import pytest
+
+from hashing import HashingOverloadedError, PasswordHasher
+from models import UserModel
+from conftest import create_user
+
+
+@pytest.fixture
+def hasher(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_QUEUE', 1)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_TIMEOUT', 0.2)
+    instance = PasswordHasher()
+    yield instance
+    instance.shutdown()
+
+
+def wait_until_idle(hasher, seconds=5.0):
+    deadline = time.monotonic() + seconds
+    while hasher._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return hasher._pending
+
+
+def test_timed_out_job_counts_against_queue_until_finished(hasher):
+    with pytest.raises(HashingOverloadedError):
+        hasher._run(time.sleep, 1.0)
+
+    assert hasher._pending == 1
+    started = time.monotonic()
+    with pytest.raises(HashingOverloadedError):
+        hasher._run(time.sleep, 0)
+    assert time.monotonic() - started < 0.1
+
+    assert wait_until_idle(hasher) == 0
+    hasher._run(time.sleep, 0)
+    assert wait_until_idle(hasher) == 0
+
+
+def test_login_succeeds_when_rehash_is_rejected(app, monkeypatch):
+    _, user_id = create_user(app)
+    username = UserModel.query.get(user_id).username
+
+    def overloaded(self, password):
+        raise HashingOverloadedError()
+
+    monkeypatch.setattr(UserModel, 'rehash_if_needed', overloaded)
+    response = app.test_client().post('/login', data={'username': username, 'password': "secret"})
+
+    assert response.status_code == 200
+    assert response.get_json()['access_token']
@@ -0,0 +1,39 @@
+"""
+Testy importu gry wraz z zagadkami (GameImportResource)
+"""
+import logging
+
+from models import GameModel
+from conftest import create_user
+
+RIDDLE = {'latitude': 50.0614, 'longitude': 19.9366, 'description': "Riddle", 'radius': 50,
+          'dominant_object': "Object"}
+
+
+def import_request(title):
+    return {'game': {'title': title, 'description': "Imported game", 'riddles': 2},
+            'riddles': [dict(RIDDLE, riddle_no=1), dict(RIDDLE, riddle_no=2)]}
+
+
+def test_import_saves_game_with_riddles(app):
+    client, _ = create_user(app, admin=True)
+
+    response = client.put('/games/import', json=import_request("Imported"))
+
+    assert response.status_code == 200
+    assert len(response.get_json()['riddles']) == 2
+
+
+def test_failed_import_is_logged(app, monkeypatch, caplog):
+    client, _ = create_user(app, admin=True)
+
+    def fail(game, riddles):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(GameModel, 'save_with_riddles', fail)
+    with caplog.at_level(logging.ERROR):
+        response = client.put('/games/import', json=import_request("Broken"))
+
+    assert response.status_code == 500
+    assert response.get_json() == {'message': 'Something went wrong'}
+    assert any(record.exc_info and "database unavailable" in str(record.exc_info[1]) for record in caplog.records)
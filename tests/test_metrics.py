@@ -0,0 +1,64 @@
+"""
+Testy pomiarów wydajności zapytań HTTP i poleceń SQL
+"""
+import pytest
+from flask import g
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+import metrics
+
+
+@pytest.fixture(scope="module")
+def metrics_app(app):
+    """
+    Druga aplikacja pracująca na tej samej bazie danych, z włączonymi pomiarami
+    """
+    application = create_app(dict(app.config, METRICS_ENABLED=True, METRICS_SLOW_REQUEST_SECONDS=None))
+    with application.app_context():
+        yield application
+        db.session.remove()
+
+
+def sample(histogram, endpoint):
+    """
+    Odczytuje sumę i liczbę wartości zarejestrowanych w histogramie dla wskazanego zasobu
+
+    :param histogram: Obiekt klasy metrics.Histogram
+    :param endpoint: Reguła adresu zasobu
+    :return: Krotka (suma wartości, liczba wartości)
+    """
+    values = {}
+    for line in histogram.render():
+        for suffix in ("_sum", "_count"):
+            if line.startswith(f'{histogram.name}{suffix}{{endpoint="{endpoint}"}}'):
+                values[suffix] = float(line.rsplit(" ", 1)[1])
+    return values.get("_sum", 0.0), values.get("_count", 0.0)
+
+
+def test_failed_statement_does_not_skew_timings(metrics_app):
+    with metrics_app.test_request_context('/stats'):
+        metrics.before_request()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                db.session.execute("SELECT * FROM missing_table")
+            db.session.rollback()
+        db.session.execute("SELECT 1")
+        db.session.execute("SELECT 2")
+
+        assert g._metrics.statements == 2
+        assert 0 <= g._metrics.db_time < 1
+        db.session.remove()
+
+
+def test_streamed_response_is_measured_after_body(metrics_app):
+    statements_before, count_before = sample(metrics.request_statements, "/stats")
+
+    response = metrics_app.test_client().get('/stats')
+    assert sample(metrics.request_statements, "/stats")[1] == count_before
+    response.get_data()
+    response.close()
+
+    statements_after, count_after = sample(metrics.request_statements, "/stats")
+    assert count_after == count_before + 1
+    assert statements_after == statements_before + 1
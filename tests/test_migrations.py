@@ -0,0 +1,76 @@
+"""
+Testy aktualizacji schematu bazy danych utworzonej przez pierwszą wersję aplikacji (moduł migrations)
+"""
+import pytest
+import sqlalchemy
+
+import migrations
+
+BASELINE_SCHEMA = [
+    """CREATE TABLE games (
+        id INTEGER NOT NULL, title VARCHAR(100) NOT NULL, description VARCHAR(500), riddles INTEGER NOT NULL,
+        PRIMARY KEY (id))""",
+    """CREATE TABLE revoked_tokens (id INTEGER NOT NULL, jti VARCHAR(120), PRIMARY KEY (id))""",
+    """CREATE TABLE users (
+        id INTEGER NOT NULL, username VARCHAR(120) NOT NULL, password VARCHAR(120) NOT NULL,
+        isadmin BOOLEAN NOT NULL, PRIMARY KEY (id), UNIQUE (username), CHECK (isadmin IN (0, 1)))""",
+    """CREATE TABLE riddles (
+        id INTEGER NOT NULL, game_id INTEGER, riddle_no INTEGER NOT NULL, description VARCHAR(500),
+        latitude FLOAT NOT NULL, longitude FLOAT NOT NULL, radius INTEGER, dominant_object VARCHAR(100) NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(game_id) REFERENCES games (id))""",
+    """CREATE TABLE scoreboard (
+        id INTEGER NOT NULL, user_id INTEGER, game_id INTEGER, finished BOOLEAN, current_riddle INTEGER NOT NULL,
+        time_begin DATETIME, time_end DATETIME, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id),
+        FOREIGN KEY(game_id) REFERENCES games (id), CHECK (finished IN (0, 1)))""",
+]
+
+BASELINE_DATA = [
+    "INSERT INTO users VALUES (1, 'first', 'x', 0), (2, 'second', 'x', 0)",
+    "INSERT INTO games VALUES (1, 'Game', 'Test game', 3)",
+    "INSERT INTO revoked_tokens VALUES (1, 'revoked')",
+    "INSERT INTO riddles VALUES (1, 1, 1, 'First', 50.0, 19.0, 50, 'Object'), "
+    "(2, 1, 1, 'Duplicate', 50.0, 19.0, 50, 'Object'), (3, 1, 2, 'Second', 50.0, 19.1, 50, 'Object')",
+    "INSERT INTO scoreboard VALUES "
+    "(1, 1, 1, 0, 1, '2020-05-01 10:00:00', NULL), "
+    "(2, 1, 1, 0, 3, '2020-05-01 10:00:00', NULL), "
+    "(3, 1, 1, 1, 2, '2020-05-01 10:00:00', '2020-05-01 11:00:00'), "
+    "(4, 2, 1, 0, 1, '2020-05-01 10:00:00', NULL), "
+    "(5, 2, 1, 0, 2, '2020-05-01 10:00:00', NULL)",
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA + BASELINE_DATA:
+            connection.execute(statement)
+    yield engine
+    engine.dispose()
+
+
+def snapshot(engine):
+    with engine.connect() as connection:
+        return {table: connection.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+                for table in ('scoreboard', 'riddles', 'revoked_tokens', 'game_counters', 'schema_version')}
+
+
+def test_upgrade_of_baseline_database_removes_duplicates_and_is_repeatable(engine):
+    latest = migrations.MIGRATIONS[-1][0]
+
+    assert migrations.upgrade(engine) == latest
+
+    inspector = sqlalchemy.inspect(engine)
+    with engine.connect() as connection:
+        survivors = connection.execute("SELECT id, user_id FROM scoreboard ORDER BY id").fetchall()
+        riddles = connection.execute("SELECT id, description FROM riddles ORDER BY id").fetchall()
+    assert [tuple(row) for row in survivors] == [(3, 1), (5, 2)]
+    assert [tuple(row) for row in riddles] == [(1, 'First'), (3, 'Second')]
+    unique = {index['name'] for table in ('scoreboard', 'riddles')
+              for index in inspector.get_indexes(table) if index['unique']}
+    assert {'uq_scoreboard_user_game', 'uq_riddles_game_riddle'} <= unique
+    assert 'expires' in {column['name'] for column in inspector.get_columns('revoked_tokens')}
+
+    before = snapshot(engine)
+    assert migrations.upgrade(engine) == latest
+    assert snapshot(engine) == before
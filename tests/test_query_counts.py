@@ -0,0 +1,76 @@
+"""
+Testy liczby poleceń SQL wykonywanych przy obsłudze zasobów ``/mygames`` i ``/stats``, która nie może zależeć od
+liczby wpisów w tabeli wyników
+"""
+import contextlib
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+from models import LeaderboardEntryModel, ScoreboardEntryModel, UserModel
+from conftest import create_game, create_user
+
+
+@contextlib.contextmanager
+def count_statements():
+    """
+    Zlicza polecenia SQL wykonane przez wszystkie silniki bazy danych
+
+    :return: Lista, do której dopisywane są treści wykonanych poleceń
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def add_entries(user_id, games, players):
+    """
+    Dołącza wskazanego użytkownika oraz ``players`` nowych graczy do każdej z gier
+
+    :param user_id: Identyfikator użytkownika
+    :param games: Lista obiektów klasy GameModel
+    :param players: Liczba nowych graczy
+    """
+    first = (db.session.query(db.func.max(UserModel.id)).scalar() or 0) + 1
+    db.session.bulk_insert_mappings(UserModel, [
+        {'username': f"player{user_id}-{number}", 'password': "-"} for number in range(first, first + players)
+    ])
+    user_ids = [user_id] + list(range(first, first + players))
+    db.session.bulk_insert_mappings(ScoreboardEntryModel, [
+        {'user_id': player, 'game_id': game.id, 'current_riddle': 1, 'finished': False}
+        for game in games for player in user_ids
+    ])
+    db.session.commit()
+    LeaderboardEntryModel.backfill()
+
+
+def statements_for(client, url):
+    with count_statements() as statements:
+        response = client.get(url)
+        response.get_data()
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements)
+
+
+def test_query_count_does_not_grow_with_rows(app):
+    client, user_id = create_user(app)
+    urls = ('/mygames', '/stats', '/stats?mode=leaderboard', '/stats?limit=20')
+
+    add_entries(user_id, [create_game()], players=2)
+    small = {url: statements_for(client, url) for url in urls}
+    _, other_user_id = create_user(app)
+    add_entries(other_user_id, [create_game() for _ in range(5)], players=40)
+    add_entries(user_id, [create_game() for _ in range(5)], players=0)
+    large = {url: statements_for(client, url) for url in urls}
+
+    assert large == small
+    assert small['/mygames'] == 1
+    assert small['/stats'] == 1
@@ -0,0 +1,36 @@
+"""
+Testy zgodności odpowiedzi JSON z formatem tworzonym wcześniej przez bibliotekę Flask-RESTful
+"""
+import datetime as dt
+import json
+
+import pytest
+
+import serialization
+
+DATA = {
+    'games': [
+        {'id': 1, 'title': "Zagadki Łodzi", 'description': "Żółć", 'riddles': 3, 'score': 1.5, 'finished': None},
+        {'id': 2, 'title': "Kraków", 'description': "", 'riddles': 0, 'score': -2.0, 'finished': True}
+    ]
+}
+
+
+def test_dumps_matches_default_json():
+    assert serialization.dumps(DATA) == json.dumps(DATA).encode()
+    assert serialization.dumps({'time_end': dt.datetime(2020, 5, 1, 12, 30)}) == b'{"time_end": "2020-05-01 12:30:00"}'
+
+
+def test_response_body_matches_flask_restful(app):
+    with app.test_request_context():
+        response = serialization.output_json(DATA, 200)
+    assert response.get_data() == (json.dumps(DATA) + "\n").encode()
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 5])
+def test_streamed_list_matches_default_json(count):
+    items = [dict(DATA['games'][index % 2], id=index) for index in range(count)]
+
+    body = b"".join(serialization.stream_list("entries", iter(items), batch_size=2))
+
+    assert body == (json.dumps({'entries': items}) + "\n").encode()
@@ -0,0 +1,86 @@
+"""
+Testy stronicowania i wyboru pól statystyk graczy (StatisticsResource)
+"""
+import pytest
+
+from resources import encode_cursor
+from conftest import create_game, create_user
+
+PLAYERS = 5
+FINISHED = 2
+
+
+@pytest.fixture(scope="module")
+def game_id(app):
+    game = create_game(riddles=1)
+    game_id = game.id
+    for player in range(PLAYERS):
+        client, _ = create_user(app)
+        assert client.post(f'/mygames/{game_id}/start').status_code == 200
+        if player < FINISHED:
+            response = client.post(f'/mygames/{game_id}/advance', data={
+                'expected_riddle': 1,
+                'latitude': 50.0614,
+                'longitude': 19.9366
+            })
+            assert response.status_code == 200
+    return game_id
+
+
+def all_pages(client, **params):
+    entries, cursor = [], None
+    while True:
+        response = client.get('/stats', query_string=dict(params, limit=2, **({'cursor': cursor} if cursor else {})))
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page["entries"]) <= 2
+        entries.extend(page["entries"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return entries
+
+
+@pytest.mark.parametrize("mode", ['leaderboard', None], ids=["by-rank", "by-entry"])
+def test_cursor_pages_cover_all_entries_once(app, game_id, mode):
+    client = app.test_client()
+    params = {'game_id': game_id, 'fields': 'username,finished,time_begin', **({'mode': mode} if mode else {})}
+
+    whole = client.get('/stats', query_string=dict(params, limit=PLAYERS)).get_json()["entries"]
+    paged = all_pages(client, **params)
+
+    assert len(whole) == PLAYERS
+    assert paged == whole
+    if mode == 'leaderboard':
+        assert [entry["finished"] for entry in paged] == [True] * FINISHED + [False] * (PLAYERS - FINISHED)
+
+
+@pytest.mark.parametrize("mode, cursor", [
+    ('leaderboard', ["0", 1.5, 1]),
+    ('leaderboard', [0, "1.5", 1]),
+    ('leaderboard', [0, 1.5, 1.0]),
+    ('leaderboard', [0, 1.5]),
+    (None, ["1"]),
+    (None, [None]),
+    (None, [1, 2]),
+])
+def test_cursor_with_wrong_element_types_is_rejected(app, game_id, mode, cursor):
+    params = {'game_id': game_id, 'cursor': encode_cursor(cursor), **({'mode': mode} if mode else {})}
+
+    response = app.test_client().get('/stats', query_string=params)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"message": "Invalid cursor"}
+
+
+def test_fields_limit_returned_keys(app, game_id):
+    client = app.test_client()
+
+    response = client.get('/stats', query_string={'game_id': game_id, 'mode': 'leaderboard',
+                                                  'fields': 'username,elapsed_seconds'})
+    assert response.status_code == 200
+    entries = response.get_json()["entries"]
+    assert len(entries) == PLAYERS
+    assert all(set(entry) == {'username', 'elapsed_seconds'} for entry in entries)
+
+    response = client.get('/stats', query_string={'game_id': game_id, 'fields': 'username,password'})
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+"""
+Testy przesyłania zmian w statystykach graczy (Server-Sent Events)
+"""
+import json
+import queue
+import threading
+
+import streaming
+from app import db
+from models import ProgressEventModel
+from conftest import create_game, create_user
+
+
+def test_subscribers_above_limit_are_rejected(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SSE_MAX_SUBSCRIBERS', 1)
+    subscriber = streaming.broadcaster.subscribe()
+    try:
+        response = app.test_client().get('/stats/stream')
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(app.config['SSE_KEEPALIVE_SECONDS'])
+    finally:
+        streaming.broadcaster.unsubscribe(subscriber)
+
+    response = app.test_client().get('/stats/stream')
+    assert response.status_code == 200
+    assert next(response.response).startswith(b"retry:")
+    response.close()
+
+
+def test_events_committed_out_of_order_are_published(app):
+    game = create_game()
+    client, user_id = create_user(app)
+    assert client.post(f'/mygames/{game.id}/start').status_code == 200
+    start = ProgressEventModel.query.filter_by(user_id=user_id).one()
+    event = {'entry_id': start.entry_id, 'user_id': user_id, 'game_id': start.game_id, 'riddle_no': 1}
+    last_id = ProgressEventModel.last_id()
+    broadcaster = streaming.ProgressBroadcaster()
+    subscriber = queue.Queue()
+    broadcaster._subscribers.add(subscriber)
+    try:
+        gaps = {}
+        db.session.execute(ProgressEventModel.__table__.insert(), dict(event, id=last_id + 2, kind='advance'))
+        db.session.commit()
+        last_id = broadcaster._publish_events(last_id, gaps, 60)
+        assert list(gaps) == [last_id - 1]
+
+        db.session.execute(ProgressEventModel.__table__.insert(), dict(event, id=last_id - 1, kind='finish'))
+        db.session.commit()
+        assert broadcaster._publish_events(last_id, gaps, 60) == last_id
+        assert gaps == {}
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+    published = [json.loads(subscriber.get_nowait().split("data: ")[1]) for _ in range(2)]
+    assert [data["event"] for data in published] == ['advance', 'finish']
+    assert subscriber.empty()
+
+
+def test_broadcaster_waits_for_first_subscriber_without_polling(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SSE_POLL_SECONDS', 0.01)
+    polled = threading.Event()
+    last_id = ProgressEventModel.last_id
+
+    def tracked_last_id():
+        polled.set()
+        return last_id()
+
+    monkeypatch.setattr(ProgressEventModel, 'last_id', tracked_last_id)
+    broadcaster = streaming.ProgressBroadcaster()
+    broadcaster._ensure_running(app)
+    assert not polled.wait(0.2)
+
+    subscriber = broadcaster.subscribe()
+    try:
+        assert polled.wait(1.0)
+    finally:
+        broadcaster.unsubscribe(subscriber)
@@ -0,0 +1,43 @@
+"""
+Testy automatycznego przesuwania graczy na podstawie próbek położenia (tracking.ingest_samples)
+"""
+import datetime as dt
+
+import tracking
+from app import db
+from models import ScoreboardEntryModel, SplitTimeModel
+from conftest import create_game, create_user
+
+SPACING = 0.005
+
+
+def riddle_sample(user_id, riddle_no, timestamp):
+    return user_id, timestamp, 50.0614, 19.9366 + (riddle_no - 1) * SPACING
+
+
+def ingest(samples, received):
+    user_ids, timestamps, latitudes, longitudes = zip(*samples)
+    tracking.ingest_samples(user_ids, timestamps, latitudes, longitudes, received)
+    db.session.remove()
+
+
+def test_batch_reaching_several_riddles_does_not_record_zero_length_splits(app):
+    game = create_game(riddles=3, spacing=SPACING)
+    client, user_id = create_user(app)
+    assert client.post(f'/mygames/{game.id}/start').status_code == 200
+    game_id = game.id
+    entry = ScoreboardEntryModel.filter_by_user_and_game(user_id, game_id)
+    entry_id, time_begin = entry.id, entry.time_begin
+    started = time_begin.timestamp()
+
+    ingest([riddle_sample(user_id, riddle_no, started + riddle_no) for riddle_no in (1, 2, 3)],
+           time_begin + dt.timedelta(seconds=5))
+    assert ScoreboardEntryModel.filter_by_user_and_game(user_id, game_id).current_riddle == 2
+
+    for seconds in (10, 15):
+        ingest([riddle_sample(user_id, riddle_no, started + seconds) for riddle_no in (1, 2, 3)],
+               time_begin + dt.timedelta(seconds=seconds))
+
+    entry = ScoreboardEntryModel.filter_by_user_and_game(user_id, game_id)
+    assert entry.finished
+    assert [split.seconds for split in SplitTimeModel.find_for_entry(entry_id)] == [5.0, 5.0, 5.0]
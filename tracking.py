@@ -0,0 +1,80 @@
+"""
+Moduł odpowiadający za przetwarzanie położenia graczy przesyłanego przez aplikacje mobilne.
+
+Próbki położenia są przetwarzane wsadowo: odległości od bieżących zagadek obliczane są dla wszystkich próbek gracza
+jednocześnie (NumPy), a postęp wszystkich graczy zapisywany jest w jednej transakcji. Znaczniki czasu próbek,
+podawane przez aplikacje mobilne, decydują wyłącznie o kolejności sprawdzania próbek - czasy osiągnięcia zagadek
+i ukończenia gry zapisywane są według zegara serwera, aby gracz nie mógł wpłynąć na ranking. Z tego samego powodu
+jedna partia próbek przesuwa gracza co najwyżej o jedną zagadkę - w przeciwnym razie wszystkie zagadki osiągnięte
+w partii otrzymałyby ten sam czas, a ich międzyczasy byłyby zerowe.
+"""
+import datetime as dt
+
+import numpy as np
+
+from cache import riddle_geometry
+from models import ScoreboardEntryModel, LeaderboardEntryModel, ProgressEventModel
+
+
+def ingest_samples(user_ids, timestamps, latitudes, longitudes, received=None):
+    """
+    Przetwarza próbki położenia graczy i automatycznie przesuwa graczy do kolejnych zagadek.
+
+    Dla każdej nieukończonej gry wyszukiwana jest pierwsza (według czasu) próbka gracza, zarejestrowana po rozpoczęciu
+    gry i leżąca w obszarze bieżącej zagadki. Gracz przechodzi wtedy do kolejnej zagadki (lub kończy grę), a dalsze
+    próbki z tej partii nie są już sprawdzane.
+
+    :param user_ids: Tablica identyfikatorów użytkowników, do których należą próbki
+    :param timestamps: Tablica znaczników czasu próbek (w sekundach od początku epoki Unix)
+    :param latitudes: Tablica szerokości geograficznych (w stopniach)
+    :param longitudes: Tablica długości geograficznych (w stopniach)
+    :param received: Czas otrzymania próbek przez serwer, zapisywany jako czas osiągnięcia zagadek (domyślnie bieżący)
+    :return: Lista słowników opisujących zmiany postępu w grach
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    received = received or dt.datetime.now()
+
+    order = np.lexsort((timestamps, user_ids))
+    user_ids, timestamps = user_ids[order], timestamps[order]
+    latitudes, longitudes = latitudes[order], longitudes[order]
+    unique_users, starts = np.unique(user_ids, return_index=True)
+    ends = np.append(starts[1:], user_ids.size)
+    bounds = {int(user): (int(start), int(end)) for user, start, end in zip(unique_users, starts, ends)}
+
+    updates = []
+    for entry_id, user_id, game_id, current_riddle, time_begin, riddles in \
+            ScoreboardEntryModel.find_active_for_users(bounds.keys()):
+        start, end = bounds[user_id]
+        start += int(np.searchsorted(timestamps[start:end], time_begin.timestamp()))
+        target = riddle_geometry.get(game_id, current_riddle)
+        if target is None or start >= end or target.first_inside(latitudes[start:end], longitudes[start:end]) is None:
+            continue
+        reached = max(received, time_begin)
+        if current_riddle + 1 > riddles:
+            new_riddle, finished, time_end = current_riddle, True, reached
+            events = [(ProgressEventModel.FINISH, current_riddle, reached)]
+        else:
+            new_riddle, finished, time_end = current_riddle + 1, False, None
+            events = [(ProgressEventModel.ADVANCE, new_riddle, reached)]
+        rank_group, rank_value = LeaderboardEntryModel.rank_of(finished, time_begin, time_end)
+        updates.append({
+            'id': entry_id,
+            'user_id': user_id,
+            'game_id': game_id,
+            'expected': current_riddle,
+            'current_riddle': new_riddle,
+            'finished': finished,
+            'time_end': time_end,
+            'rank_group': rank_group,
+            'rank_value': rank_value,
+            'events': events
+        })
+    return [{
+        'user_id': update['user_id'],
+        'game_id': update['game_id'],
+        'current_riddle': update['current_riddle'],
+        'finished': update['finished']
+    } for update in ScoreboardEntryModel.apply_progress(updates)]
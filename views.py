@@ -1,11 +1,12 @@
 """
 Moduł zawierający metody generujące widoki po wejściu pod adres internetowy serwera
 """
-from app import app
-from flask import render_template
+from flask import Blueprint, render_template
 
+blueprint = Blueprint('views', __name__)
 
-@app.route("/")
+
+@blueprint.route("/")
 def hello():
     """
     Generuje widok wyświetlający stronę głównej aplikacji
@@ -13,7 +14,7 @@ def hello():
     return render_template("index.html")
 
 
-@app.route("/gamelist")
+@blueprint.route("/gamelist")
 def gamelist():
     """
     Generuje widok wyświetlający listę wszystkich dostępnych gier z możliwością dołączenia do nich
@@ -21,7 +22,7 @@ def gamelist():
     return render_template("games.html")
 
 
-@app.route("/statistics")
+@blueprint.route("/statistics")
 def statistics():
     """
     Generuje widok wyświetlający postęp wszystkich użytkowników w każdej grze, do której dołączyli
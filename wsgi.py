@@ -2,7 +2,10 @@
 Plik konfiguracyjny interfejsu WSGI (Web Server Gateway Interface) służącego do przekazywania zapytań HTTP do aplikacji
 napisanej w języku Python.
 """
-from app import app
+from app import create_app, prepare
+
+app = create_app()
+prepare(app)
 
 if __name__ == '__main__':
     app.run()
\ No newline at end of file